@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react";
 import { Card, CardContent, CardHeader, CardTitle } from "./ui/card";
-import { ShieldCheck, Loader2, CheckCircle, Shield } from "lucide-react";
+import { ShieldCheck, Loader2, CheckCircle, Shield, AlertTriangle } from "lucide-react";
 
 const getTimeAgo = (timestamp: string) => {
   const seconds = Math.floor((new Date().getTime() - new Date(timestamp).getTime()) / 1000);
@@ -12,6 +12,7 @@ const getTimeAgo = (timestamp: string) => {
 
 const formatActionText = (statusString: string, ip: string, provider: string) => {
   if (statusString === "HIVE_MIND_SUCCESS") return `Global Hive Mind Block: ${ip}`;
+  if (statusString === "HIVE_MIND_PARTIAL") return `Partial Hive Mind Block: ${ip}`;
   if (statusString === "ALERT_ONLY_WHITELISTED_IP") return `HawkGrid Shield: Bypassed ${ip}`;
   if (statusString === "SUCCESS") return `Block IP ${ip} (${provider} WAF)`;
   return `Mitigation Executed on ${ip}`;
@@ -52,6 +53,8 @@ export function ActiveCountermeasures() {
         const ageInSeconds = (now - new Date(timestamp).getTime()) / 1000;
         const isInProgress = ageInSeconds < 4;
         const isShield = statusString === "ALERT_ONLY_WHITELISTED_IP";
+        // Some clouds failed or missed their deadline; the block is not everywhere yet
+        const isPartial = statusString === "HIVE_MIND_PARTIAL";
 
         let status = "success";
         let statusText = "Success ✅";
@@ -70,6 +73,11 @@ export function ActiveCountermeasures() {
           statusText = "Presenter Protected 🛡️";
           statusColor = "text-[#06B6D4]"; 
           StatusIcon = Shield; 
+        } else if (isPartial) {
+          status = "partial";
+          statusText = "Partial ⚠️";
+          statusColor = "text-[#F97316]";
+          StatusIcon = AlertTriangle;
         }
 
         processedMeasures.push({
@@ -116,6 +124,7 @@ export function ActiveCountermeasures() {
               let dotColor = "bg-[#22C55E] border-[#22C55E]"; 
               if (measure.status === "in_progress") dotColor = "bg-[#F59E0B] border-[#F59E0B] animate-pulse";
               if (measure.status === "shield") dotColor = "bg-[#06B6D4] border-[#06B6D4]";
+              if (measure.status === "partial") dotColor = "bg-[#F97316] border-[#F97316]";
 
               return (
                 <div key={measure.id} className="relative pl-6 pb-5 border-l-2 border-gray-700 last:border-l-0 last:pb-0">
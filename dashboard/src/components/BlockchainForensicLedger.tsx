@@ -3,6 +3,28 @@ import { Card, CardContent, CardHeader, CardTitle } from "./ui/card";
 import { Button } from "./ui/button";
 import { Link, CheckCircle2, ArrowRight, ShieldAlert } from "lucide-react";
 
+// Sorts oldest first and checks each block's previous_hash against the block before it
+const verifyChain = (rawData: any[]) => {
+  rawData.sort((a: any, b: any) => {
+    const tA = new Date(a.incident?.timestamp || 0).getTime();
+    const tB = new Date(b.incident?.timestamp || 0).getTime();
+    return tA - tB;
+  });
+
+  return rawData.map((block: any, index: number) => {
+    if (index === 0) {
+      return { ...block, integrityStatus: "Genesis" };
+    }
+    const previousBlock = rawData[index - 1];
+    const isValid = block.previous_hash === previousBlock.hash;
+
+    return { 
+      ...block, 
+      integrityStatus: isValid ? "Verified" : "Tampered" 
+    };
+  });
+};
+
 export function BlockchainForensicLedger() {
   const [blocks, setBlocks] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
@@ -13,28 +35,10 @@ export function BlockchainForensicLedger() {
       const response = await fetch("http://localhost:3001/api/live-logs");
       const rawData = await response.json();
 
-      // 1. Sort by Time (Oldest First) to reconstruct the chain
-      rawData.sort((a: any, b: any) => {
-        const tA = new Date(a.incident?.timestamp || 0).getTime();
-        const tB = new Date(b.incident?.timestamp || 0).getTime();
-        return tA - tB;
-      });
-
-      // 2. Verify the Chain Integrity
-      const processedBlocks = rawData.map((block: any, index: number) => {
-        if (index === 0) {
-          return { ...block, integrityStatus: "Genesis" };
-        }
-        const previousBlock = rawData[index - 1];
-        const isValid = block.previous_hash === previousBlock.hash;
-
-        return { 
-          ...block, 
-          integrityStatus: isValid ? "Verified" : "Tampered" 
-        };
-      });
-
-      // 3. Reverse for Display (Show Newest First)
+      // 1. Sort by Time (Oldest First) and verify the Chain Integrity
+      const processedBlocks = verifyChain(rawData);
+
+      // 2. Reverse for Display (Show Newest First)
       setBlocks(processedBlocks.reverse());
       setLoading(false);
 
@@ -50,7 +54,16 @@ export function BlockchainForensicLedger() {
     return () => clearInterval(interval);
   }, []);
 
-  const handleDownloadHistory = () => {
+  const handleDownloadHistory = async () => {
+    // The panel only polls the live tail; the audit export covers the full history
+    let history = blocks;
+    try {
+      const response = await fetch("http://localhost:3001/api/live-logs?history=full");
+      history = verifyChain(await response.json()).reverse();
+    } catch (error) {
+      console.error("Blockchain History Fetch Error:", error);
+    }
+
     const headers = [
       "Timestamp", "Source IP", "Destination IP", "Attack Type", 
       "Asset Name", "Previous Hash", "Current Hash", "Integrity Status"
@@ -58,7 +71,7 @@ export function BlockchainForensicLedger() {
 
     const csvRows = [
       headers.join(","),
-      ...blocks.map(block => {
+      ...history.map(block => {
         const inc = block.incident || {};
         return [
           `"${inc.timestamp || ''}"`,
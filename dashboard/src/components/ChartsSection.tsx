@@ -44,7 +44,9 @@ export function ChartsSection() {
   // 2. FETCH LOGS (Polling)
   const fetchLogs = async () => {
     try {
-      const response = await fetch("http://localhost:3001/api/live-logs");
+      // Every record from the 7-day window the charts cover, not just the live tail
+      const since = Math.floor(Date.now() / 1000) - 7 * 24 * 60 * 60;
+      const response = await fetch(`http://localhost:3001/api/live-logs?history=full&since=${since}`);
       const data = await response.json();
       setLogs(data);
     } catch (error) {
@@ -20,8 +20,8 @@ export function DownloadReportButton() {
     setStatus("loading");
 
     try {
-      // 1. Fetch the latest RAW logs from the bridge
-      const response = await fetch("http://localhost:3001/api/live-logs");
+      // 1. Fetch the full RAW log history from the bridge (not just the live tail)
+      const response = await fetch("http://localhost:3001/api/live-logs?history=full");
       const rawData = await response.json();
 
       // 2. Sort Oldest -> Newest (Required for correct grouping)
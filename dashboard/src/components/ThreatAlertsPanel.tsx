@@ -126,7 +126,7 @@ export function ThreatAlertsPanel() {
   const downloadCSV = async () => {
     try {
       // 1. Fetch the absolute full log history from the API
-      const response = await fetch(`http://localhost:3001/api/live-logs?_t=${Date.now()}`);
+      const response = await fetch(`http://localhost:3001/api/live-logs?history=full&_t=${Date.now()}`);
       const fullHistory = await response.json();
 
       // 2. Sort newest to oldest
@@ -10,17 +10,83 @@ app.use(cors());
 const LEDGER_PATH = path.join(__dirname, 'ledger', 'forensic_audit_ledger.jsonl');
 const REPORT_PATH = path.join(__dirname, 'reports', 'forensic_audit.json');
 
-app.get('/api/live-logs', (req, res) => {
+// The orchestrator reads the tail across sealed ledger segments for us
+const API_URL = process.env.HG_API_URL || 'http://localhost:8000';
+const LIVE_LOGS_LIMIT = parseInt(process.env.HG_LIVE_LOGS_LIMIT || '500', 10);
+// Fallback when the API is down: only this much of the end of the active file is read
+const FALLBACK_TAIL_BYTES = 1024 * 1024;
+// Page size for ?history=full (the API caps indexed queries at 500 records per page)
+const HISTORY_PAGE_SIZE = 500;
+
+function tailActiveLedger(limit) {
+  if (!fs.existsSync(LEDGER_PATH)) return [];
+
+  const fd = fs.openSync(LEDGER_PATH, 'r');
   try {
-    if (!fs.existsSync(LEDGER_PATH)) return res.json([]);
-    
-    const data = fs.readFileSync(LEDGER_PATH, 'utf8');
-    // Converts .jsonl lines into a clean JSON array for your React Dashboard
-    const logs = data.trim().split('\n')
+    const size = fs.fstatSync(fd).size;
+    const start = Math.max(0, size - FALLBACK_TAIL_BYTES);
+    const buffer = Buffer.alloc(size - start);
+    fs.readSync(fd, buffer, 0, buffer.length, start);
+
+    let lines = buffer.toString('utf8').split('\n');
+    if (start > 0) lines = lines.slice(1); // starts mid-line
+    lines.pop(); // empty, or a record still being appended
+    return lines
       .filter(line => line.trim() !== "")
+      .slice(-limit)
       .map(line => JSON.parse(line));
-      
-    res.json(logs);
+  } finally {
+    fs.closeSync(fd);
+  }
+}
+
+// Every record (optionally since an epoch time), paged through the indexed query API, oldest first
+async function fetchHistory(since) {
+  const records = [];
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ limit: String(HISTORY_PAGE_SIZE) });
+    if (since) params.set('since', since);
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${API_URL}/api/ledger/query?${params}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const page = await response.json();
+    records.push(...page.records);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return records.reverse();
+}
+
+function readActiveLedger() {
+  if (!fs.existsSync(LEDGER_PATH)) return [];
+  return fs.readFileSync(LEDGER_PATH, 'utf8').trim().split('\n')
+    .filter(line => line.trim() !== "")
+    .map(line => JSON.parse(line));
+}
+
+// Default: the newest LIVE_LOGS_LIMIT records (or ?limit=N) for the polling panels.
+// ?history=full returns every record for reports and charts; add &since=<epoch seconds> to bound it.
+app.get('/api/live-logs', async (req, res) => {
+  const fullHistory = req.query.history === 'full';
+  const limit = parseInt(req.query.limit || LIVE_LOGS_LIMIT, 10);
+  try {
+    if (fullHistory) return res.json(await fetchHistory(req.query.since));
+    const response = await fetch(`${API_URL}/api/ledger/tail?limit=${limit}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    // Already a JSON array, oldest first, for your React Dashboard
+    return res.json(await response.json());
+  } catch (err) {
+    console.warn(`Ledger API unavailable (${err.message}); reading the active ledger file only`);
+  }
+
+  try {
+    // Older sealed segments are only reachable through the API, so flag the gap
+    res.set('X-HawkGrid-Ledger-Coverage', 'active-file');
+    if (fullHistory) {
+      const since = parseFloat(req.query.since || '0');
+      return res.json(readActiveLedger().filter(record => (record.timestamp || 0) >= since));
+    }
+    res.json(tailActiveLedger(limit));
   } catch (err) {
     console.error("Error reading ledger:", err);
     res.status(500).json({ error: "Could not read ledger file" });
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_INCIDENT = {
+    "node_id": "10.0.1.5",
+    "src_ip": "203.0.113.7",
+    "dst_ip": "198.51.100.10",
+    "attack_type": "DOS",
+    "severity": "CRITICAL",
+    "anomaly_score": 0.99,
+}
+
+class StandInElasticsearch(BaseHTTPRequestHandler):
+    """Answers single-document index and _bulk calls after a fixed latency."""
+    latency = 0.002
+    received = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._reply({"version": {"number": "8.11.0"}, "tagline": "You Know, for Search"})
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        if self.path.split("?")[0].endswith("/_bulk"):
+            lines = [l for l in body.splitlines() if l.strip()]
+            items = [{"create": {"_id": json.loads(l)["create"]["_id"], "status": 201}} for l in lines[::2]]
+            StandInElasticsearch.received += len(items)
+            self._reply({"took": 1, "errors": False, "items": items})
+        else:
+            StandInElasticsearch.received += 1
+            self._reply({"_id": str(StandInElasticsearch.received), "result": "created"})
+
+    do_PUT = do_POST
+
+def run_benchmark(records: int, latency_ms: float):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInElasticsearch)
+    StandInElasticsearch.latency = latency_ms / 1000.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["ELASTICSEARCH_HOSTS"] = f"http://127.0.0.1:{server.server_port}"
+
+    from src.blockchain.ledger_elasticsearch import ElasticsearchLedger
+
+    print(f"Elasticsearch ledger benchmark: {records} incidents, stand-in latency {latency_ms} ms\n")
+    print(f"{'mode':<10}{'rec/s':>12}{'log_incident p50 ms':>22}{'p99 ms':>10}")
+    print("-" * 54)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("single", "bulk"):
+            StandInElasticsearch.received = 0
+            ledger = ElasticsearchLedger(bulk=(mode == "bulk"), spill_file=os.path.join(tmp, "spill.jsonl"))
+            call_ms = []
+            start = time.perf_counter()
+            for _ in range(records):
+                t0 = time.perf_counter()
+                ledger.log_incident(SAMPLE_INCIDENT, "GLOBAL_NACL_BLOCK")
+                call_ms.append((time.perf_counter() - t0) * 1000)
+            if mode == "bulk":
+                ledger.close()
+            elapsed = time.perf_counter() - start
+
+            if StandInElasticsearch.received != records:
+                raise RuntimeError(f"{mode}: stand-in received {StandInElasticsearch.received}/{records} documents")
+            call_ms.sort()
+            p50 = call_ms[len(call_ms) // 2]
+            p99 = call_ms[int(len(call_ms) * 0.99) - 1]
+            print(f"{mode:<10}{records / elapsed:>12,.0f}{p50:>22.3f}{p99:>10.3f}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    # Usage: python -m scripts.bench_es_ledger --records 2000 --latency-ms 2
+    parser = argparse.ArgumentParser(description="Benchmark single vs bulk Elasticsearch ledger writes")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    run_benchmark(args.records, args.latency_ms)
@@ -0,0 +1,99 @@
+import time
+import logging
+import argparse
+import itertools
+
+from src.blockchain.ledger_aws_qldb import AWSQLDBLedger
+from src.blockchain.ledger_azure import AzureConfidentialLedger
+
+SAMPLE_INCIDENT = {
+    "node_id": "10.0.1.5",
+    "src_ip": "203.0.113.7",
+    "dst_ip": "198.51.100.10",
+    "attack_type": "DOS",
+    "severity": "CRITICAL",
+    "anomaly_score": 0.99,
+}
+
+class StubQldbDriver:
+    """Stands in for QldbDriver: every execute_lambda costs one round-trip."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents = 0
+        self.transactions = 0
+        self._ids = itertools.count(1)
+
+    def execute_lambda(self, fn):
+        driver = self
+
+        class _Txn:
+            def execute_statement(self, statement, *params):
+                driver.documents += len(params)
+                return [{"documentId": f"doc-{next(driver._ids)}"} for _ in params]
+
+        time.sleep(self.latency)
+        self.transactions += 1
+        return fn(_Txn())
+
+class StubConfidentialLedgerClient:
+    """Stands in for ConfidentialLedgerClient: every entry costs one round-trip."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.entries = 0
+
+    def begin_create_ledger_entry(self, entry):
+        client = self
+
+        class _Poller:
+            def result(self):
+                time.sleep(client.latency)
+                client.entries += 1
+                return {"transactionId": f"2.{client.entries}"}
+
+        return _Poller()
+
+def run_benchmark(records: int, latency_ms: float):
+    latency = latency_ms / 1000.0
+    print(f"Remote ledger benchmark: {records} incidents, stub round-trip {latency_ms} ms\n")
+    print(f"{'backend':<10}{'mode':<9}{'rec/s':>12}{'round-trips':>14}{'log_incident p99 ms':>22}")
+    print("-" * 67)
+
+    backends = (
+        ("qldb", lambda batch: AWSQLDBLedger(driver=StubQldbDriver(latency), batch=batch)),
+        ("azure", lambda batch: AzureConfidentialLedger(client=StubConfidentialLedgerClient(latency), batch=batch)),
+    )
+    for name, build in backends:
+        for batch in (False, True):
+            ledger = build(batch)
+            call_ms, receipts = [], []
+            start = time.perf_counter()
+            for _ in range(records):
+                t0 = time.perf_counter()
+                result = ledger.log_incident(SAMPLE_INCIDENT, "GLOBAL_NACL_BLOCK")
+                call_ms.append((time.perf_counter() - t0) * 1000)
+                receipts.append(result.get("receipt_id"))
+            ledger.close()
+            elapsed = time.perf_counter() - start
+
+            stub = getattr(ledger, "driver", None) or ledger.client
+            trips = getattr(stub, "transactions", None) or getattr(stub, "entries")
+            if batch:
+                unresolved = [r for r in receipts if ledger.resolve_receipt(r)["status"] != "committed"]
+                if unresolved:
+                    raise RuntimeError(f"{name}: {len(unresolved)} receipts never committed")
+            call_ms.sort()
+            p99 = call_ms[int(len(call_ms) * 0.99) - 1]
+            mode = "batch" if batch else "single"
+            print(f"{name:<10}{mode:<9}{records / elapsed:>12,.0f}{trips:>14}{p99:>22.3f}")
+
+if __name__ == "__main__":
+    # Usage: python -m scripts.bench_remote_ledger --records 500 --latency-ms 20
+    parser = argparse.ArgumentParser(description="Benchmark per-incident vs batched QLDB / Azure ledger writes")
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    # Per-commit QLDB/Azure log lines would swamp the table
+    logging.disable(logging.CRITICAL)
+    run_benchmark(args.records, args.latency_ms)
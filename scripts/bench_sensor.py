@@ -0,0 +1,98 @@
+import os
+import time
+import random
+import socket
+import struct
+import argparse
+import tempfile
+
+from src.orchestrator.sensor_replay import replay, read_packets
+
+try:
+    from scapy.all import Ether, IP, TCP
+except ImportError:
+    Ether = None
+
+TARGETS = ["198.51.100.10", "198.51.100.11", "198.51.100.12"]
+BOTNET_PREFIXES = ["45.83.64", "91.240.118", "185.220.101"]
+
+def _frame(src: str, dst: str, dport: int, flags: int, payload: int, sport: int = 0) -> bytes:
+    """Ethernet + IPv4 + TCP with a zero payload of the given size (checksums left at 0)."""
+    tcp = struct.pack("!HHIIBBHHH", sport or random.randint(1024, 65535), dport, 0, 0, 5 << 4, flags, 64240, 0, 0)
+    total = 20 + len(tcp) + payload
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, total, 0, 0x4000, 64, 6, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return b"\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00" + ip + tcp + bytes(payload)
+
+def write_capture(path: str, packets: int, flows: int, pps: float, seed: int):
+    """
+    A synthetic pcap: `flows` attacker->target pairs, a third of them
+    SYN-scanning auth ports from fresh source ports, the rest one
+    long-lived connection each.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+    pairs = [(f"{rng.choice(BOTNET_PREFIXES)}.{rng.randint(1, 254)}", rng.choice(TARGETS)) for _ in range(flows)]
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        ts = 1_700_000_000.0
+        for n in range(packets):
+            src, dst = pairs[n % flows]
+            scanning = n % flows % 3 == 0
+            frame = _frame(src, dst, rng.choice((22, 3389, 445)) if scanning else 443,
+                           0x02 if scanning else 0x18, 0 if scanning else rng.randint(0, 1200),
+                           0 if scanning else 1024 + n % flows)
+            ts += 1.0 / pps
+            sec = int(ts)
+            f.write(struct.pack("<IIII", sec, int((ts - sec) * 1e6), len(frame), len(frame)))
+            f.write(frame)
+
+def scapy_rate(path: str, limit: int = 20000):
+    """Packets per second scapy manages just dissecting the same frames (for comparison)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    frames = []
+    for _, _, frame in read_packets(memoryview(data)):
+        frames.append(bytes(frame))
+        if len(frames) >= limit:
+            break
+    started = time.perf_counter()
+    for raw in frames:
+        pkt = Ether(raw)
+        if IP in pkt and TCP in pkt:
+            pkt[TCP].dport, pkt[TCP].flags == "S"
+    return len(frames) / (time.perf_counter() - started)
+
+def run_benchmark(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pcap")
+        write_capture(path, args.packets, args.flows, args.pps, args.seed)
+        print(f"Sensor replay benchmark: {args.packets:,} packets, {args.flows} flows, "
+              f"{os.path.getsize(path) / 1048576:.1f} MB capture\n")
+        for shards in sorted({1, *args.shards}):
+            result = replay(path, args.window, targets={ip: "bench" for ip in TARGETS}, shards=shards)
+            label = "struct parser + flow table" if shards == 1 else f"  sharded x{shards}"
+            print(f"{label:<28}{result['pps']:>12,} pkt/s   windows {result['windows']}, flows {result['flows']}, "
+                  f"window close p50 {result['window_ms_p50']} ms / p99 {result['window_ms_p99']} ms")
+        if args.features:
+            try:
+                result = replay(path, args.window, targets={ip: "bench" for ip in TARGETS}, features=True)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"{'UNSW connection features':<28}skipped: {e}")
+                return
+            print(f"{'UNSW connection features':<28}{result['pps']:>12,} pkt/s   windows {result['windows']}, "
+                  f"connections {result['flows']}, window close p50 {result['window_ms_p50']} ms / "
+                  f"p99 {result['window_ms_p99']} ms")
+        if Ether is not None:
+            print(f"{'scapy dissection only':<28}{scapy_rate(path):>12,.0f} pkt/s")
+
+if __name__ == "__main__":
+    # Usage: python -m scripts.bench_sensor --packets 1000000 --flows 500 --shards 2 4 --features
+    parser = argparse.ArgumentParser(description="Offline packet-sensor throughput benchmark on a synthetic capture")
+    parser.add_argument("--packets", type=int, default=500000)
+    parser.add_argument("--flows", type=int, default=300)
+    parser.add_argument("--pps", type=float, default=50000, help="packet rate recorded in the capture")
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--shards", type=int, nargs="*", default=[], help="also replay with these worker counts")
+    parser.add_argument("--features", action="store_true", help="also replay with UNSW-NB15 connection features")
+    parser.add_argument("--seed", type=int, default=7)
+    run_benchmark(parser.parse_args())
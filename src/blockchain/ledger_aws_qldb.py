@@ -1,30 +1,53 @@
 import os
 import logging
 import time
-from typing import Dict, Any
-from pyqldb.driver.qldb_driver import QldbDriver
-from pyqldb.errors import ExecuteError
+import uuid
+from typing import Dict, Any, List, Tuple
 from .base_ledger import BaseLedger
+from .ledger_batching import ReceiptBatcher, REMOTE_BATCH_ENABLED
+
+try:
+    from pyqldb.driver.qldb_driver import QldbDriver
+    from pyqldb.errors import ExecuteError
+except ImportError:
+    QldbDriver = None
+    ExecuteError = Exception
 
 log = logging.getLogger("hawkgrid-ledger-aws")
 
 LEDGER_NAME = os.getenv("HG_AWS_LEDGER_NAME", "hawkgrid-forensic-ledger")
 TABLE_NAME = os.getenv("HG_AWS_LEDGER_TABLE", "incidents")
+# QLDB caps a transaction at 40 document revisions
+BATCH_MAX_DOCS = min(int(os.getenv("HG_AWS_LEDGER_BATCH_DOCS", 40)), 40)
 
 _qldb_driver = None
 
 def _get_driver():
     global _qldb_driver
     if _qldb_driver is None:
+        if QldbDriver is None:
+            raise ImportError("pyqldb is not installed")
         log.info(f"Initializing QLDB Driver: {LEDGER_NAME}")
         _qldb_driver = QldbDriver(ledger_name=LEDGER_NAME)
     return _qldb_driver
 
 class AWSQLDBLedger(BaseLedger):
+    """
+    Pass `driver` to use something other than the shared QldbDriver (e.g. a
+    local stub). With batching on (HG_LEDGER_REMOTE_BATCH=1) incidents are
+    queued and inserted up to BATCH_MAX_DOCS per transaction; log_incident
+    returns a receipt_id to look up with resolve_receipt().
+    """
 
-    def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
-        driver = _get_driver()
-        record = {
+    def __init__(self, driver=None, batch: bool = None, max_docs: int = None, max_age_ms: float = None):
+        self.driver = driver or _get_driver()
+        self.batch = REMOTE_BATCH_ENABLED if batch is None else batch
+        self._batcher = None
+        if self.batch:
+            self._batcher = ReceiptBatcher("qldb", self._insert_batch, min(max_docs or BATCH_MAX_DOCS, 40), max_age_ms)
+
+    def _build_record(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
+        return {
             "incident_time": incident.get("timestamp", time.time()),
             "node_id": incident.get("node_id"),
             "cloud_provider": incident.get("cloud_provider"),
@@ -34,13 +57,36 @@ class AWSQLDBLedger(BaseLedger):
             "hawkgrid_version": os.getenv("HG_VERSION", "2.0")
         }
 
+    def _insert_batch(self, batch_id: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One transaction, one multi-document INSERT; returns the QLDB document id per record."""
+        placeholders = ", ".join("?" for _ in records)
+
+        def insert_txn(tx):
+            cursor = tx.execute_statement(f"INSERT INTO {TABLE_NAME} << {placeholders} >>", *records)
+            return [row["documentId"] for row in cursor]
+
+        document_ids = self.driver.execute_lambda(insert_txn)
+        log.critical(f"QLDB batch {batch_id[:12]} committed ({len(records)} immutable records).")
+        return [{"document_id": str(doc_id)} for doc_id in document_ids]
+
+    def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
+        record = self._build_record(incident, response_action)
+
+        if self._batcher is not None:
+            return {
+                "status": "queued",
+                "ledger_type": "AWS_QLDB",
+                "receipt_id": self._batcher.submit(record),
+                "record": record
+            }
+
         try:
             def insert_txn(tx):
                 tx.execute_statement(
                     f"INSERT INTO {TABLE_NAME} ?",
                     record
                 )
-            driver.execute_lambda(insert_txn)
+            self.driver.execute_lambda(insert_txn)
             log.critical("QLDB immutable record created.")
             return {
                 "status": "success",
@@ -50,4 +96,33 @@ class AWSQLDBLedger(BaseLedger):
 
         except ExecuteError as e:
             log.exception("QLDB write failed")
-            raise
\ No newline at end of file
+            raise
+
+    def log_incidents(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        if self._batcher is not None:
+            return [self.log_incident(incident, action) for incident, action in items]
+
+        # Synchronous group commit: still one transaction per BATCH_MAX_DOCS records
+        records = [self._build_record(incident, action) for incident, action in items]
+        results = []
+        for i in range(0, len(records), BATCH_MAX_DOCS):
+            chunk = records[i:i + BATCH_MAX_DOCS]
+            ids = self._insert_batch(uuid.uuid4().hex, chunk)
+            results.extend(
+                {"status": "success", "ledger_type": "AWS_QLDB", "record": record, **doc}
+                for record, doc in zip(chunk, ids)
+            )
+        return results
+
+    def resolve_receipt(self, receipt_id: str):
+        if self._batcher is None:
+            raise RuntimeError("QLDB ledger is not running in batching mode")
+        return self._batcher.resolve(receipt_id)
+
+    def flush(self):
+        if self._batcher is not None:
+            self._batcher.flush()
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
@@ -1,21 +1,48 @@
 import os
 import json
 import logging
-from typing import Dict, Any
-from azure.identity import DefaultAzureCredential
-from azure.confidentialledger import ConfidentialLedgerClient
-from azure.confidentialledger.certificate import ConfidentialLedgerCertificateClient
+from typing import Dict, Any, List
 from .base_ledger import BaseLedger
+from .ledger_batching import ReceiptBatcher, REMOTE_BATCH_ENABLED
+
+try:
+    from azure.identity import DefaultAzureCredential
+    from azure.confidentialledger import ConfidentialLedgerClient
+    from azure.confidentialledger.certificate import ConfidentialLedgerCertificateClient
+except ImportError:
+    ConfidentialLedgerClient = None
 
 log = logging.getLogger("hawkgrid-ledger-azure")
 
+# Incidents packed into one ledger entry in batching mode
+BATCH_MAX_DOCS = int(os.getenv("HG_AZURE_LEDGER_BATCH_DOCS", 100))
+
 class AzureConfidentialLedger(BaseLedger):
-    def __init__(self):
+    """
+    Pass `client` to skip the certificate bootstrap and use any object with
+    begin_create_ledger_entry() (e.g. a local stub). With batching on
+    (HG_LEDGER_REMOTE_BATCH=1) many incidents share one ledger entry and
+    log_incident returns a receipt_id to look up with resolve_receipt().
+    """
+
+    def __init__(self, client=None, batch: bool = None, max_docs: int = None, max_age_ms: float = None):
         # Dynamically pull from .env, fallback to your hardcoded UMIT URLs
         self.ledger_name = os.getenv("HG_AZURE_LEDGER_NAME", "UMIT-Hawkgrid-Audit-2026")
         self.ledger_url = os.getenv("HG_AZURE_LEDGER_URL", "https://umit-hawkgrid-audit-2026.confidential-ledger.azure.com")
         self.identity_url = os.getenv("HG_AZURE_IDENTITY_URL", "https://identity.confidential-ledger.core.azure.com/ledgerIdentity/umit-hawkgrid-audit-2026")
-        
+
+        # The client must exist before the batcher thread can flush through it
+        self.client = client if client is not None else self._connect()
+
+        self.batch = REMOTE_BATCH_ENABLED if batch is None else batch
+        self._batcher = None
+        if self.batch:
+            self._batcher = ReceiptBatcher("azure-ledger", self._append_batch, max_docs or BATCH_MAX_DOCS, max_age_ms)
+
+    def _connect(self):
+        if ConfidentialLedgerClient is None:
+            raise ImportError("azure-identity / azure-confidentialledger are not installed")
+
         log.info(f"Initializing Azure Confidential Ledger: {self.ledger_name}")
         self.credential = DefaultAzureCredential()
 
@@ -23,43 +50,75 @@ class AzureConfidentialLedger(BaseLedger):
             # 1. Get the ledger's network identity (certificate)
             id_client = ConfidentialLedgerCertificateClient(self.identity_url)
             network_identity = id_client.get_ledger_identity(ledger_id=self.ledger_name)
-            
+
             self.cert_path = "networkcert.pem"
             with open(self.cert_path, "w") as f:
                 f.write(network_identity['ledgerTlsCertificate'])
 
             # 2. Create the Ledger Client
-            self.client = ConfidentialLedgerClient(
-                endpoint=self.ledger_url, 
-                credential=self.credential, 
+            return ConfidentialLedgerClient(
+                endpoint=self.ledger_url,
+                credential=self.credential,
                 ledger_certificate_path=self.cert_path
             )
         except Exception as e:
             log.error(f"Failed to initialize Azure Ledger client: {e}")
             raise
 
-    def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
-        """Appends the incident to the immutable Azure ledger."""
-        record = {
+    def _build_record(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
+        return {
             "incident": incident,
             "response_action": response_action,
             "hawkgrid_version": os.getenv("HG_VERSION", "2.0")
         }
-        
+
+    def _append_batch(self, batch_id: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Writes the whole batch as a single ledger entry; each record is addressed by its index in it."""
+        contents = json.dumps({"batch_id": batch_id, "records": records})
+        result = self.client.begin_create_ledger_entry({"contents": contents}).result()
+        transaction_id = result.get("transactionId")
+        log.info(f"Azure Ledger batch {batch_id[:12]} committed ({len(records)} incidents). Transaction ID: {transaction_id}")
+        return [{"transaction_id": transaction_id} for _ in records]
+
+    def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
+        """Appends the incident to the immutable Azure ledger."""
+        record = self._build_record(incident, response_action)
+
+        if self._batcher is not None:
+            return {
+                "status": "queued",
+                "ledger_type": "AZURE_CONFIDENTIAL_LEDGER",
+                "receipt_id": self._batcher.submit(record),
+                "record": record
+            }
+
         try:
             # 3. Append the incident log
             entry_poller = self.client.begin_create_ledger_entry({"contents": json.dumps(record)})
             result = entry_poller.result()
-            
+
             log.info(f"Incident logged to Azure Ledger. Transaction ID: {result.get('transactionId')}")
-            
+
             return {
                 "status": "success",
                 "ledger_type": "AZURE_CONFIDENTIAL_LEDGER",
                 "transaction_id": result.get('transactionId'),
                 "record": record
             }
-            
+
         except Exception as e:
             log.exception("Azure Ledger write failed")
-            raise
\ No newline at end of file
+            raise
+
+    def resolve_receipt(self, receipt_id: str):
+        if self._batcher is None:
+            raise RuntimeError("Azure Ledger is not running in batching mode")
+        return self._batcher.resolve(receipt_id)
+
+    def flush(self):
+        if self._batcher is not None:
+            self._batcher.flush()
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
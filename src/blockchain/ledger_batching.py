@@ -0,0 +1,133 @@
+"""
+ledger_batching.py
+
+Asynchronous batching shared by the remote ledgers (QLDB, Azure Confidential
+Ledger). Incidents are buffered and packed into one remote transaction/entry
+by size or age; callers get a receipt id straight away and resolve it later
+with resolve_receipt() once the batch has committed.
+"""
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger("hawkgrid-ledger-batching")
+
+REMOTE_BATCH_ENABLED = os.getenv("HG_LEDGER_REMOTE_BATCH", "0") == "1"
+REMOTE_BATCH_AGE_MS = float(os.getenv("HG_LEDGER_REMOTE_BATCH_AGE_MS", 500))
+REMOTE_BATCH_RETRIES = int(os.getenv("HG_LEDGER_REMOTE_BATCH_RETRIES", 5))
+REMOTE_BATCH_BACKOFF_MS = float(os.getenv("HG_LEDGER_REMOTE_BATCH_BACKOFF_MS", 200))
+RECEIPTS_MAX = int(os.getenv("HG_LEDGER_RECEIPTS_MAX", 100000))
+
+
+class ReceiptBatcher:
+    """
+    Buffers records and hands them to `commit(batch_id, records)` in batches of
+    at most `max_records`. `commit` returns one dict per record (e.g. the
+    remote transaction or document id) which becomes that record's receipt.
+    Receipts are kept in memory, oldest evicted first beyond RECEIPTS_MAX.
+    """
+
+    def __init__(self, name: str, commit: Callable[[str, List[Dict[str, Any]]], List[Dict[str, Any]]],
+                 max_records: int, max_age_ms: float = None):
+        self.name = name
+        self._commit = commit
+        self.max_records = max(1, max_records)
+        self.max_age = (max_age_ms if max_age_ms is not None else REMOTE_BATCH_AGE_MS) / 1000.0
+        self._buffer: List[tuple] = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._receipts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"committed": 0, "failed": 0, "batches": 0, "retried": 0}
+        self._flusher = threading.Thread(target=self._flush_loop, name=f"hawkgrid-{name}-batch", daemon=True)
+        self._flusher.start()
+        log.info(f"{name} batching enabled (records={self.max_records}, age={self.max_age}s).")
+
+    def submit(self, record: Dict[str, Any]) -> str:
+        receipt_id = uuid.uuid4().hex
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append((receipt_id, record))
+            self._remember(receipt_id, {"status": "pending"})
+            if len(self._buffer) >= self.max_records:
+                self._wake.set()
+        return receipt_id
+
+    def resolve(self, receipt_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a receipt: pending, committed (with remote ids) or failed. None if unknown."""
+        with self._lock:
+            receipt = self._receipts.get(receipt_id)
+            return dict(receipt, receipt_id=receipt_id) if receipt is not None else None
+
+    def _remember(self, receipt_id: str, state: Dict[str, Any]):
+        self._receipts[receipt_id] = state
+        self._receipts.move_to_end(receipt_id)
+        while len(self._receipts) > RECEIPTS_MAX:
+            self._receipts.popitem(last=False)
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wake.wait(self.max_age)
+            self._wake.clear()
+            with self._lock:
+                due = self._buffer and (
+                    len(self._buffer) >= self.max_records or time.monotonic() - self._oldest >= self.max_age
+                )
+            if due:
+                self.flush()
+
+    def flush(self):
+        """Commits everything buffered so far, one remote round-trip per batch."""
+        with self._send_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+            for i in range(0, len(pending), self.max_records):
+                self._send(pending[i:i + self.max_records])
+
+    def _send(self, batch: List[tuple]):
+        batch_id = uuid.uuid4().hex
+        records = [record for _, record in batch]
+        error = None
+        for attempt in range(REMOTE_BATCH_RETRIES + 1):
+            if attempt:
+                self.stats["retried"] += 1
+                delay = REMOTE_BATCH_BACKOFF_MS * (2 ** (attempt - 1)) / 1000.0
+                time.sleep(delay * random.uniform(0.5, 1.5))
+            try:
+                results = self._commit(batch_id, records)
+                break
+            except Exception as e:
+                error = e
+                log.warning(f"{self.name} batch commit failed (attempt {attempt + 1}): {e}")
+        else:
+            log.error(f"{self.name} gave up on batch {batch_id} ({len(batch)} records): {error}")
+            with self._lock:
+                for receipt_id, _ in batch:
+                    self._remember(receipt_id, {"status": "failed", "batch_id": batch_id, "error": str(error)})
+            self.stats["failed"] += len(batch)
+            return
+
+        committed_at = time.time()
+        with self._lock:
+            for index, ((receipt_id, _), result) in enumerate(zip(batch, results)):
+                self._remember(receipt_id, {
+                    "status": "committed", "batch_id": batch_id, "batch_index": index,
+                    "committed_at": committed_at, **result
+                })
+        self.stats["committed"] += len(batch)
+        self.stats["batches"] += 1
+
+    def close(self):
+        """Stops the flusher and commits whatever is still buffered."""
+        self._stopped = True
+        self._wake.set()
+        self._flusher.join(timeout=5)
+        self.flush()
@@ -0,0 +1,170 @@
+import os
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Dict, Any, List, Tuple
+from .base_ledger import BaseLedger
+
+log = logging.getLogger("hawkgrid-ledger-composite")
+
+FANOUT_TIMEOUT_MS = float(os.getenv("HG_LEDGER_TIMEOUT_MS", 2000))
+FANOUT_QUEUE_SIZE = int(os.getenv("HG_LEDGER_FANOUT_QUEUE", 10000))
+FANOUT_RETRIES = int(os.getenv("HG_LEDGER_FANOUT_RETRIES", 3))
+FANOUT_BACKOFF_MS = float(os.getenv("HG_LEDGER_FANOUT_BACKOFF_MS", 250))
+# Backends whose write must succeed before an incident counts as logged (the integrity chain);
+# everything else is a best-effort mirror
+REQUIRED_BACKENDS = [b.strip() for b in os.getenv("HG_LEDGER_REQUIRED", "local").lower().split(",") if b.strip()]
+
+def _backend_timeout(name: str) -> float:
+    """Per-backend slow-write threshold, e.g. HG_LEDGER_TIMEOUT_MS_ELASTICSEARCH=500."""
+    return float(os.getenv(f"HG_LEDGER_TIMEOUT_MS_{name.upper()}", FANOUT_TIMEOUT_MS)) / 1000.0
+
+class _BackendWorker:
+    """
+    Owns one backend: a bounded queue, a writer thread and its own retry
+    policy, so a slow or failing backend only ever backs up itself.
+    """
+
+    def __init__(self, name: str, ledger: BaseLedger, timeout: float):
+        self.name = name
+        self.ledger = ledger
+        self.timeout = timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=FANOUT_QUEUE_SIZE)
+        self.stats = {"written": 0, "retried": 0, "dropped": 0, "timeouts": 0, "last_error": None}
+        self._thread = threading.Thread(target=self._run, name=f"hawkgrid-ledger-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List[Tuple[Dict[str, Any], str]]) -> str:
+        """Queues a write without waiting for it; the outcome shows up in stats."""
+        try:
+            self._queue.put_nowait(items)
+        except queue.Full:
+            self.stats["dropped"] += len(items)
+            return "failed: queue full"
+        return "queued"
+
+    def _write(self, items):
+        log_incidents = getattr(self.ledger, "log_incidents", None)
+        if log_incidents is not None:
+            return log_incidents(items)
+        return [self.ledger.log_incident(incident, action) for incident, action in items]
+
+    def _run(self):
+        while True:
+            items = self._queue.get()
+            if items is None:
+                return
+            for attempt in range(FANOUT_RETRIES + 1):
+                if attempt:
+                    self.stats["retried"] += 1
+                    time.sleep(FANOUT_BACKOFF_MS * (2 ** (attempt - 1)) / 1000.0 * random.uniform(0.5, 1.5))
+                started = time.monotonic()
+                try:
+                    self._write(items)
+                    self.stats["written"] += len(items)
+                    if time.monotonic() - started > self.timeout:
+                        self.stats["timeouts"] += 1
+                    break
+                except Exception as e:
+                    self.stats["last_error"] = str(e)
+                    log.warning(f"{self.name} ledger write failed (attempt {attempt + 1}): {e}")
+            else:
+                self.stats["dropped"] += len(items)
+                log.error(f"{self.name} ledger gave up on {len(items)} incident(s) after {FANOUT_RETRIES} retries")
+
+    def close(self, timeout: float = None):
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if hasattr(self.ledger, "close"):
+            self.ledger.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "queue_depth": self._queue.qsize(), "timeout_s": self.timeout}
+
+class CompositeLedger(BaseLedger):
+    """
+    Writes every incident to several backends concurrently (e.g. the local
+    hash chain for integrity plus Elasticsearch for search). Required
+    backends are written on the caller's thread and any failure is raised,
+    so a returned result means the incident is durable there. Mirrors are
+    never waited on: their writes are queued and report "queued", and how
+    they went shows up in metrics() (written, retried, dropped, and
+    timeouts for writes slower than the backend's deadline).
+    """
+
+    def __init__(self, backends: Dict[str, BaseLedger], required: List[str] = None):
+        if not backends:
+            raise ValueError("CompositeLedger needs at least one backend")
+        self.backends = backends
+        self.required = [name for name in (REQUIRED_BACKENDS if required is None else required) if name in backends]
+        self._workers = {
+            name: _BackendWorker(name, ledger, _backend_timeout(name))
+            for name, ledger in backends.items() if name not in self.required
+        }
+        log.info(f"Composite ledger: required {self.required}, mirrors {list(self._workers)}")
+
+    def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
+        return self.log_incidents([(incident, response_action)])[0]
+
+    def log_incidents(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        # Mirrors start first so they run while the required backends write
+        statuses = {name: worker.submit(items) for name, worker in self._workers.items()}
+
+        for name in self.required:
+            ledger = self.backends[name]
+            try:
+                log_incidents = getattr(ledger, "log_incidents", None)
+                if log_incidents is not None:
+                    log_incidents(items)
+                else:
+                    for incident, action in items:
+                        ledger.log_incident(incident, action)
+            except Exception:
+                log.exception(f"Required ledger backend {name} failed; incident(s) not logged")
+                raise
+            statuses[name] = "success"
+
+        # The required backends succeeded; a mirror only makes it partial if it couldn't even queue
+        overall = "success" if all(s in ("success", "queued") for s in statuses.values()) else "partial"
+        return [{"status": overall, "ledger_type": "COMPOSITE", "backends": statuses} for _ in items]
+
+    def _delegate(self, method: str):
+        for ledger in self.backends.values():
+            if hasattr(ledger, method):
+                return getattr(ledger, method)
+        raise RuntimeError(f"No configured ledger backend supports {method}")
+
+    def query(self, **filters) -> Dict[str, Any]:
+        return self._delegate("query")(**filters)
+
+    def tail(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return self._delegate("tail")(limit)
+
+    def get_inclusion_proof(self, record_hash: str):
+        return self._delegate("get_inclusion_proof")(record_hash)
+
+    def resolve_receipt(self, receipt_id: str):
+        # Receipts are issued per backend, so ask every one that issues them
+        issuers = [ledger for ledger in self.backends.values() if hasattr(ledger, "resolve_receipt")]
+        if not issuers:
+            raise RuntimeError("No configured ledger backend supports resolve_receipt")
+        for ledger in issuers:
+            try:
+                receipt = ledger.resolve_receipt(receipt_id)
+            except RuntimeError:
+                continue
+            if receipt is not None:
+                return receipt
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {name: worker.metrics() for name, worker in self._workers.items()}
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.close(timeout=worker.timeout + 5)
+        for name in self.required:
+            if hasattr(self.backends[name], "close"):
+                self.backends[name].close()
@@ -1,15 +1,59 @@
 import os
+import json
+import time
+import uuid
+import random
 import logging
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Iterator, List, Tuple
 from elasticsearch import Elasticsearch
 from .base_ledger import BaseLedger
 log = logging.getLogger("hawkgrid-ledger-es")
 ES_HOST = os.getenv("ELASTICSEARCH_HOSTS", "http://localhost:9200")
 INDEX_NAME = os.getenv("HG_ES_INDEX", "hawkgrid-forensics")
 
+# Bulk mode: buffer documents and ship them through _bulk by size or age
+BULK_ENABLED = os.getenv("HG_ES_BULK", "0") == "1"
+BULK_MAX_DOCS = int(os.getenv("HG_ES_BULK_DOCS", 500))
+BULK_MAX_AGE_MS = float(os.getenv("HG_ES_BULK_AGE_MS", 1000))
+BULK_RETRIES = int(os.getenv("HG_ES_BULK_RETRIES", 5))
+BULK_BACKOFF_MS = float(os.getenv("HG_ES_BULK_BACKOFF_MS", 200))
+# Documents held in memory awaiting a flush; beyond this they go straight to the spill file
+BULK_BUFFER_MAX = int(os.getenv("HG_ES_BULK_BUFFER", 50000))
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+SPILL_FILE = os.getenv("HG_ES_SPILL_FILE", os.path.join(BASE_DIR, "ledger", "es_spill.jsonl"))
+SPILL_REPLAY_INTERVAL = float(os.getenv("HG_ES_SPILL_REPLAY_S", 30))
+
+# Per-item statuses worth retrying (throttling / transient shard failures)
+_RETRYABLE_STATUSES = {429, 502, 503, 504}
+
 class ElasticsearchLedger(BaseLedger):
-    def __init__(self):
+    def __init__(self, bulk: bool = None, max_docs: int = None, max_age_ms: float = None,
+                 spill_file: str = None):
         self.client = Elasticsearch([ES_HOST])
+        self.bulk = BULK_ENABLED if bulk is None else bulk
+        if not self.bulk:
+            return
+
+        self.max_docs = max_docs or BULK_MAX_DOCS
+        self.max_age = (max_age_ms if max_age_ms is not None else BULK_MAX_AGE_MS) / 1000.0
+        self.spill_file = spill_file or SPILL_FILE
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        self._oldest = None
+        self.buffer_max = max(BULK_BUFFER_MAX, self.max_docs)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # One _bulk request in flight at a time; held per request, never across a backoff sleep
+        self._send_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._next_replay = 0.0
+        self.stats = {"indexed": 0, "retried": 0, "spilled": 0, "bulk_requests": 0, "overflowed": 0}
+        self._flusher = threading.Thread(target=self._flush_loop, name="hawkgrid-es-bulk", daemon=True)
+        self._flusher.start()
+        log.info(f"Elasticsearch bulk mode enabled (docs={self.max_docs}, age={self.max_age}s).")
 
     def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
         document = {
@@ -17,6 +61,14 @@ class ElasticsearchLedger(BaseLedger):
             "response_action": response_action
         }
 
+        if self.bulk:
+            doc_id = self._enqueue([document])[0]
+            return {
+                "status": "queued",
+                "ledger_type": "ELASTICSEARCH",
+                "id": doc_id
+            }
+
         try:
             response = self.client.index(
                 index=INDEX_NAME,
@@ -31,4 +83,167 @@ class ElasticsearchLedger(BaseLedger):
 
         except Exception:
             log.exception("Elasticsearch write failed")
-            raise
\ No newline at end of file
+            raise
+
+    def log_incidents(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        if not self.bulk:
+            return [self.log_incident(incident, action) for incident, action in items]
+        ids = self._enqueue([{**incident, "response_action": action} for incident, action in items])
+        return [{"status": "queued", "ledger_type": "ELASTICSEARCH", "id": doc_id} for doc_id in ids]
+
+    def _enqueue(self, documents: List[Dict[str, Any]]) -> List[str]:
+        # Client-side ids make _bulk "create" retries idempotent
+        ids = [uuid.uuid4().hex for _ in documents]
+        overflow = []
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.extend(zip(ids, documents))
+            if len(self._buffer) > self.buffer_max:
+                # Elasticsearch can't keep up: park the oldest documents for the spill replay
+                overflow = self._buffer[:len(self._buffer) - self.buffer_max]
+                del self._buffer[:len(overflow)]
+            if len(self._buffer) >= self.max_docs:
+                self._wake.set()
+        if overflow:
+            self._count("overflowed", len(overflow))
+            self._spill(overflow)
+        return ids
+
+    def _count(self, key: str, n: int = 1):
+        # Updated from the flusher, the replay and callers' threads alike
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wake.wait(self.max_age)
+            self._wake.clear()
+            with self._lock:
+                due = self._buffer and (
+                    len(self._buffer) >= self.max_docs or time.monotonic() - self._oldest >= self.max_age
+                )
+            if due:
+                self.flush()
+            elif not self._buffer and time.monotonic() >= self._next_replay:
+                self._replay_spill()
+
+    def flush(self):
+        """
+        Ships everything buffered so far; failures end up in the spill file.
+        Once a chunk can't be delivered the rest is spilled directly rather
+        than each chunk running the whole retry schedule in turn.
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        for i in range(0, len(batch), self.max_docs):
+            failed = self._send(batch[i:i + self.max_docs])
+            if failed:
+                self._spill(failed + batch[i + self.max_docs:])
+                return
+
+    def _send(self, batch: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Bulk-indexes with retry and jittered backoff; returns the documents that never made it."""
+        pending = batch
+        for attempt in range(BULK_RETRIES + 1):
+            if attempt:
+                self._count("retried", len(pending))
+                delay = BULK_BACKOFF_MS * (2 ** (attempt - 1)) / 1000.0
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+            operations = []
+            for doc_id, document in pending:
+                operations.append({"create": {"_index": INDEX_NAME, "_id": doc_id}})
+                operations.append(document)
+            try:
+                with self._send_lock:
+                    response = self.client.bulk(operations=operations)
+                self._count("bulk_requests")
+            except Exception as e:
+                log.warning(f"Elasticsearch _bulk request failed (attempt {attempt + 1}): {e}")
+                continue
+
+            retry, indexed = [], 0
+            for (doc_id, document), item in zip(pending, response["items"]):
+                status = item.get("create", {}).get("status", 500)
+                if status < 300 or status == 409:
+                    # 409: already created by an earlier attempt
+                    indexed += 1
+                elif status in _RETRYABLE_STATUSES:
+                    retry.append((doc_id, document))
+                else:
+                    # Permanent rejection (e.g. mapping error): park it outside the replay loop
+                    log.error(f"Elasticsearch rejected document {doc_id}: {item.get('create', {}).get('error')}")
+                    self._spill([(doc_id, document)], self.spill_file + ".rejected")
+            self._count("indexed", indexed)
+            if not retry:
+                return []
+            pending = retry
+
+        log.error(f"Elasticsearch unavailable; spilling {len(pending)} documents to {self.spill_file}")
+        return pending
+
+    def _spill(self, documents: List[Tuple[str, Dict[str, Any]]], path: str = None):
+        path = path or self.spill_file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._spill_lock, open(path, "a", encoding="utf-8") as f:
+            for doc_id, document in documents:
+                f.write(json.dumps({"_id": doc_id, "document": document}) + "\n")
+        self._count("spilled", len(documents))
+
+    def _spill_chunks(self, f) -> Iterator[List[str]]:
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= self.max_docs:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def _replay_spill(self):
+        """
+        Re-sends spilled documents once Elasticsearch is reachable again,
+        streaming the spill file max_docs lines at a time. Once a chunk
+        can't be delivered the rest is copied back unparsed for the next
+        round instead of being retried chunk by chunk.
+        """
+        if not self._replay_lock.acquire(blocking=False):
+            return
+        try:
+            replay_path = self.spill_file + ".replay"
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_file) or os.path.getsize(self.spill_file) == 0:
+                    return
+                with self._spill_lock:
+                    os.replace(self.spill_file, replay_path)
+
+            replayed, unavailable = 0, False
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for lines in self._spill_chunks(f):
+                    if unavailable:
+                        with self._spill_lock, open(self.spill_file, "a", encoding="utf-8") as out:
+                            out.writelines(lines)
+                        continue
+                    batch = [(d["_id"], d["document"]) for d in map(json.loads, lines)]
+                    failed = self._send(batch)
+                    replayed += len(batch) - len(failed)
+                    if failed:
+                        self._spill(failed)
+                        unavailable = True
+            os.remove(replay_path)
+            log.info(f"Replayed {replayed} spilled documents to Elasticsearch.")
+            if unavailable:
+                self._next_replay = time.monotonic() + SPILL_REPLAY_INTERVAL
+        finally:
+            self._replay_lock.release()
+
+    def close(self):
+        """Stops the flusher and ships (or spills) whatever is still buffered."""
+        if not self.bulk:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._flusher.join(timeout=5)
+        self.flush()
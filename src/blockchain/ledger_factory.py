@@ -6,18 +6,11 @@ from src.blockchain.ledger_local import LocalLedger
 
 log = logging.getLogger("hawkgrid-ledger-factory")
 
-def get_ledger() -> BaseLedger:
-    """
-    Dynamically selects ledger backend based on environment variable.
-    Only imports backend when actually needed.
-    """
-
-    ledger_type = os.getenv("HG_LEDGER_TYPE", "local").lower()
-    log.info(f"Initializing ledger backend: {ledger_type}")
-    
+def _build_backend(ledger_type: str) -> BaseLedger:
+    """Only imports backend when actually needed."""
     if ledger_type == "local":
         return LocalLedger()
-        
+
     elif ledger_type == "aws":
         try:
             from .ledger_aws_qldb import AWSQLDBLedger
@@ -27,7 +20,7 @@ def get_ledger() -> BaseLedger:
                 "AWS QLDB selected but pyqldb is not installed. "
                 "Install with: pip install pyqldb"
             )
-            
+
     elif ledger_type == "azure":
         try:
             from .ledger_azure import AzureConfidentialLedger
@@ -43,4 +36,20 @@ def get_ledger() -> BaseLedger:
         return ElasticsearchLedger()
 
     else:
-        raise ValueError(f"Unsupported ledger type: {ledger_type}")
\ No newline at end of file
+        raise ValueError(f"Unsupported ledger type: {ledger_type}")
+
+def get_ledger() -> BaseLedger:
+    """
+    Dynamically selects ledger backend based on environment variable.
+    A comma-separated list (e.g. "local,elasticsearch") fans out to every
+    listed backend concurrently through a CompositeLedger.
+    """
+
+    ledger_types = [t.strip() for t in os.getenv("HG_LEDGER_TYPE", "local").lower().split(",") if t.strip()]
+    log.info(f"Initializing ledger backend: {','.join(ledger_types)}")
+
+    if len(ledger_types) == 1:
+        return _build_backend(ledger_types[0])
+
+    from .ledger_composite import CompositeLedger
+    return CompositeLedger({t: _build_backend(t) for t in dict.fromkeys(ledger_types)})
@@ -0,0 +1,149 @@
+"""
+ledger_index.py
+
+Secondary indexes over the local forensic ledger. A SQLite sidecar
+("<ledger>.index.sqlite") maps src_ip, dst_ip, attack_type and timestamp to
+the logical byte offset of each record (see ledger_segments), so queries seek straight to matching lines
+instead of scanning the JSONL file.
+"""
+import os
+import json
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from .ledger_segments import iter_ledger_lines, read_lines_at
+
+log = logging.getLogger("hawkgrid-ledger-index")
+
+MAX_PAGE_SIZE = 500
+INDEXED_FIELDS = ("src_ip", "dst_ip", "attack_type")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    offset      INTEGER PRIMARY KEY,
+    ts          REAL,
+    src_ip      TEXT,
+    dst_ip      TEXT,
+    attack_type TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_src_ip ON records (src_ip, offset);
+CREATE INDEX IF NOT EXISTS idx_dst_ip ON records (dst_ip, offset);
+CREATE INDEX IF NOT EXISTS idx_attack_type ON records (attack_type, offset);
+CREATE INDEX IF NOT EXISTS idx_ts ON records (ts, offset);
+CREATE TABLE IF NOT EXISTS record_hashes (
+    hash   TEXT PRIMARY KEY,
+    offset INTEGER
+);
+"""
+
+
+def index_path_for(ledger_file: str) -> str:
+    root, _ = os.path.splitext(ledger_file)
+    return root + ".index.sqlite"
+
+
+def _index_row(offset: int, record: Dict[str, Any]) -> Tuple:
+    incident = record.get("incident") or {}
+    return (offset, record.get("timestamp"), incident.get("src_ip"),
+            incident.get("dst_ip"), incident.get("attack_type"))
+
+
+class LedgerIndex:
+    """
+    Writer side of the sidecar index. LocalLedger calls add() while holding
+    the chain lock; queries open their own read connection.
+    """
+
+    def __init__(self, ledger_file: str):
+        self.ledger_file = ledger_file
+        self.path = index_path_for(ledger_file)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._catch_up()
+
+    def _catch_up(self):
+        """Indexes records written before the index existed or while it lagged behind."""
+        # The hash table may be newer than the records table (older index files lack it)
+        last = min(self.conn.execute("SELECT COALESCE(MAX(offset), -1) FROM records").fetchone()[0],
+                   self.conn.execute("SELECT COALESCE(MAX(offset), -1) FROM record_hashes").fetchone()[0])
+        entries = []
+        for offset, line in iter_ledger_lines(self.ledger_file, max(last, 0)):
+            if offset == last or not line.strip():
+                continue
+            entries.append((offset, json.loads(line)))
+            if len(entries) >= 10000:
+                self.add(entries)
+                entries = []
+        if entries:
+            self.add(entries)
+
+    def add(self, entries: List[Tuple[int, Dict[str, Any]]]):
+        """Indexes (offset, record) pairs from one group commit in one transaction."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)",
+                                  [_index_row(offset, record) for offset, record in entries])
+            self.conn.executemany("INSERT OR REPLACE INTO record_hashes VALUES (?, ?)",
+                                  [(record["hash"], offset) for offset, record in entries if "hash" in record])
+
+    def close(self):
+        self.conn.close()
+
+
+def offset_of_hash(ledger_file: str, record_hash: str) -> Optional[int]:
+    """Logical byte offset of the record with this hash, or None if it isn't indexed."""
+    conn = sqlite3.connect(f"file:{index_path_for(ledger_file)}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT offset FROM record_hashes WHERE hash = ?", (record_hash,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def query_ledger(ledger_file: str, src_ip: str = None, dst_ip: str = None, attack_type: str = None,
+                 since: float = None, until: float = None, limit: int = 50,
+                 cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Newest-first, cursor-paginated lookup. The cursor is the byte offset of
+    the last record returned; pass it back to get the next page.
+    """
+    clauses, params = [], []
+    for field, value in zip(INDEXED_FIELDS, (src_ip, dst_ip, attack_type)):
+        if value is not None:
+            clauses.append(f"{field} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    if cursor:
+        clauses.append("offset < ?")
+        params.append(int(cursor))
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    sql = "SELECT offset FROM records"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY offset DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = sqlite3.connect(f"file:{index_path_for(ledger_file)}?mode=ro", uri=True)
+    try:
+        offsets = [row[0] for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+    has_more = len(offsets) > limit
+    offsets = offsets[:limit]
+    lines = read_lines_at(ledger_file, offsets)
+    # An offset the index has but the ledger can't serve (e.g. lost in a crash) is skipped
+    records = [json.loads(lines[offset]) for offset in offsets if offset in lines]
+
+    return {
+        "records": records,
+        "count": len(records),
+        "next_cursor": str(offsets[-1]) if has_more else None
+    }
@@ -3,69 +3,306 @@ import json
 import time
 import hashlib
 import logging
-from threading import Lock
-from typing import Dict, Any
+from threading import Lock, Thread, Timer
+from typing import Dict, Any, List, Tuple
 from .base_ledger import BaseLedger
+from .merkle import MerkleBlockLog, build_inclusion_proof
+from .ledger_index import MAX_PAGE_SIZE, LedgerIndex, offset_of_hash, query_ledger
+from .ledger_segments import (
+    load_manifest, sealed_bytes, seal_active_file, compress_segment, compress_pending_segments,
+    tail_ledger_lines
+)
 
 log = logging.getLogger("hawkgrid-ledger-local")
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 DEFAULT_PATH = os.path.join(BASE_DIR, "ledger", "forensic_audit_ledger.jsonl")
 LEDGER_FILE = os.getenv("HG_LOCAL_LEDGER_FILE", DEFAULT_PATH)
 os.makedirs(os.path.dirname(LEDGER_FILE), exist_ok=True)
+
+# fsync policy: "always" (every write), "count" (every N records),
+# "interval" (every T ms) or "none" (flush to the OS only)
+FSYNC_POLICY = os.getenv("HG_LEDGER_FSYNC", "none").lower()
+FSYNC_EVERY_RECORDS = int(os.getenv("HG_LEDGER_FSYNC_RECORDS", 100))
+FSYNC_INTERVAL_MS = float(os.getenv("HG_LEDGER_FSYNC_MS", 200))
+FSYNC_POLICIES = ("always", "count", "interval", "none")
+# Records per Merkle block; 0 keeps the plain linear chain only
+MERKLE_BLOCK_SIZE = int(os.getenv("HG_LEDGER_MERKLE_BLOCK", 0))
+# Maintain the src_ip/dst_ip/attack_type/time sidecar index on every write
+INDEX_ENABLED = os.getenv("HG_LEDGER_INDEX", "1") == "1"
+# Seal the active file into a compressed segment once it reaches this size; 0 = one growing file
+SEGMENT_BYTES = int(os.getenv("HG_LEDGER_SEGMENT_BYTES", 0))
+SEGMENT_CODEC = os.getenv("HG_LEDGER_SEGMENT_CODEC", "gzip").lower()
+
+GENESIS_HASH = "0" * 64
+_TAIL_CHUNK = 8192
 _write_lock = Lock()
+_chains: Dict[str, "_ChainFile"] = {}
 
-def _get_last_hash() -> str:
+def _get_last_hash(path: str = None) -> str:
     """Reads the last line of the file to get the previous block's hash."""
-    if not os.path.exists(LEDGER_FILE) or os.stat(LEDGER_FILE).st_size == 0:
-        return "0" * 64
+    path = path or LEDGER_FILE
+    if not os.path.exists(path) or os.stat(path).st_size == 0:
+        return GENESIS_HASH
 
     try:
-        with open(LEDGER_FILE, "rb") as f:
+        with open(path, "rb") as f:
             f.seek(0, os.SEEK_END)
             position = f.tell()
-            
+
             buffer = b""
             while position > 0:
-                position -= 1
+                step = min(_TAIL_CHUNK, position)
+                position -= step
                 f.seek(position)
-                char = f.read(1)
-                if char == b"\n" and buffer:
+                buffer = f.read(step) + buffer
+                if b"\n" in buffer.rstrip(b"\r\n"):
                     break
-                buffer = char + buffer
-            
-            last_line = buffer.decode().strip()
+
+            last_line = buffer.rstrip(b"\r\n").rsplit(b"\n", 1)[-1].decode().strip()
             if last_line:
-                return json.loads(last_line).get("hash", "0" * 64)
+                return json.loads(last_line).get("hash", GENESIS_HASH)
     except Exception as e:
         log.error(f"Error reading last hash: {e}")
-        
-    return "0" * 64
+
+    return GENESIS_HASH
 
 def _hash_entry(entry: dict) -> str:
     """Generates a SHA-256 hash of the JSON entry."""
     payload = json.dumps(entry, sort_keys=True).encode()
     return hashlib.sha256(payload).hexdigest()
 
+class _ChainFile:
+    """
+    Append handle and in-memory chain tip for one ledger file. Shared by every
+    LocalLedger pointing at the same path so the chain never forks.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        segments = load_manifest(path)
+        self.base = sealed_bytes(segments)
+        self.tip = _get_last_hash(path)
+        self.handle = open(path, "ab")
+        if os.path.getsize(path) == 0 and segments:
+            # Fresh active file: the chain continues from the last sealed segment
+            self.tip = segments[-1]["final_hash"]
+        # Logical size: sealed segments plus the active file
+        self.size = self.base + os.path.getsize(path)
+        self.segment_bytes = 0
+        self.segment_codec = "none"
+        self.active_records = 0
+        self.active_first_prev = self.tip
+        self.blocks = None
+        self.index = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.timer = None
+        log.info(f"Recovered ledger chain tip {self.tip[:12]}... from {path}")
+
+    def sync(self):
+        """fsyncs pending records. Caller must hold self.lock."""
+        if self.unsynced:
+            os.fsync(self.handle.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def enable_segments(self, segment_bytes: int, codec: str):
+        """Turns on rotation. Caller must hold self.lock."""
+        self.segment_bytes = segment_bytes
+        self.segment_codec = codec
+        self.active_records = 0
+        self.active_first_prev = self.tip
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    if self.active_records == 0:
+                        self.active_first_prev = json.loads(line).get("previous_hash", GENESIS_HASH)
+                    self.active_records += 1
+        Thread(target=compress_pending_segments, args=(self.path,), daemon=True).start()
+
+    def rotate(self):
+        """Seals the active file as a segment and starts a new one. Caller must hold self.lock."""
+        if self.active_records == 0:
+            return
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.unsynced = 0
+        self.handle.close()
+        entry = seal_active_file(self.path, self.active_records, self.active_first_prev, self.tip, self.segment_codec)
+        self.handle = open(self.path, "ab")
+        self.base = self.size
+        self.active_records = 0
+        self.active_first_prev = self.tip
+        if self.segment_codec != "none":
+            Thread(target=compress_segment, args=(self.path, entry["seq"]), daemon=True).start()
+
+    def sync_from_timer(self):
+        with self.lock:
+            self.timer = None
+            if not self.handle.closed:
+                self.sync()
+
+def _get_chain(path: str) -> _ChainFile:
+    path = os.path.abspath(path)
+    with _write_lock:
+        chain = _chains.get(path)
+        if chain is None or chain.handle.closed:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            chain = _chains[path] = _ChainFile(path)
+        return chain
+
 class LocalLedger(BaseLedger):
+    def __init__(self, ledger_file: str = None, fsync_policy: str = None,
+                 fsync_every: int = None, fsync_interval_ms: float = None,
+                 merkle_block_size: int = None, indexed: bool = None,
+                 segment_bytes: int = None, segment_codec: str = None):
+        self.ledger_file = ledger_file or LEDGER_FILE
+        self.fsync_policy = (fsync_policy or FSYNC_POLICY).lower()
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unsupported fsync policy: {self.fsync_policy}")
+        self.fsync_every = max(1, fsync_every or FSYNC_EVERY_RECORDS)
+        self.fsync_interval = (fsync_interval_ms if fsync_interval_ms is not None else FSYNC_INTERVAL_MS) / 1000.0
+        self._chain = _get_chain(self.ledger_file)
+
+        segment_bytes = SEGMENT_BYTES if segment_bytes is None else segment_bytes
+        if segment_bytes > 0:
+            codec = (segment_codec or SEGMENT_CODEC).lower()
+            if codec not in ("none", "gzip", "zstd"):
+                raise ValueError(f"Unsupported segment codec: {codec}")
+            with self._chain.lock:
+                if not self._chain.segment_bytes:
+                    self._chain.enable_segments(segment_bytes, codec)
+
+        block_size = MERKLE_BLOCK_SIZE if merkle_block_size is None else merkle_block_size
+        if block_size > 0:
+            with self._chain.lock:
+                if self._chain.blocks is None:
+                    self._chain.blocks = MerkleBlockLog(self._chain.path, block_size)
+
+        if INDEX_ENABLED if indexed is None else indexed:
+            with self._chain.lock:
+                if self._chain.index is None:
+                    self._chain.index = LedgerIndex(self._chain.path)
+
     def log_incident(self, incident: Dict[str, Any], response_action: str) -> Dict[str, Any]:
         """Appends a new hashed block to the local forensic ledger."""
-        with _write_lock:
-            prev_hash = _get_last_hash()
-
-            record = {
-                "timestamp": time.time(),
-                "incident": incident, 
-                "response_action": response_action,
-                "previous_hash": prev_hash
-            }
-            record["hash"] = _hash_entry(record)
+        return self.log_incidents([(incident, response_action)])[0]
+
+    def log_incidents(self, items: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+        """
+        Group commit: chains several incidents off the cached tip and appends
+        them with a single write. Records are identical to those produced by
+        individual log_incident calls.
+        """
+        chain = self._chain
+        with chain.lock:
+            prev_hash = chain.tip
+            records = []
+            for incident, response_action in items:
+                record = {
+                    "timestamp": time.time(),
+                    "incident": incident,
+                    "response_action": response_action,
+                    "previous_hash": prev_hash
+                }
+                record["hash"] = _hash_entry(record)
+                prev_hash = record["hash"]
+                records.append(record)
+
+            lines = [(json.dumps(r) + "\n").encode("utf-8") for r in records]
             try:
-                with open(LEDGER_FILE, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(record) + "\n")
-                    f.flush()
-                
-                log.info(f"Local forensic block appended to {LEDGER_FILE}")
-                return record
-            except Exception as e:
+                chain.handle.write(b"".join(lines))
+                chain.handle.flush()
+            except Exception:
                 log.exception("Local ledger write failed")
-                raise
\ No newline at end of file
+                # Re-read the tip so a partial write cannot fork the chain
+                chain.tip = _get_last_hash(chain.path)
+                chain.size = chain.base + os.path.getsize(chain.path)
+                raise
+
+            chain.tip = prev_hash
+            chain.unsynced += len(records)
+            offsets = []
+            for record, line in zip(records, lines):
+                offsets.append(chain.size)
+                chain.size += len(line)
+                if chain.blocks is not None:
+                    chain.blocks.add(record["hash"], chain.size)
+            if chain.index is not None:
+                try:
+                    chain.index.add(list(zip(offsets, records)))
+                except Exception:
+                    # The ledger stays authoritative; the index catches up on next start
+                    log.exception("Ledger index update failed")
+            chain.active_records += len(records)
+            if chain.segment_bytes and chain.size - chain.base >= chain.segment_bytes:
+                chain.rotate()
+            self._apply_fsync_policy(chain)
+
+        log.info(f"{len(records)} local forensic block(s) appended to {chain.path}")
+        return records
+
+    def _apply_fsync_policy(self, chain: _ChainFile):
+        if self.fsync_policy == "always":
+            chain.sync()
+        elif self.fsync_policy == "count":
+            if chain.unsynced >= self.fsync_every:
+                chain.sync()
+        elif self.fsync_policy == "interval":
+            remaining = self.fsync_interval - (time.monotonic() - chain.last_sync)
+            if remaining <= 0:
+                chain.sync()
+            elif chain.timer is None:
+                # Make sure a quiet period still gets synced within T ms
+                chain.timer = Timer(remaining, chain.sync_from_timer)
+                chain.timer.daemon = True
+                chain.timer.start()
+
+    def seal_block(self):
+        """Seals the open Merkle block early so its records become provable."""
+        chain = self._chain
+        with chain.lock:
+            if chain.blocks is None:
+                return None
+            return chain.blocks.seal(chain.size)
+
+    def get_inclusion_proof(self, record_hash: str):
+        """Merkle inclusion proof for one incident, or None if not in a sealed block."""
+        if self._chain.blocks is None:
+            raise RuntimeError("Merkle blocks are disabled (set HG_LEDGER_MERKLE_BLOCK)")
+        offset = None
+        if self._chain.index is not None:
+            # Seek straight to the record instead of scanning the ledger for it
+            offset = offset_of_hash(self._chain.path, record_hash)
+            if offset is None:
+                return None
+        return build_inclusion_proof(self._chain.path, record_hash, offset)
+
+    def query(self, **filters) -> Dict[str, Any]:
+        """Indexed lookup by src_ip, dst_ip, attack_type and time range (see query_ledger)."""
+        if self._chain.index is None:
+            raise RuntimeError("Ledger index is disabled (set HG_LEDGER_INDEX=1)")
+        return query_ledger(self._chain.path, **filters)
+
+    def tail(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """The newest `limit` records (at most MAX_PAGE_SIZE), oldest first, across sealed segments."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return [json.loads(line) for line in tail_ledger_lines(self._chain.path, limit)]
+
+    def close(self):
+        """Flushes and fsyncs everything written so far and releases the file."""
+        chain = self._chain
+        with chain.lock:
+            if chain.timer is not None:
+                chain.timer.cancel()
+                chain.timer = None
+            if not chain.handle.closed:
+                if chain.blocks is not None:
+                    chain.blocks.seal(chain.size)
+                chain.handle.flush()
+                chain.sync()
+                chain.handle.close()
+            if chain.index is not None:
+                chain.index.close()
+                chain.index = None
@@ -0,0 +1,307 @@
+"""
+ledger_segments.py
+
+Segmented storage for the local forensic ledger. The active file at
+LEDGER_FILE only ever holds the newest records; once it reaches
+HG_LEDGER_SEGMENT_BYTES it is sealed as "<ledger>.seg-NNNNNN.jsonl" with its
+final hash recorded in "<ledger>.segments.json", then compressed in the
+background (gzip, or zstd when the zstandard package is installed).
+The hash chain simply continues into the next active file.
+
+All readers address records by logical offset: the byte position in the
+uncompressed concatenation of every sealed segment followed by the active
+file. With no segments sealed this is exactly the offset in LEDGER_FILE.
+"""
+import os
+import io
+import gzip
+import json
+import shutil
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger("hawkgrid-ledger-segments")
+
+CODEC_SUFFIX = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+_manifest_lock = threading.Lock()
+
+
+def manifest_path_for(ledger_file: str) -> str:
+    root, _ = os.path.splitext(ledger_file)
+    return root + ".segments.json"
+
+
+def segment_name_for(ledger_file: str, seq: int) -> str:
+    root, _ = os.path.splitext(os.path.basename(ledger_file))
+    return f"{root}.seg-{seq:06d}.jsonl"
+
+
+def load_manifest(ledger_file: str) -> List[Dict[str, Any]]:
+    path = manifest_path_for(ledger_file)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("segments", [])
+
+
+def _save_manifest(ledger_file: str, segments: List[Dict[str, Any]]):
+    path = manifest_path_for(ledger_file)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"segments": segments}, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def sealed_bytes(segments: List[Dict[str, Any]]) -> int:
+    """Logical offset at which the active file starts."""
+    if not segments:
+        return 0
+    return segments[-1]["start_offset"] + segments[-1]["bytes"]
+
+
+def open_segment(ledger_file: str, entry: Dict[str, Any]) -> io.BufferedIOBase:
+    """Opens a sealed segment for binary reading, whichever codec it ended up in."""
+    directory = os.path.dirname(os.path.abspath(ledger_file))
+    raw_name = entry["file"][:-len(CODEC_SUFFIX[entry["codec"]])] if CODEC_SUFFIX[entry["codec"]] else entry["file"]
+    # The background compressor may swap the file between reading the manifest and opening it
+    for codec in (entry["codec"], "none", "gzip", "zstd"):
+        path = os.path.join(directory, raw_name + CODEC_SUFFIX[codec])
+        if not os.path.exists(path):
+            continue
+        if codec == "gzip":
+            return gzip.open(path, "rb")
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Segment is zstd-compressed but zstandard is not installed (pip install zstandard)")
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+        return open(path, "rb")
+    raise FileNotFoundError(f"Sealed ledger segment {entry['file']} is missing")
+
+
+def seal_active_file(ledger_file: str, records: int, first_previous_hash: str, final_hash: str,
+                     codec: str) -> Dict[str, Any]:
+    """
+    Moves the (closed) active file aside as the next sealed segment and records
+    it in the manifest. Compression happens later in compress_segment().
+    """
+    with _manifest_lock:
+        segments = load_manifest(ledger_file)
+        seq = segments[-1]["seq"] + 1 if segments else 1
+        name = segment_name_for(ledger_file, seq)
+        directory = os.path.dirname(os.path.abspath(ledger_file))
+        size = os.path.getsize(ledger_file)
+        os.replace(ledger_file, os.path.join(directory, name))
+
+        entry = {
+            "seq": seq,
+            "file": name,
+            "codec": "none",
+            "target_codec": codec,
+            "start_offset": sealed_bytes(segments),
+            "bytes": size,
+            "records": records,
+            "first_previous_hash": first_previous_hash,
+            "final_hash": final_hash
+        }
+        segments.append(entry)
+        _save_manifest(ledger_file, segments)
+    log.info(f"Sealed ledger segment {name} ({records} records, final hash {final_hash[:12]}...)")
+    return entry
+
+
+def compress_segment(ledger_file: str, seq: int):
+    """Compresses one sealed segment and points the manifest at the compressed copy."""
+    with _manifest_lock:
+        entry = next((e for e in load_manifest(ledger_file) if e["seq"] == seq), None)
+    if entry is None or entry["codec"] != "none" or entry.get("target_codec", "none") == "none":
+        return
+
+    codec = entry["target_codec"]
+    if codec == "zstd" and zstandard is None:
+        log.warning("zstandard not installed; compressing sealed segments with gzip instead.")
+        codec = "gzip"
+    directory = os.path.dirname(os.path.abspath(ledger_file))
+    raw_path = os.path.join(directory, entry["file"])
+    out_path = raw_path + CODEC_SUFFIX[codec]
+    tmp_path = out_path + ".tmp"
+
+    with open(raw_path, "rb") as src:
+        if codec == "gzip":
+            with gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        else:
+            with open(tmp_path, "wb") as raw_dst:
+                with zstandard.ZstdCompressor(level=3).stream_writer(raw_dst) as dst:
+                    shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, out_path)
+
+    with _manifest_lock:
+        segments = load_manifest(ledger_file)
+        for e in segments:
+            if e["seq"] == seq:
+                e["file"] = os.path.basename(out_path)
+                e["codec"] = codec
+                e["compressed_bytes"] = os.path.getsize(out_path)
+        _save_manifest(ledger_file, segments)
+    os.remove(raw_path)
+    log.info(f"Compressed ledger segment {entry['file']} -> {os.path.basename(out_path)}")
+
+
+def compress_pending_segments(ledger_file: str):
+    """Finishes compression that was interrupted (e.g. by a restart)."""
+    for entry in load_manifest(ledger_file):
+        if entry["codec"] == "none" and entry.get("target_codec", "none") != "none":
+            try:
+                compress_segment(ledger_file, entry["seq"])
+            except Exception:
+                log.exception(f"Compressing ledger segment {entry['file']} failed")
+
+
+def _open_active(ledger_file: str) -> Tuple[List[Dict[str, Any]], Optional[io.BufferedIOBase]]:
+    """
+    The manifest together with a handle on the active file it describes (None
+    if there is no active file yet). A seal renames the active file before
+    rewriting the manifest, so the manifest is read again after the open and
+    the pair retried if a seal slipped in between; the manifest lock rules
+    that out for readers in this process.
+    """
+    with _manifest_lock:
+        while True:
+            segments = load_manifest(ledger_file)
+            try:
+                handle = open(ledger_file, "rb")
+            except FileNotFoundError:
+                handle = None
+            if sealed_bytes(load_manifest(ledger_file)) == sealed_bytes(segments):
+                return segments, handle
+            if handle is not None:
+                handle.close()
+
+
+def iter_ledger_lines(ledger_file: str, start: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """Streams (logical_offset, raw line) pairs from `start` across all segments."""
+    segments, active = _open_active(ledger_file)
+    try:
+        for entry in segments:
+            end = entry["start_offset"] + entry["bytes"]
+            if end <= start:
+                continue
+            with open_segment(ledger_file, entry) as f:
+                offset = entry["start_offset"]
+                if start > offset:
+                    f.seek(start - offset)
+                    offset = start
+                for line in f:
+                    yield offset, line
+                    offset += len(line)
+
+        if active is None:
+            return
+        base = sealed_bytes(segments)
+        offset = base
+        if start > base:
+            active.seek(start - base)
+            offset = start
+        for line in active:
+            yield offset, line
+            offset += len(line)
+    finally:
+        if active is not None:
+            active.close()
+
+
+def iter_ledger_records(ledger_file: str) -> Iterator[Dict[str, Any]]:
+    for _, line in iter_ledger_lines(ledger_file):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _tail_lines(f: io.BufferedIOBase, limit: int, chunk: int = 65536) -> List[bytes]:
+    """Last `limit` complete lines of one file, oldest first."""
+    if not (isinstance(f, io.BufferedReader) and isinstance(f.raw, io.FileIO)):
+        # Compressed segments can't be read backwards without decompressing them anyway
+        return list(deque((line for line in f if line.strip()), maxlen=limit))
+
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    buffer = b""
+    while position > 0 and buffer.count(b"\n") <= limit:
+        step = min(chunk, position)
+        position -= step
+        f.seek(position)
+        buffer = f.read(step) + buffer
+    lines = buffer.splitlines(keepends=True)
+    if position > 0:
+        lines = lines[1:]  # starts mid-line
+    # A line without its newline is still being appended
+    return [line for line in lines if line.endswith(b"\n") and line.strip()][-limit:]
+
+
+def tail_ledger_lines(ledger_file: str, limit: int) -> List[bytes]:
+    """
+    The newest `limit` raw lines of the logical ledger, oldest first. The
+    active file is read backwards from its end and sealed segments are
+    only opened, newest first, while more lines are still needed.
+    """
+    segments, active = _open_active(ledger_file)
+    lines: List[bytes] = []
+    if active is not None:
+        with active:
+            lines = _tail_lines(active, limit)
+    for entry in reversed(segments):
+        if len(lines) >= limit:
+            break
+        with open_segment(ledger_file, entry) as f:
+            lines = _tail_lines(f, limit - len(lines)) + lines
+    return lines
+
+
+def read_range(ledger_file: str, start: int, end: int) -> bytes:
+    """Uncompressed bytes [start, end) of the logical ledger (whole lines)."""
+    chunks = []
+    for offset, line in iter_ledger_lines(ledger_file, start):
+        if offset >= end:
+            break
+        chunks.append(line)
+    return b"".join(chunks)
+
+
+def read_lines_at(ledger_file: str, offsets: Iterable[int]) -> Dict[int, bytes]:
+    """
+    Fetches the lines starting at the given logical offsets, opening each
+    segment once. Offsets past the end of the ledger are left out.
+    """
+    segments, active = _open_active(ledger_file)
+    base = sealed_bytes(segments)
+    wanted = sorted(set(offsets))
+    found: Dict[int, bytes] = {}
+    try:
+        for entry in segments:
+            end = entry["start_offset"] + entry["bytes"]
+            inside = [o for o in wanted if entry["start_offset"] <= o < end]
+            if not inside:
+                continue
+            with open_segment(ledger_file, entry) as f:
+                for offset in inside:
+                    f.seek(offset - entry["start_offset"])
+                    found[offset] = f.readline()
+
+        if active is not None:
+            for offset in (o for o in wanted if o >= base):
+                active.seek(offset - base)
+                found[offset] = active.readline()
+    finally:
+        if active is not None:
+            active.close()
+    return {offset: line for offset, line in found.items() if line.strip()}
+
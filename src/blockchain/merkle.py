@@ -0,0 +1,267 @@
+"""
+merkle.py
+
+Merkle-batched blocks on top of the local forensic ledger.
+
+Every HG_LEDGER_MERKLE_BLOCK records are sealed into a block whose header
+(Merkle root over the record hashes, logical byte range in the ledger and the
+previous header's hash) is appended to a sidecar "<ledger>.blocks.jsonl".
+Proving one incident then needs the record, its block header and
+log2(block size) sibling hashes instead of the whole chain.
+
+Usage (CLI):
+$ python -m src.blockchain.merkle prove <record_hash> [--ledger path] > proof.json
+$ python -m src.blockchain.merkle verify proof.json --block-hash <trusted block hash>
+$ python -m src.blockchain.merkle verify proof.json --ledger path
+"""
+import os
+import sys
+import json
+import time
+import bisect
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional
+from .ledger_segments import iter_ledger_lines, read_range
+
+GENESIS_HASH = "0" * 64
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _leaf_node(record_hash: str) -> bytes:
+    return hashlib.sha256(_LEAF_PREFIX + bytes.fromhex(record_hash)).digest()
+
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    # An odd node out is promoted unchanged rather than duplicated, so a
+    # block cannot be forged by repeating its last record (CVE-2012-2459).
+    parents = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(record_hashes: List[str]) -> str:
+    if not record_hashes:
+        return GENESIS_HASH
+    level = [_leaf_node(h) for h in record_hashes]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(record_hashes: List[str], index: int) -> List[Dict[str, str]]:
+    """Sibling path from leaf `index` up to the root."""
+    level = [_leaf_node(h) for h in record_hashes]
+    proof = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"side": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+        level = _next_level(level)
+    return proof
+
+
+def verify_merkle_proof(record_hash: str, proof: List[Dict[str, str]], root: str) -> bool:
+    node = _leaf_node(record_hash)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        node = _parent(sibling, node) if step["side"] == "left" else _parent(node, sibling)
+    return node.hex() == root
+
+
+def _hash_json(entry: dict) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+
+def blocks_path_for(ledger_file: str) -> str:
+    root, _ = os.path.splitext(ledger_file)
+    return root + ".blocks.jsonl"
+
+
+def read_block_headers(ledger_file: str) -> List[Dict[str, Any]]:
+    path = blocks_path_for(ledger_file)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class MerkleBlockLog:
+    """
+    Accumulates record hashes for the open block and seals full blocks into
+    the header sidecar. Not thread-safe on its own: LocalLedger calls it
+    while holding the chain lock.
+    """
+
+    def __init__(self, ledger_file: str, block_size: int):
+        self.ledger_file = ledger_file
+        self.path = blocks_path_for(ledger_file)
+        self.block_size = max(1, block_size)
+        self.height = 0
+        self.tip = GENESIS_HASH
+        self.next_record = 0
+        self.pending: List[str] = []
+        self.pending_start = 0
+        self._recover()
+
+    def _recover(self):
+        headers = read_block_headers(self.ledger_file)
+        if headers:
+            last = headers[-1]
+            self.height = last["height"] + 1
+            self.tip = last["block_hash"]
+            self.next_record = last["first_record"] + last["record_count"]
+            self.pending_start = last["end_offset"]
+
+        # Re-collect (and seal, if full) records written after the last sealed block
+        for offset, line in iter_ledger_lines(self.ledger_file, self.pending_start):
+            if line.strip():
+                self.add(json.loads(line)["hash"], offset + len(line))
+
+    def add(self, record_hash: str, end_offset: int):
+        self.pending.append(record_hash)
+        if len(self.pending) >= self.block_size:
+            self.seal(end_offset)
+
+    def seal(self, end_offset: int) -> Optional[Dict[str, Any]]:
+        if not self.pending:
+            return None
+        header = {
+            "height": self.height,
+            "timestamp": time.time(),
+            "first_record": self.next_record,
+            "record_count": len(self.pending),
+            "start_offset": self.pending_start,
+            "end_offset": end_offset,
+            "merkle_root": merkle_root(self.pending),
+            "previous_block_hash": self.tip
+        }
+        header["block_hash"] = _hash_json(header)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+
+        self.height += 1
+        self.tip = header["block_hash"]
+        self.next_record += len(self.pending)
+        self.pending = []
+        self.pending_start = end_offset
+        return header
+
+
+def verified_block_hashes(ledger_file: str) -> Dict[int, str]:
+    """
+    height -> block_hash for the local header sidecar, after checking that
+    every header hashes to its block_hash and links to the one before it
+    from genesis. Raises ValueError at the first broken link.
+    """
+    previous = GENESIS_HASH
+    hashes = {}
+    for height, header in enumerate(read_block_headers(ledger_file)):
+        header = dict(header)
+        block_hash = header.pop("block_hash")
+        if header["height"] != height or header["previous_block_hash"] != previous or _hash_json(header) != block_hash:
+            raise ValueError(f"Block header chain broken at height {height}")
+        hashes[height] = previous = block_hash
+    return hashes
+
+
+def build_inclusion_proof(ledger_file: str, record_hash: str, offset: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns a proof bundle for the record with `record_hash`, or None if it
+    is not in a sealed block (yet). `offset` is the record's logical byte
+    offset (from the ledger index); without it the ledger is scanned.
+    """
+    found_offset = offset
+    if found_offset is None:
+        needle = f'"hash": "{record_hash}"'.encode()
+        for offset, line in iter_ledger_lines(ledger_file):
+            if needle in line and json.loads(line).get("hash") == record_hash:
+                found_offset = offset
+                break
+    if found_offset is None:
+        return None
+
+    headers = read_block_headers(ledger_file)
+    pos = bisect.bisect_right([h["start_offset"] for h in headers], found_offset) - 1
+    if pos < 0 or found_offset >= headers[pos]["end_offset"]:
+        return None
+    header = headers[pos]
+
+    chunk = read_range(ledger_file, header["start_offset"], header["end_offset"])
+    records = [json.loads(line) for line in chunk.splitlines() if line.strip()]
+    leaves = [r["hash"] for r in records]
+    if record_hash not in leaves:
+        return None
+    index = leaves.index(record_hash)
+
+    return {
+        "record": records[index],
+        "leaf_index": index,
+        "proof": merkle_proof(leaves, index),
+        "block_header": header
+    }
+
+
+def verify_inclusion_proof(bundle: Dict[str, Any], trusted_block_hash: str) -> bool:
+    """
+    Offline check: record hash, Merkle path to the root and header hash.
+    The header must be the block the verifier already trusts
+    (`trusted_block_hash`, e.g. from verified_block_hashes or a published
+    tip); a bundle is never trusted on its own say-so, since a forged one
+    can be made internally consistent.
+    """
+    record = dict(bundle["record"])
+    stored = record.pop("hash")
+    if _hash_json(record) != stored:
+        return False
+
+    header = dict(bundle["block_header"])
+    block_hash = header.pop("block_hash")
+    if block_hash != trusted_block_hash or _hash_json(header) != block_hash:
+        return False
+
+    return verify_merkle_proof(stored, bundle["proof"], header["merkle_root"])
+
+
+if __name__ == "__main__":
+    from src.blockchain.ledger_local import LEDGER_FILE
+
+    parser = argparse.ArgumentParser(description="HawkGrid ledger Merkle inclusion proofs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prove = sub.add_parser("prove", help="Print an inclusion proof for a record hash")
+    prove.add_argument("record_hash")
+    prove.add_argument("--ledger", default=LEDGER_FILE)
+    verify = sub.add_parser("verify", help="Verify a proof bundle against a trusted block")
+    verify.add_argument("proof_file")
+    trust = verify.add_mutually_exclusive_group(required=True)
+    trust.add_argument("--block-hash", help="trusted hash of the block the proof claims")
+    trust.add_argument("--ledger", help="trust the verified header chain of this ledger")
+    args = parser.parse_args()
+
+    if args.command == "prove":
+        bundle = build_inclusion_proof(args.ledger, args.record_hash)
+        if bundle is None:
+            print(f"[!] {args.record_hash} not found in a sealed block.", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(bundle, indent=4))
+    else:
+        with open(args.proof_file, "r", encoding="utf-8") as f:
+            bundle = json.load(f)
+        trusted = args.block_hash
+        if trusted is None:
+            try:
+                trusted = verified_block_hashes(args.ledger).get(bundle["block_header"].get("height"))
+            except ValueError as e:
+                print(f"[!] {e}", file=sys.stderr)
+                sys.exit(1)
+        ok = trusted is not None and verify_inclusion_proof(bundle, trusted)
+        print("[*] Proof VALID" if ok else "[!] Proof INVALID")
+        sys.exit(0 if ok else 1)
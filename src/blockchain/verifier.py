@@ -0,0 +1,406 @@
+"""
+verifier.py
+
+Parallel, checkpointed verification of HawkGrid's hash-chained JSONL files:
+  - ledger:  ledger/forensic_audit_ledger.jsonl (LocalLedger, including sealed segments)
+  - events:  logs/events.log (src.orchestrator.audit)
+  - reports: reports/forensic_audit.jsonl (src.orchestrator.report_writer)
+
+The file is split into newline-aligned byte segments that are re-hashed in a
+process pool; segment boundaries are then stitched together. After a clean
+run an HMAC-signed checkpoint (<file>.checkpoint.json) records the verified
+offset and tip hash, so the next run only verifies what was appended since.
+
+Usage (CLI):
+$ python -m src.blockchain.verifier [--chain all|ledger|events|reports] [--workers N] [--full]
+"""
+import os
+import sys
+import json
+import hmac
+import time
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.blockchain.ledger_segments import load_manifest, open_segment, sealed_bytes
+
+log = logging.getLogger("hawkgrid-verifier")
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+GENESIS_HASH = "0" * 64
+MIN_SEGMENT_BYTES = int(os.getenv("HG_VERIFY_MIN_SEGMENT_BYTES", 4 * 1024 * 1024))
+CHECKPOINT_KEY_FILE = os.getenv("HG_CHECKPOINT_KEY_FILE", os.path.join(BASE_DIR, "ledger", ".checkpoint.key"))
+
+
+def _sha256_json(entry: dict) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+
+def _ledger_payload(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k != "hash"}
+
+
+def _events_payload(record: dict) -> dict:
+    return {"event": record.get("event"), "previous_hash": record.get("previous_hash")}
+
+
+def _report_payload(record: dict) -> dict:
+    return {k: v for k, v in record.items() if k != "current_hash"}
+
+
+# chain name -> (hash field, function building the hashed payload)
+CHAIN_FORMATS = {
+    "ledger": ("hash", _ledger_payload),
+    "events": ("hash", _events_payload),
+    "reports": ("current_hash", _report_payload),
+}
+
+
+def default_chain_paths() -> Dict[str, str]:
+    from src.blockchain.ledger_local import LEDGER_FILE
+    return {
+        "ledger": LEDGER_FILE,
+        "events": os.path.join(os.getcwd(), "logs", "events.log"),
+        "reports": os.path.join(os.getenv("HG_REPORT_DIR", os.path.join(os.getcwd(), "reports")), "forensic_audit.jsonl"),
+    }
+
+
+def _verify_lines(lines: Iterator[Tuple[int, bytes]], chain: str, start: int, end: int) -> Dict[str, Any]:
+    """Re-hashes every (offset, line) record and checks the links between them."""
+    hash_field, payload_fn = CHAIN_FORMATS[chain]
+    result = {"start": start, "end": end, "count": 0, "first_offset": None, "first_prev": None, "last_hash": None, "error": None}
+    prev_hash = None
+
+    for line_offset, line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            stored = record[hash_field]
+            claimed_prev = record.get("previous_hash")
+        except (ValueError, KeyError) as e:
+            result["error"] = {"offset": line_offset, "index": result["count"], "reason": f"unparseable record: {e}"}
+            return result
+
+        if result["first_offset"] is None:
+            result["first_offset"] = line_offset
+            result["first_prev"] = claimed_prev
+        elif claimed_prev != prev_hash:
+            result["error"] = {"offset": line_offset, "index": result["count"], "reason": "previous_hash does not match preceding record"}
+            return result
+        if _sha256_json(payload_fn(record)) != stored:
+            result["error"] = {"offset": line_offset, "index": result["count"], "reason": "record hash mismatch (content altered)"}
+            return result
+
+        prev_hash = stored
+        result["count"] += 1
+
+    result["last_hash"] = prev_hash
+    return result
+
+
+def _read_lines(f, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    offset = start
+    while offset < end:
+        line = f.readline()
+        if not line:
+            break
+        yield offset, line
+        offset += len(line)
+
+
+def _verify_segment(path: str, chain: str, start: int, end: int) -> Dict[str, Any]:
+    """Verifies the byte range [start, end) of a plain file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return _verify_lines(_read_lines(f, start, end), chain, start, end)
+
+
+def _verify_sealed_segment(path: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Verifies one sealed (possibly compressed) ledger segment end to end."""
+    start = entry["start_offset"]
+    end = start + entry["bytes"]
+    with open_segment(path, entry) as f:
+        result = _verify_lines(_read_lines(f, start, end), "ledger", start, end)
+    if result["error"] is None:
+        if result["last_hash"] != entry["final_hash"] or result["count"] != entry["records"]:
+            result["error"] = {"offset": start, "index": 0, "reason": f"segment {entry['file']} does not match its sealed final hash"}
+    if result["error"] is not None:
+        result["error"]["segment"] = entry["file"]
+    return result
+
+
+def _segment_bounds(path: str, start: int, end: int, segments: int) -> List[Tuple[int, int]]:
+    """Splits [start, end) into newline-aligned byte ranges."""
+    size = end - start
+    segments = max(1, min(segments, size // MIN_SEGMENT_BYTES or 1))
+    cuts = [start]
+    with open(path, "rb") as f:
+        for i in range(1, segments):
+            f.seek(start + size * i // segments)
+            f.readline()
+            pos = f.tell()
+            if cuts[-1] < pos < end:
+                cuts.append(pos)
+    cuts.append(end)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _checkpoint_key() -> bytes:
+    env_key = os.getenv("HG_CHECKPOINT_KEY")
+    if env_key:
+        return env_key.encode()
+    if not os.path.exists(CHECKPOINT_KEY_FILE):
+        os.makedirs(os.path.dirname(CHECKPOINT_KEY_FILE), exist_ok=True)
+        fd = os.open(CHECKPOINT_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.urandom(32).hex())
+    with open(CHECKPOINT_KEY_FILE, "r") as f:
+        return f.read().strip().encode()
+
+
+def _sign(body: dict) -> str:
+    return hmac.new(_checkpoint_key(), json.dumps(body, sort_keys=True).encode(), hashlib.sha256).hexdigest()
+
+
+def checkpoint_path_for(path: str) -> str:
+    return path + ".checkpoint.json"
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """Returns the checkpoint only if its signature and anchor record still hold."""
+    cp_path = checkpoint_path_for(path)
+    if not os.path.exists(cp_path):
+        return None
+    try:
+        with open(cp_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        signature = checkpoint.pop("signature")
+    except (ValueError, KeyError):
+        log.warning(f"Ignoring unreadable checkpoint {cp_path}")
+        return None
+
+    if not hmac.compare_digest(signature, _sign(checkpoint)):
+        log.warning(f"Checkpoint signature invalid for {path}; doing a full verification.")
+        return None
+    if checkpoint["offset"] > os.path.getsize(path):
+        log.warning(f"{path} is shorter than its checkpoint (truncated?); doing a full verification.")
+        return None
+    if checkpoint["offset"] > 0:
+        # The record just before the checkpoint offset must still carry the checkpointed hash
+        hash_field = CHAIN_FORMATS[checkpoint["chain"]][0]
+        with open(path, "rb") as f:
+            f.seek(max(0, checkpoint["offset"] - checkpoint["anchor_length"]))
+            anchor = f.read(checkpoint["anchor_length"])
+        try:
+            if json.loads(anchor).get(hash_field) != checkpoint["last_hash"]:
+                raise ValueError
+        except ValueError:
+            log.warning(f"Checkpoint anchor for {path} no longer matches; doing a full verification.")
+            return None
+    return checkpoint
+
+
+def write_checkpoint(path: str, chain: str, offset: int, records: int, last_hash: str, anchor_length: int):
+    body = {
+        "chain": chain,
+        "path": os.path.abspath(path),
+        "offset": offset,
+        "records": records,
+        "last_hash": last_hash,
+        "anchor_length": anchor_length,
+        "verified_at": time.time()
+    }
+    body["signature"] = _sign(body)
+    tmp = checkpoint_path_for(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(body, f, indent=4)
+    os.replace(tmp, checkpoint_path_for(path))
+
+
+def _last_line_length(path: str, end: int) -> int:
+    with open(path, "rb") as f:
+        start = max(0, end - 65536)
+        f.seek(start)
+        tail = f.read(end - start)
+    stripped = tail.rstrip(b"\r\n")
+    return len(tail) - (stripped.rfind(b"\n") + 1)
+
+
+def verify_chain(path: str, chain: str, workers: int = None, use_checkpoint: bool = True,
+                 genesis: str = GENESIS_HASH) -> Dict[str, Any]:
+    """
+    Verifies one hash-chained file. Returns a summary with the number of
+    records checked, the first broken link (if any) and throughput in MB/s.
+    `genesis` is the hash the first record must link to.
+    """
+    if chain not in CHAIN_FORMATS:
+        raise ValueError(f"Unsupported chain type: {chain}")
+    summary = {"chain": chain, "path": path, "ok": True, "records": 0, "bytes": 0,
+               "resumed_from": 0, "first_broken": None, "mb_per_s": 0.0}
+    if not os.path.exists(path):
+        summary["missing"] = True
+        return summary
+
+    end = os.path.getsize(path)
+    checkpoint = load_checkpoint(path) if use_checkpoint else None
+    start = checkpoint["offset"] if checkpoint else 0
+    expected_prev = checkpoint["last_hash"] if checkpoint else genesis
+    prior_records = checkpoint["records"] if checkpoint else 0
+    summary["resumed_from"] = start
+
+    t0 = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    bounds = _segment_bounds(path, start, end, workers) if end > start else []
+    if len(bounds) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_verify_segment, [path] * len(bounds), [chain] * len(bounds),
+                                    [b[0] for b in bounds], [b[1] for b in bounds]))
+    else:
+        results = [_verify_segment(path, chain, s, e) for s, e in bounds]
+
+    # Stitch segments: each must start from the previous segment's tip
+    index = prior_records
+    for result in results:
+        if result["first_prev"] is not None and result["first_prev"] != expected_prev:
+            result["error"] = {"offset": result["first_offset"], "index": 0, "reason": "previous_hash does not match preceding record"}
+        if result["error"] is not None:
+            summary["ok"] = False
+            summary["first_broken"] = {**result["error"], "index": index + result["error"]["index"]}
+            index += result["error"]["index"]
+            break
+        index += result["count"]
+        if result["last_hash"] is not None:
+            expected_prev = result["last_hash"]
+
+    elapsed = time.perf_counter() - t0
+    verified_bytes = (summary["first_broken"]["offset"] if summary["first_broken"] else end) - start
+    summary["records"] = index
+    summary["bytes"] = verified_bytes
+    summary["seconds"] = round(elapsed, 4)
+    summary["mb_per_s"] = round(verified_bytes / 1048576 / elapsed, 2) if elapsed > 0 else 0.0
+
+    if summary["ok"] and end > start:
+        write_checkpoint(path, chain, end, index, expected_prev, _last_line_length(path, end))
+    return summary
+
+
+def _segments_checkpoint_path(path: str) -> str:
+    return path + ".segments.checkpoint.json"
+
+
+def _load_segments_checkpoint(path: str, segments: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    cp_path = _segments_checkpoint_path(path)
+    if not os.path.exists(cp_path):
+        return None
+    try:
+        with open(cp_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        signature = checkpoint.pop("signature")
+    except (ValueError, KeyError):
+        return None
+    if not hmac.compare_digest(signature, _sign(checkpoint)):
+        log.warning(f"Segment checkpoint signature invalid for {path}; re-verifying all segments.")
+        return None
+    sealed = {e["seq"]: e for e in segments}
+    entry = sealed.get(checkpoint["seq"])
+    if entry is None or entry["final_hash"] != checkpoint["final_hash"]:
+        log.warning(f"Segment checkpoint for {path} no longer matches the manifest; re-verifying all segments.")
+        return None
+    return checkpoint
+
+
+def verify_ledger(path: str, workers: int = None, use_checkpoint: bool = True) -> Dict[str, Any]:
+    """
+    Verifies a (possibly segmented) local ledger: sealed segments are checked
+    whole and in parallel, stitched through their sealed final hashes, and
+    the active file is then verified as a continuation of the last one.
+    """
+    segments = load_manifest(path)
+    if not segments:
+        return verify_chain(path, "ledger", workers=workers, use_checkpoint=use_checkpoint)
+
+    t0 = time.perf_counter()
+    checkpoint = _load_segments_checkpoint(path, segments) if use_checkpoint else None
+    done_seq = checkpoint["seq"] if checkpoint else 0
+    expected_prev = checkpoint["final_hash"] if checkpoint else GENESIS_HASH
+    index = checkpoint["records"] if checkpoint else 0
+    pending = [e for e in segments if e["seq"] > done_seq]
+
+    workers = workers or os.cpu_count() or 1
+    if len(pending) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_verify_sealed_segment, [path] * len(pending), pending))
+    else:
+        results = [_verify_sealed_segment(path, e) for e in pending]
+
+    summary = {"chain": "ledger", "path": path, "ok": True, "records": 0, "bytes": 0,
+               "resumed_from": pending[0]["start_offset"] if pending else sealed_bytes(segments),
+               "first_broken": None, "mb_per_s": 0.0, "segments": len(segments)}
+    verified_bytes = 0
+    for entry, result in zip(pending, results):
+        if result["first_prev"] is not None and result["first_prev"] != expected_prev:
+            result["error"] = {"offset": result["first_offset"], "index": 0, "segment": entry["file"],
+                               "reason": "previous_hash does not match preceding segment"}
+        if result["error"] is not None:
+            summary["ok"] = False
+            summary["first_broken"] = {**result["error"], "index": index + result["error"]["index"]}
+            summary["records"] = index + result["error"]["index"]
+            return summary
+        index += result["count"]
+        verified_bytes += entry["bytes"]
+        expected_prev = entry["final_hash"]
+
+    if pending:
+        last = pending[-1]
+        body = {"path": os.path.abspath(path), "seq": last["seq"], "final_hash": last["final_hash"],
+                "records": index, "verified_at": time.time()}
+        body["signature"] = _sign(body)
+        with open(_segments_checkpoint_path(path), "w", encoding="utf-8") as f:
+            json.dump(body, f, indent=4)
+
+    active = verify_chain(path, "ledger", workers=workers, use_checkpoint=use_checkpoint, genesis=expected_prev)
+    elapsed = time.perf_counter() - t0
+    summary["ok"] = active["ok"]
+    summary["records"] = index + active["records"]
+    summary["bytes"] = verified_bytes + active["bytes"]
+    summary["seconds"] = round(elapsed, 4)
+    summary["mb_per_s"] = round(summary["bytes"] / 1048576 / elapsed, 2) if elapsed > 0 else 0.0
+    if active["first_broken"]:
+        summary["first_broken"] = {**active["first_broken"], "index": index + active["first_broken"]["index"]}
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Verify HawkGrid forensic hash chains")
+    parser.add_argument("--chain", default="all", choices=["all"] + list(CHAIN_FORMATS))
+    parser.add_argument("--path", help="Override the file path (single chain only)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="Ignore checkpoints and re-verify everything")
+    args = parser.parse_args()
+
+    paths = default_chain_paths()
+    chains = list(CHAIN_FORMATS) if args.chain == "all" else [args.chain]
+    if args.path and len(chains) == 1:
+        paths[chains[0]] = args.path
+
+    all_ok = True
+    for name in chains:
+        if name == "ledger":
+            result = verify_ledger(paths[name], workers=args.workers, use_checkpoint=not args.full)
+        else:
+            result = verify_chain(paths[name], name, workers=args.workers, use_checkpoint=not args.full)
+        if result.get("missing"):
+            print(f"[-] {name:<8} {paths[name]} not found, skipped.")
+            continue
+        if result["ok"]:
+            print(f"[*] {name:<8} OK      {result['records']} records, {result['bytes']} new bytes "
+                  f"from offset {result['resumed_from']} at {result['mb_per_s']} MB/s")
+        else:
+            all_ok = False
+            broken = result["first_broken"]
+            print(f"[!] {name:<8} BROKEN  record #{broken['index']} at byte {broken['offset']}: {broken['reason']}")
+    sys.exit(0 if all_ok else 1)
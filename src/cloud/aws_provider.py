@@ -1,95 +1,267 @@
 import os
+import json
+import logging
 import boto3
-from typing import Dict, List
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set
 from src.cloud.base_provider import CloudProvider
+from src.cloud.blocklist import BlockListManager
+from src.cloud.resilience import CircuitOpenError, GuardedClient, guard_for, DEFAULT_TIMEOUT_S
+
+# Inbound rule numbers HawkGrid owns; they must sort before the NACL's allow rules
+NACL_RULE_MIN = int(os.getenv("HG_NACL_RULE_MIN", 1))
+NACL_RULE_MAX = int(os.getenv("HG_NACL_RULE_MAX", 99))
+# AWS allows 20 inbound entries per NACL by default; leave room for the allow rules
+NACL_ENTRY_LIMIT = int(os.getenv("HG_NACL_ENTRY_LIMIT", 20))
+NACL_MAX_RULES = int(os.getenv("HG_NACL_MAX_RULES", 18))
+# Which deny entries HawkGrid created, per NACL; only those are ever adopted or deleted
+NACL_STATE_DIR = os.getenv("HG_NACL_STATE_DIR", os.path.join(os.getcwd(), "logs"))
+# describe_instances returns at most 1000 instances per page
+DISCOVERY_PAGE_SIZE = int(os.getenv("HG_AWS_PAGE_SIZE", 1000))
+
+log = logging.getLogger("hawkgrid-aws")
+
+# Retries and timeouts are owned by the resilience layer, so botocore must not retry on its own
+_BOTO_CONFIG = Config(connect_timeout=DEFAULT_TIMEOUT_S, read_timeout=DEFAULT_TIMEOUT_S,
+                      retries={"max_attempts": 1, "mode": "standard"})
+
+def _ec2_client(name: str, region: str) -> GuardedClient:
+    return GuardedClient(boto3.client("ec2", region_name=region, config=_BOTO_CONFIG), guard_for(name))
+
+def _managed_rules(nacl: Dict, owned: Dict[str, Dict[str, str]]) -> Dict[str, int]:
+    """
+    CIDR -> rule number for the inbound deny entries HawkGrid created on this
+    NACL. A deny rule in the same number range that isn't in the state file
+    belongs to someone else and is left alone.
+    """
+    mine = owned.get(nacl['NetworkAclId'], {})
+    return {
+        rule['CidrBlock']: rule['RuleNumber'] for rule in nacl['Entries']
+        if not rule.get('Egress') and rule.get('RuleAction') == 'deny' and 'CidrBlock' in rule
+        and NACL_RULE_MIN <= rule['RuleNumber'] <= NACL_RULE_MAX
+        and mine.get(str(rule['RuleNumber'])) == rule['CidrBlock']
+    }
 
 class AWSProvider(CloudProvider):
-    def __init__(self):
-        self.name = "aws"
-        self.region = os.getenv("AWS_REGION")
+    def __init__(self, name: str = "aws", region: str = None, client=None):
+        """
+        `client` replaces the boto3 EC2 client (e.g. the local simulator); it
+        is still wrapped in this provider's guard and covers only `region`.
+        """
+        self.name = name
+        self.region = region or os.getenv("AWS_REGION")
         if not self.region:
             raise EnvironmentError("AWS_REGION not set")
-        self.client = boto3.client("ec2", region_name=self.region)
+        if client is not None:
+            self.client = GuardedClient(client, guard_for(self.name))
+            self.clients = {self.region: self.client}
+        else:
+            self.client = _ec2_client(self.name, self.region)
+            # Discovery spans every listed region; NACL blocking stays in AWS_REGION.
+            # Each extra region has its own breaker so it can't trip the blocking path.
+            regions = [r.strip() for r in os.getenv("HG_AWS_REGIONS", self.region).split(",") if r.strip()]
+            self.clients = {r: self.client if r == self.region else _ec2_client(f"{self.name}:{r}", r) for r in regions}
+        self._private_by_public = None
+        self._region_assets: Dict[str, List[Dict]] = {}
+        self.blocklist = BlockListManager(self.name, self.sync_block_rules, NACL_MAX_RULES)
+        self._seeded = False
+        self.state_file = os.path.join(NACL_STATE_DIR, f"{self.name}_nacl_rules.json")
+        self._owned = self._load_owned()
+
+    def _load_owned(self) -> Dict[str, Dict[str, str]]:
+        """NACL id -> {rule number: CIDR} for every deny entry this provider created."""
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable NACL state file {self.state_file}; no existing rules will be adopted: {e}")
+            return {}
+
+    def _save_owned(self):
+        # Write-then-rename so a crash never leaves a half-written state file
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._owned, f)
+        os.replace(tmp, self.state_file)
 
     def discover_assets(self) -> List[Dict]:
-        response = self.client.describe_instances(
-            Filters=[
-                {"Name": "instance-state-name", "Values": ["running"]}
-            ]
-        )
-        assets = []
-        for r in response["Reservations"]:
-            for i in r["Instances"]:
-                assets.append({
-                    "public_ip": i.get("PublicIpAddress"),
-                    "private_ip": i.get("PrivateIpAddress")
-                })
+        """
+        Lists running instances in every region of HG_AWS_REGIONS at once,
+        following NextToken to the last page, and rebuilds the public ->
+        private reverse index that resolve_private_ip() answers from.
+        """
+        regions = list(self.clients)
+        with ThreadPoolExecutor(max_workers=len(regions), thread_name_prefix="hawkgrid-aws-discover") as pool:
+            futures = {region: pool.submit(self._discover_region, region) for region in regions}
+
+        errors = {}
+        for region, future in futures.items():
+            try:
+                self._region_assets[region] = future.result()
+            except Exception as e:
+                # A degraded region keeps its last known assets rather than emptying the map
+                errors[region] = e
+                log.warning(f"Discovery failed in {region}: {e}")
+        if len(errors) == len(regions):
+            raise next(iter(errors.values()))
+
+        assets = [asset for region in regions for asset in self._region_assets.get(region, [])]
+        # Swapped in whole so concurrent lookups never see a half-built index
+        self._private_by_public = {a["public_ip"]: a["private_ip"] for a in assets if a["public_ip"]}
+        return assets
 
+    def _discover_region(self, region: str) -> List[Dict]:
+        client = self.clients[region]
+        assets = []
+        kwargs = {
+            "Filters": [{"Name": "instance-state-name", "Values": ["running"]}],
+            "MaxResults": DISCOVERY_PAGE_SIZE,
+        }
+        while True:
+            response = client.describe_instances(**kwargs)
+            for r in response["Reservations"]:
+                for i in r["Instances"]:
+                    assets.append({
+                        "node_id": i.get("InstanceId"),
+                        "public_ip": i.get("PublicIpAddress"),
+                        "private_ip": i.get("PrivateIpAddress"),
+                        "region": region,
+                    })
+            token = response.get("NextToken")
+            if not token:
+                break
+            kwargs["NextToken"] = token
+        log.debug(f"{region}: {len(assets)} running instances")
         return assets
 
     def resolve_private_ip(self, public_ip: str) -> str:
-        response = self.client.describe_instances(
-            Filters=[{"Name": "ip-address", "Values": [public_ip]}]
-        )
-        for r in response["Reservations"]:
-            for i in r["Instances"]:
-                return i.get("PrivateIpAddress")
+        if self._private_by_public is None:
+            self.discover_assets()
+        return (self._private_by_public or {}).get(public_ip) or public_ip
 
-        return public_ip
+    def _seed_blocklist(self):
+        """
+        Adopts the deny rules earlier runs created (per the state file) so the
+        first sync doesn't wipe them. Other deny rules are never touched.
+        """
+        existing = set()
+        for nacl in self.client.describe_network_acls()['NetworkAcls']:
+            managed = _managed_rules(nacl, self._owned)
+            existing.update(managed)
+            foreign = [rule['RuleNumber'] for rule in nacl['Entries']
+                       if not rule.get('Egress') and rule.get('RuleAction') == 'deny'
+                       and NACL_RULE_MIN <= rule['RuleNumber'] <= NACL_RULE_MAX
+                       and rule['RuleNumber'] not in managed.values()]
+            if foreign:
+                log.info(f"{nacl['NetworkAclId']}: leaving deny rules {foreign} alone (not created by HawkGrid)")
+        self.blocklist.seed(sorted(existing))
+        self._seeded = True
 
     def block_ip(self, attacker_ip: str) -> dict:
         print(f"    [AWS-NACL] 🛡️ Action: Broadcasting block to ALL AWS Network ACLs...")
         try:
-            # 1. Fetch ALL NACLs in the region
-            nacl_response = self.client.describe_network_acls()
-            if not nacl_response['NetworkAcls']:
-                return {"status": "FAILED", "action": "NO_NACL_FOUND", "provider": "aws"}
-
-            success_count = 0
-            
-            # 2. Loop through every firewall and lock them down
-            for nacl in nacl_response['NetworkAcls']:
-                nacl_id = nacl['NetworkAclId']
-                existing_rules = nacl['Entries']
-                used_numbers = [rule['RuleNumber'] for rule in existing_rules]
-
-                # Check if already blocked on this specific firewall
-                already_blocked = False
-                for rule in existing_rules:
-                    if rule.get('CidrBlock') == f"{attacker_ip}/32" and rule.get('RuleAction') == 'deny':
-                        already_blocked = True
-                        break
-
-                if already_blocked:
-                    print(f"    [AWS-NACL] ⚡ IP {attacker_ip} already blocked in {nacl_id}. Skipping.")
-                    success_count += 1
-                    continue
-
-                # Find next available rule number
-                rule_number = 1
-                while rule_number in used_numbers:
-                    rule_number += 1
-
-                if rule_number < 32000:
-                    self.client.create_network_acl_entry(
-                        NetworkAclId=nacl_id,
-                        RuleNumber=rule_number,
-                        Protocol='-1', 
-                        RuleAction='deny',
-                        Egress=False,  
-                        CidrBlock=f"{attacker_ip}/32"
-                    )
-                    print(f"    [AWS-NACL] 🚫 DENY INBOUND: {attacker_ip} ACTIVE on {nacl_id}.")
-                    success_count += 1
-
-            if success_count > 0:
-                return {"status": "SUCCESS", "action": "GLOBAL_NACL_BLOCK", "provider": "aws"}
-            else:
-                return {"status": "FAILED", "action": "NACL_UPDATE_ERROR", "provider": "aws"}
-                
+            if not self._seeded:
+                self._seed_blocklist()
+            self.blocklist.add(attacker_ip)
+            changes = self.blocklist.sync_now()
+
+            if changes.get("nacls") == 0:
+                return {"status": "FAILED", "action": "NO_NACL_FOUND", "provider": self.name}
+            if not self.blocklist.covers(attacker_ip):
+                print(f"    [AWS-NACL] ⚠️ Rule limit reached; {attacker_ip} could not be enforced.")
+                return {"status": "FAILED", "action": "NACL_RULE_LIMIT", "provider": self.name}
+
+            print(f"    [AWS-NACL] 🚫 DENY INBOUND: {attacker_ip} ACTIVE "
+                  f"(+{changes.get('created', 0)}/-{changes.get('deleted', 0)} rules).")
+            return {"status": "SUCCESS", "action": "GLOBAL_NACL_BLOCK", "provider": self.name}
+
+        except CircuitOpenError:
+            # The IP stays in the block list; the caller decides whether to queue a retry
+            print(f"    [AWS-NACL] ⏸️ AWS circuit open; {attacker_ip} queued for the next sync.")
+            raise
         except Exception as e:
             print(f"    [AWS-NACL] ⚠️ NACL update failed: {e}")
-            return {"status": "FAILED", "action": "NACL_UPDATE_ERROR", "provider": "aws"}
+            return {"status": "FAILED", "action": "NACL_UPDATE_ERROR", "provider": self.name}
+
+    def sync_block_rules(self, desired: List[str]) -> dict:
+        """
+        Makes the managed deny entries of every NACL match `desired` with the
+        fewest create/delete calls. New covers go in before the rules they
+        replace are removed, as far as the NACL entry quota allows. CIDRs
+        that don't fit the quota are never sent and come back as "skipped".
+        """
+        nacls = self.client.describe_network_acls()['NetworkAcls']
+        desired_set = set(desired)
+        created = deleted = 0
+        skipped: Set[str] = set()
+        try:
+            for nacl in nacls:
+                c, d = self._sync_nacl(nacl, desired, desired_set, skipped)
+                created += c
+                deleted += d
+        finally:
+            # Record what was actually created / deleted, even if a call failed part-way
+            self._save_owned()
+        return {"created": created, "deleted": deleted, "nacls": len(nacls), "skipped": sorted(skipped)}
+
+    def _sync_nacl(self, nacl: Dict, desired: List[str], desired_set: Set[str], skipped: Set[str]):
+        nacl_id = nacl['NetworkAclId']
+        managed = _managed_rules(nacl, self._owned)
+        # Forget entries that are gone from the NACL (deleted by hand, or a rebuilt NACL)
+        mine = self._owned[nacl_id] = {str(number): cidr for cidr, number in managed.items()}
+        created = deleted = 0
+        to_create = [cidr for cidr in desired if cidr not in managed]
+        to_delete = [number for cidr, number in managed.items() if cidr not in desired_set]
+        inbound = [rule for rule in nacl['Entries'] if not rule.get('Egress')]
+        used = {rule['RuleNumber'] for rule in inbound}
+        free = [n for n in range(NACL_RULE_MIN, NACL_RULE_MAX + 1) if n not in used]
+        # The catch-all (*) rule doesn't count towards the entry quota;
+        # `room` is kept current through both create passes and the deletes
+        room = NACL_ENTRY_LIMIT - sum(1 for rule in inbound if rule['RuleNumber'] != 32767)
+
+        def create(cidrs):
+            for cidr in cidrs:
+                number = free.pop(0)
+                self.client.create_network_acl_entry(
+                    NetworkAclId=nacl_id,
+                    RuleNumber=number,
+                    Protocol='-1',
+                    RuleAction='deny',
+                    Egress=False,
+                    CidrBlock=cidr
+                )
+                mine[str(number)] = cidr
+            return len(cidrs)
+
+        # Create what fits before deleting, so replaced covers never leave a gap
+        fits = max(0, min(room, len(free), len(to_create)))
+        created += create(to_create[:fits])
+        room -= fits
+        for number in to_delete:
+            self.client.delete_network_acl_entry(NetworkAclId=nacl_id, RuleNumber=number, Egress=False)
+            mine.pop(str(number), None)
+            free.append(number)
+            deleted += 1
+            room += 1
+        free.sort()
+        rest = to_create[fits:]
+        fits = max(0, min(room, len(free), len(rest)))
+        if fits < len(rest):
+            print(f"    [AWS-NACL] ⚠️ {nacl_id} is at its entry quota; {len(rest) - fits} block(s) not enforced.")
+            skipped.update(rest[fits:])
+        created += create(rest[:fits])
+        return created, deleted
+
+    def list_blocked_ips(self) -> Set[str]:
+        """CIDRs denied by a managed rule on every NACL in the region (i.e. fully blocked)."""
+        nacls = self.client.describe_network_acls()['NetworkAcls']
+        if not nacls:
+            return set()
+        return set.intersection(*(set(_managed_rules(nacl, self._owned)) for nacl in nacls))
 
     def isolate_instance(self, incident: Dict) -> bool:
         print(f"[AWS] Isolating instance {incident.get('node_id')}")
@@ -1,12 +1,18 @@
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 from azure.identity import DefaultAzureCredential
 from azure.mgmt.compute import ComputeManagementClient
+from azure.mgmt.network import NetworkManagementClient
 from src.cloud.base_provider import CloudProvider
+from src.cloud.resilience import guard_for
 
 log = logging.getLogger("hawkgrid-azure")
 
+# Restrict discovery to these resource groups (comma list); empty = whole subscription
+RESOURCE_GROUPS = [g.strip() for g in os.getenv("HG_AZURE_RESOURCE_GROUPS", "").split(",") if g.strip()]
+
 class AzureProvider(CloudProvider):
     def __init__(self):
         self.name = "azure"
@@ -20,28 +26,79 @@ class AzureProvider(CloudProvider):
         log.info("Authenticating with Azure SDK...")
         credential = DefaultAzureCredential()
         self.client = ComputeManagementClient(credential, self.subscription_id)
+        self.network = NetworkManagementClient(credential, self.subscription_id)
+        self._private_by_public = None
+        self.guard = guard_for(self.name)
         log.info("Azure SDK authenticated successfully.")
 
+    def _list_scope(self, group: str = None) -> tuple:
+        """VMs, NICs and public IPs of one resource group (or the subscription), listed concurrently."""
+        if group:
+            listings = (("list_vms", lambda: self.client.virtual_machines.list(group)),
+                        ("list_nics", lambda: self.network.network_interfaces.list(group)),
+                        ("list_public_ips", lambda: self.network.public_ip_addresses.list(group)))
+        else:
+            listings = (("list_vms", self.client.virtual_machines.list_all),
+                        ("list_nics", self.network.network_interfaces.list_all),
+                        ("list_public_ips", self.network.public_ip_addresses.list_all))
+        # The SDK pagers follow next links themselves; list() drains every page under one timeout
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="hawkgrid-azure-list") as pool:
+            return tuple(pool.map(
+                lambda item: self.guard.call(item[0], lambda: list(item[1]())), listings
+            ))
+
     def discover_assets(self) -> List[Dict]:
+        """
+        Resolves every VM to its public and private IP with three bulk
+        listings per scope (VMs, NICs, public IPs) joined by resource ID,
+        instead of a NIC and public-IP lookup per VM.
+        """
         assets = []
         try:
-            # Reaches into Azure and lists all VMs in the subscription
-            for vm in self.client.virtual_machines.list_all():
-                assets.append({
-                    "node_id": vm.name,
-                    "public_ip": None, # Requires querying Azure Network Interfaces
-                    "private_ip": None,
-                    "status": "running"
-                })
+            scopes = RESOURCE_GROUPS or [None]
+            with ThreadPoolExecutor(max_workers=len(scopes), thread_name_prefix="hawkgrid-azure-discover") as pool:
+                listed = list(pool.map(self._list_scope, scopes))
         except Exception as e:
+            # A failed probe, not an empty subscription: the inventory keeps the last known assets
             log.error(f"Error discovering Azure assets: {e}")
-            # Returning an empty list signals the factory that Azure has no active targets
-            return []
-            
+            raise
+
+        # Azure resource IDs are case-insensitive, so join on lower-cased IDs
+        public_ips, nics, vms = {}, {}, []
+        for scope_vms, scope_nics, scope_pips in listed:
+            vms.extend(scope_vms)
+            public_ips.update({pip.id.lower(): pip.ip_address for pip in scope_pips})
+            nics.update({nic.id.lower(): nic for nic in scope_nics})
+
+        for vm in vms:
+            private_ip = public_ip = None
+            refs = vm.network_profile.network_interfaces if vm.network_profile else []
+            # The primary NIC and IP configuration come first
+            for ref in sorted(refs, key=lambda r: not r.primary):
+                nic = nics.get(ref.id.lower())
+                if nic is None:
+                    continue
+                for config in sorted(nic.ip_configurations or [], key=lambda c: not c.primary):
+                    private_ip = private_ip or config.private_ip_address
+                    if config.public_ip_address is not None and public_ip is None:
+                        public_ip = public_ips.get(config.public_ip_address.id.lower())
+                if private_ip and public_ip:
+                    break
+            assets.append({
+                "node_id": vm.name,
+                "public_ip": public_ip,
+                "private_ip": private_ip,
+                "region": vm.location,
+                "status": "running"
+            })
+
+        self._private_by_public = {a["public_ip"]: a["private_ip"] for a in assets if a["public_ip"]}
         return assets
 
     def resolve_private_ip(self, public_ip: str) -> str:
-        return public_ip
+        if self._private_by_public is None:
+            self.discover_assets()
+        return (self._private_by_public or {}).get(public_ip) or public_ip
 
     def block_ip(self, attacker_ip: str) -> dict:
         # Placeholder for actual Azure Network Security Group (NSG) logic
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 
 class CloudProvider(ABC):
     name: str
@@ -21,6 +21,18 @@ class CloudProvider(ABC):
         pass
 
     @abstractmethod
-    def fetch_logs(self) -> List[Dict]:
-        """Fetches recent security or flow logs from the cloud provider."""
-        pass
\ No newline at end of file
+    def fetch_logs(self, since: Optional[float] = None, **kwargs) -> List[Dict]:
+        """
+        Fetches security or flow logs from the cloud provider, newer than
+        `since` (epoch seconds) when given. Events should carry a `timestamp`
+        and, ideally, a stable `event_id` so the realtime sensor can keep its
+        watermark and drop the duplicates its overlapping re-reads return.
+        """
+        pass
+
+    def list_blocked_ips(self) -> Optional[Set[str]]:
+        """
+        Addresses or CIDRs currently denied by this provider's firewall, used
+        to reconcile the block-state cache. None means the provider can't tell.
+        """
+        return None
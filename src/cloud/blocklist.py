@@ -0,0 +1,293 @@
+"""
+blocklist.py
+
+Desired-state block lists for cloud firewalls with a hard rule limit (AWS
+NACLs allow about twenty inbound entries). Attacker IPs are recorded with a
+TTL and, on every sync, folded into the fewest CIDR blocks that stay within
+the over-block tolerance and clear of protected addresses (private ranges,
+the shield IP, HawkGrid's own assets). Only the resulting set of CIDRs is
+handed to the provider, which diffs it against the rules it actually has.
+"""
+import os
+import time
+import bisect
+import logging
+import ipaddress
+import threading
+from typing import Callable, Dict, List, Optional
+from src.cloud.resilience import CircuitOpenError
+
+log = logging.getLogger("hawkgrid-blocklist")
+
+BLOCK_TTL_S = float(os.getenv("HG_BLOCK_TTL_S", 3600))
+# Largest share of an aggregated block that may be innocent addresses (0 = exact CIDR collapsing only)
+OVERBLOCK_TOLERANCE = float(os.getenv("HG_BLOCK_OVERBLOCK", 0))
+# Never aggregate wider than this, however full the rule table gets
+MIN_PREFIX = int(os.getenv("HG_BLOCK_MIN_PREFIX", 24))
+COMPACT_INTERVAL_S = float(os.getenv("HG_BLOCK_COMPACT_S", 30))
+RESYNC_INTERVAL_S = float(os.getenv("HG_BLOCK_RESYNC_S", 300))
+# Ranges an aggregated block may never reach into, on top of HG_BLOCK_PROTECTED
+PROTECTED_RANGES = ["10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8", "169.254.0.0/16", "100.64.0.0/10"]
+
+# Protected addresses by source ("static", "shield", "inventory", ...); each source is replaced whole
+_protected_sources: Dict[str, List] = {
+    "static": [ipaddress.ip_network(c.strip(), strict=False) for c in
+               PROTECTED_RANGES + os.getenv("HG_BLOCK_PROTECTED", "").split(",") if c.strip()],
+}
+_protected_lock = threading.Lock()
+_protected_intervals = None
+
+
+def protect(source: str, addresses):
+    """
+    Declares the addresses (IPs or CIDRs) a source wants kept out of every
+    aggregated block, e.g. the shield IP or HawkGrid's own assets. Exact
+    /32 blocks are not affected; only the covers built around them are.
+    """
+    networks = []
+    for address in addresses:
+        try:
+            network = ipaddress.ip_network(address, strict=False)
+        except ValueError:
+            continue
+        if network.version == 4:
+            networks.append(network)
+    global _protected_intervals
+    with _protected_lock:
+        _protected_sources[source] = networks
+        _protected_intervals = None
+
+
+def protected_intervals():
+    """Sorted, merged (first, last) address ranges of everything protected."""
+    global _protected_intervals
+    with _protected_lock:
+        if _protected_intervals is None:
+            merged = ipaddress.collapse_addresses(n for nets in _protected_sources.values() for n in nets)
+            _protected_intervals = [(int(n.network_address), int(n.broadcast_address)) for n in merged]
+        return _protected_intervals
+
+
+def _overlaps(first: int, last: int, starts: List[int], intervals: List) -> bool:
+    i = bisect.bisect_right(starts, last) - 1
+    return i >= 0 and intervals[i][1] >= first
+
+
+def _merge_level(nets: List, level: int, accept, starts: List[int], intervals: List) -> List:
+    """
+    One bottom-up pass: every run of neighbouring nets sharing the same
+    /level supernet becomes a candidate (density, group, (first, level,
+    count), members). `accept` picks which to take; the rest stay as they are.
+    """
+    shift = 32 - level
+    groups = []
+    for net in nets:
+        if groups and net[1] > level and groups[-1][0] == net[0] >> shift:
+            groups[-1][1].append(net)
+        else:
+            groups.append((net[0] >> shift if net[1] > level else None, [net]))
+    candidates = []
+    for n, (key, members) in enumerate(groups):
+        if key is None or len(members) < 2:
+            continue
+        first = key << shift
+        if _overlaps(first, first + (1 << shift) - 1, starts, intervals):
+            continue
+        count = sum(m[2] for m in members)
+        candidates.append((count / (1 << shift), n, (first, level, count), len(members)))
+    chosen = {n: merged for n, merged in accept(candidates, len(nets))}
+    out = []
+    for n, (_, members) in enumerate(groups):
+        if n in chosen:
+            out.append(chosen[n])
+        else:
+            out.extend(members)
+    return out
+
+
+def aggregate_cidrs(blocks: Dict, max_rules: int, tolerance: float = None, min_prefix: int = None,
+                    protected: List = None) -> List:
+    """
+    blocks maps ip_network -> number of attacker addresses it stands for.
+    Returns the list of networks to deny. Exact neighbours are collapsed;
+    sibling blocks are then merged bottom-up, one prefix length at a time,
+    first wherever the merged block keeps at least (1 - tolerance) of its
+    addresses attacker-owned, then (densest first) while there are more
+    blocks than max_rules. No merge goes wider than min_prefix or reaches
+    a protected address (protected_intervals() unless given). May still
+    exceed max_rules if the attackers are too spread out; the caller
+    decides what to drop.
+    """
+    tolerance = OVERBLOCK_TOLERANCE if tolerance is None else tolerance
+    min_prefix = MIN_PREFIX if min_prefix is None else min_prefix
+    if protected is None:
+        intervals = protected_intervals()
+    else:
+        intervals = [(int(n.network_address), int(n.broadcast_address))
+                     for n in ipaddress.collapse_addresses(ipaddress.ip_network(p, strict=False) for p in protected)]
+    starts = [first for first, _ in intervals]
+
+    collapsed = sorted(ipaddress.collapse_addresses(blocks.keys()))
+    # Attribute each block's count to the collapsed net that contains it
+    firsts = [int(net.network_address) for net in collapsed]
+    counts = [0] * len(collapsed)
+    for net, count in blocks.items():
+        counts[bisect.bisect_right(firsts, int(net.network_address)) - 1] += count
+    nets = [(first, net.prefixlen, count) for first, net, count in zip(firsts, collapsed, counts)]
+
+    def within_tolerance(candidates, _):
+        return [(n, merged) for density, n, merged, _ in candidates if density >= 1.0 - tolerance]
+
+    def to_rule_limit(candidates, current):
+        taken = []
+        for density, n, merged, members in sorted(candidates, key=lambda c: -c[0]):
+            if current <= max_rules:
+                break
+            taken.append((n, merged))
+            current -= members - 1
+        return taken
+
+    for level in range(31, min_prefix - 1, -1):
+        nets = _merge_level(nets, level, within_tolerance, starts, intervals)
+    for level in range(31, min_prefix - 1, -1):
+        if len(nets) <= max_rules:
+            break
+        nets = _merge_level(nets, level, to_rule_limit, starts, intervals)
+    return [ipaddress.ip_network((first, prefixlen)) for first, prefixlen, _ in nets]
+
+
+class BlockListManager:
+    """
+    Desired block state for one provider: attacker networks with expiry
+    times. `sync` is the provider callback that makes the firewall match a
+    list of CIDR strings; it is called right after a new block and by the
+    background compactor whenever expiries change the aggregated set (or
+    every RESYNC_INTERVAL_S to repair drift).
+    """
+
+    def __init__(self, name: str, sync: Callable[[List[str]], dict], max_rules: int,
+                 ttl_s: float = None):
+        self.name = name
+        self._sync = sync
+        self.max_rules = max_rules
+        self.ttl = BLOCK_TTL_S if ttl_s is None else ttl_s
+        self._entries: Dict = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._applied: Optional[List[str]] = None
+        # Bumped on every add() and expiry; lets concurrent blocks share one sync
+        self._version = 0
+        self._synced_version = -1
+        self._last_sync = 0.0
+        self._compactor: Optional[threading.Thread] = None
+        self.on_expire: List[Callable[[str], None]] = []
+        self.stats = {"syncs": 0, "expired": 0, "dropped": 0, "created": 0, "deleted": 0}
+
+    def add(self, ip: str, ttl_s: float = None):
+        network = ipaddress.ip_network(ip)
+        if network.version != 4:
+            raise ValueError(f"Only IPv4 block lists are supported, got {ip}")
+        ttl = self.ttl if ttl_s is None else ttl_s
+        expires = time.time() + ttl if ttl > 0 else float("inf")
+        with self._lock:
+            # Re-blocking an IP extends its TTL rather than adding a rule
+            self._entries[network] = max(expires, self._entries.get(network, 0))
+            self._version += 1
+        self._start_compactor()
+
+    def seed(self, cidrs: List[str]):
+        """Adopts rules that already exist on the firewall so the first sync doesn't delete them."""
+        expires = time.time() + self.ttl if self.ttl > 0 else float("inf")
+        with self._lock:
+            for cidr in cidrs:
+                self._entries.setdefault(ipaddress.ip_network(cidr, strict=False), expires)
+
+    def expire(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            gone = [net for net, expires in self._entries.items() if expires <= now]
+            for net in gone:
+                del self._entries[net]
+            if gone:
+                # The aggregated set changed, so the next non-forced sync must not coalesce
+                self._version += 1
+        if gone:
+            self.stats["expired"] += len(gone)
+            log.info(f"{self.name}: {len(gone)} block(s) reached their TTL")
+            for net in gone:
+                for callback in self.on_expire:
+                    callback(str(net.network_address) if net.num_addresses == 1 else str(net))
+        return [str(net) for net in gone]
+
+    def desired_rules(self) -> List[str]:
+        with self._lock:
+            entries = dict(self._entries)
+        blocks = {net: net.num_addresses for net in entries}
+        nets = aggregate_cidrs(blocks, self.max_rules)
+        if len(nets) > self.max_rules:
+            # Still too spread out: keep the blocks that will live longest
+            firsts = [int(n.network_address) for n in nets]
+            expiry = dict.fromkeys(nets, 0.0)
+            for net, expires in entries.items():
+                cover = nets[bisect.bisect_right(firsts, int(net.network_address)) - 1]
+                expiry[cover] = max(expiry[cover], expires)
+            nets = sorted(nets, key=lambda n: expiry[n], reverse=True)[:self.max_rules]
+            self.stats["dropped"] += len(expiry) - len(nets)
+            log.warning(f"{self.name}: rule limit {self.max_rules} reached; oldest blocks not enforced")
+        return sorted(str(n) for n in nets)
+
+    def covers(self, ip: str) -> bool:
+        """True if the last applied rule set denies this address."""
+        address = ipaddress.ip_address(ip)
+        return any(address in ipaddress.ip_network(cidr) for cidr in self._applied or [])
+
+    def sync_now(self, force: bool = False) -> dict:
+        """
+        Pushes the current desired rule set if it changed since the last sync
+        (or when forced). Callers that queued behind a sync which already
+        included their add() return without another round of cloud calls.
+        """
+        wanted = self._version
+        with self._sync_lock:
+            if not force and self._synced_version >= wanted:
+                return {"created": 0, "deleted": 0, "coalesced": True}
+            with self._lock:
+                version = self._version
+            desired = self.desired_rules()
+            if not force and desired == self._applied:
+                self._synced_version = version
+                return {"created": 0, "deleted": 0}
+            result = self._sync(desired)
+            # CIDRs the provider couldn't fit are not enforced, so covers() mustn't claim them
+            skipped = set(result.get("skipped", ()))
+            self._applied = [cidr for cidr in desired if cidr not in skipped]
+            self._synced_version = version
+            self._last_sync = time.time()
+            self.stats["syncs"] += 1
+            self.stats["created"] += result.get("created", 0)
+            self.stats["deleted"] += result.get("deleted", 0)
+            return result
+
+    def _start_compactor(self):
+        with self._lock:
+            if self._compactor is not None or COMPACT_INTERVAL_S <= 0:
+                return
+            self._compactor = threading.Thread(target=self._compact_loop, name=f"hawkgrid-blocklist-{self.name}", daemon=True)
+        self._compactor.start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(COMPACT_INTERVAL_S)
+            try:
+                self.expire()
+                self.sync_now(force=time.time() - self._last_sync >= RESYNC_INTERVAL_S)
+            except CircuitOpenError as e:
+                # Pending blocks stay in the desired set and go out once the breaker recovers
+                log.info(f"{self.name}: sync postponed ({e})")
+            except Exception:
+                log.exception(f"{self.name}: block-list compaction failed")
+
+    def metrics(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {**self.stats, "entries": entries, "rules": len(self._applied or [])}
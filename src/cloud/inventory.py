@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from src.cloud.base_provider import CloudProvider
+from src.cloud.blocklist import protect
+from src.cloud.provider_factory import discover_all
+
+log = logging.getLogger("hawkgrid-inventory")
+
+REFRESH_INTERVAL_S = float(os.getenv("HG_INVENTORY_REFRESH_S", 60))
+# Assets from a cloud that keeps failing discovery are dropped after this long
+ASSET_TTL_S = float(os.getenv("HG_INVENTORY_TTL_S", 600))
+
+class AssetInventory:
+    """
+    In-memory map of public IP -> asset, refreshed by a background thread.
+    Each refresh builds a complete new snapshot off to the side and swaps it
+    in with one assignment, so readers always see a whole map and never wait
+    on a cloud API. A cloud whose discovery fails keeps its last known
+    assets until they are ASSET_TTL_S old.
+    """
+
+    def __init__(self, providers: Dict[str, CloudProvider]):
+        self.providers = providers
+        self._snapshot: Dict[str, Dict] = {}
+        self._seen: Dict[str, float] = {}
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"refreshes": 0, "added": 0, "removed": 0, "changed": 0, "last_refresh": None,
+                      "last_refresh_ms": None, "stale_providers": []}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """The current map; treat it as read-only, a refresh replaces it wholesale."""
+        return self._snapshot
+
+    def resolve(self, public_ip: str) -> Optional[Dict]:
+        return self._snapshot.get(public_ip)
+
+    def seed(self, discovered: Dict[str, List[Dict]]):
+        """Installs assets a caller already discovered (e.g. the startup probe)."""
+        with self._refresh_lock:
+            self._apply(discovered)
+
+    def refresh(self):
+        with self._refresh_lock:
+            start = time.perf_counter()
+            discovered = discover_all(self.providers)
+            self._apply(discovered)
+            self.stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def _apply(self, discovered: Dict[str, List[Dict]]):
+        now = time.time()
+        current = self._snapshot
+        fresh: Dict[str, Dict] = {}
+
+        for name, assets in discovered.items():
+            self._seen[name] = now
+            for asset in assets:
+                pub = asset.get("public_ip")
+                # We only strictly need the public IP for the dashboard!
+                if not pub:
+                    continue
+                fresh[pub] = {
+                    "private_ip": asset.get("private_ip") or "unknown-internal",
+                    "node_id": asset.get("node_id"),
+                    "provider": self.providers.get(name),
+                    "provider_name": name,
+                }
+
+        # Clouds that didn't answer this round keep their previous assets until the TTL runs out
+        stale = [name for name in self.providers if name not in discovered]
+        for name in stale:
+            if now - self._seen.get(name, now) > ASSET_TTL_S:
+                continue
+            for pub, entry in current.items():
+                if entry["provider_name"] == name:
+                    fresh.setdefault(pub, entry)
+
+        added = fresh.keys() - current.keys()
+        removed = current.keys() - fresh.keys()
+        changed = [
+            pub for pub in fresh.keys() & current.keys()
+            if (fresh[pub]["private_ip"], fresh[pub]["provider_name"]) != (current[pub]["private_ip"], current[pub]["provider_name"])
+        ]
+        # Unchanged entries keep their identity, so the swap is a pure diff
+        for pub in fresh.keys() & current.keys():
+            if pub not in changed:
+                fresh[pub] = current[pub]
+
+        self._snapshot = fresh
+        # Aggregated firewall blocks must never reach our own assets
+        protect("inventory", fresh.keys())
+        self.stats["refreshes"] += 1
+        self.stats["added"] += len(added)
+        self.stats["removed"] += len(removed)
+        self.stats["changed"] += len(changed)
+        self.stats["last_refresh"] = now
+        self.stats["stale_providers"] = stale
+        if added or removed or changed:
+            log.info(f"Asset inventory: +{len(added)} -{len(removed)} ~{len(changed)} ({len(fresh)} assets)")
+
+    def request_refresh(self):
+        """Asks the background thread for an early refresh without waiting for it."""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None or REFRESH_INTERVAL_S <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="hawkgrid-inventory", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(REFRESH_INTERVAL_S)
+            self._wake.clear()
+            if self._stopped:
+                return
+            try:
+                self.refresh()
+            except Exception:
+                log.exception("Asset inventory refresh failed")
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def metrics(self) -> Dict:
+        return {**self.stats, "assets": len(self._snapshot)}
@@ -0,0 +1,190 @@
+"""
+localsim_provider.py
+
+An offline stand-in for a cloud account, for load-testing the response path
+without credentials. SimulatedEC2Client implements just the slice of the
+boto3 EC2 API that AWSProvider uses (instances and network ACLs) over an
+in-memory model with per-call latency, random failures, API throttling and
+the NACL rule limit. LocalSimProvider is AWSProvider wired to that client,
+so block lists, CIDR aggregation and rule diffing run exactly as they would
+against AWS.
+
+Select it with CLOUD_PROVIDER=localsim. Tuning (all optional):
+    HG_SIM_ASSETS        running instances to simulate        (5)
+    HG_SIM_NACLS         network ACLs                         (2)
+    HG_SIM_RULE_LIMIT    inbound entries allowed per NACL     (20)
+    HG_SIM_LATENCY       fixed:MS | uniform:LO:HI | lognormal:MEDIAN_MS:SIGMA   (lognormal:40:0.5)
+    HG_SIM_ERROR_RATE    share of calls failing with InternalError   (0)
+    HG_SIM_THROTTLE_RPS  API calls per second before RequestLimitExceeded (0 = unlimited)
+    HG_SIM_SEED          RNG seed for reproducible runs
+"""
+import os
+import math
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from src.cloud.aws_provider import AWSProvider
+
+log = logging.getLogger("hawkgrid-localsim")
+
+
+class SimulatedAPIError(Exception):
+    """Shaped like botocore's ClientError so callers can read response['Error']['Code']."""
+
+    def __init__(self, code: str, message: str, operation: str):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+        self.operation_name = operation
+
+
+def parse_latency(spec: str):
+    """Returns a function producing one latency sample in seconds."""
+    kind, *args = spec.split(":")
+    values = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000.0
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class SimulatedEC2Client:
+    def __init__(self, assets: int = 5, nacls: int = 2, rule_limit: int = 20, latency: str = "lognormal:40:0.5",
+                 error_rate: float = 0.0, throttle_rps: float = 0.0, seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+        self._latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rule_limit = rule_limit
+        self.throttle_rps = throttle_rps
+        self._tokens = throttle_rps
+        self._refilled = time.monotonic()
+        # Re-entrant: rule-table checks raise through _error() while holding it
+        self._lock = threading.RLock()
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+        self.instances = [
+            {
+                "InstanceId": f"i-sim{n:012x}",
+                "State": {"Name": "running"},
+                "PublicIpAddress": f"198.51.{100 + n // 250}.{10 + n % 250}",
+                "PrivateIpAddress": f"10.0.{n // 250}.{10 + n % 250}",
+            }
+            for n in range(assets)
+        ]
+        self.nacls = [
+            {
+                "NetworkAclId": f"acl-sim{n:08x}",
+                "Entries": [
+                    {"RuleNumber": 100, "Protocol": "-1", "RuleAction": "allow", "Egress": False, "CidrBlock": "0.0.0.0/0"},
+                    {"RuleNumber": 32767, "Protocol": "-1", "RuleAction": "deny", "Egress": False, "CidrBlock": "0.0.0.0/0"},
+                    {"RuleNumber": 100, "Protocol": "-1", "RuleAction": "allow", "Egress": True, "CidrBlock": "0.0.0.0/0"},
+                ],
+            }
+            for n in range(nacls)
+        ]
+
+    def _call(self, operation: str):
+        """Latency, throttling and random failures shared by every simulated API call."""
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            delay = self._latency(self._rng)
+            fail = self._rng.random() < self.error_rate
+            throttled = False
+            if self.throttle_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.throttle_rps, self._tokens + (now - self._refilled) * self.throttle_rps)
+                self._refilled = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                else:
+                    throttled = True
+
+        if throttled:
+            self._error(operation, "RequestLimitExceeded", "Request limit exceeded.")
+        time.sleep(delay)
+        if fail:
+            self._error(operation, "InternalError", "An internal error has occurred.")
+
+    def _error(self, operation: str, code: str, message: str):
+        with self._lock:
+            self.errors[code] = self.errors.get(code, 0) + 1
+        raise SimulatedAPIError(code, message, operation)
+
+    def describe_instances(self, Filters: List[Dict] = None, MaxResults: int = 1000, NextToken: str = None,
+                           **kwargs) -> Dict:
+        self._call("DescribeInstances")
+        instances = self.instances
+        for f in Filters or []:
+            if f["Name"] == "instance-state-name":
+                instances = [i for i in instances if i["State"]["Name"] in f["Values"]]
+            elif f["Name"] == "ip-address":
+                instances = [i for i in instances if i["PublicIpAddress"] in f["Values"]]
+        # Paged like the real API: the token is just the offset of the next page
+        start = int(NextToken or 0)
+        page = instances[start:start + MaxResults]
+        response = {"Reservations": [{"Instances": [dict(i) for i in page]}] if page else []}
+        if start + MaxResults < len(instances):
+            response["NextToken"] = str(start + MaxResults)
+        return response
+
+    def describe_network_acls(self, **kwargs) -> Dict:
+        self._call("DescribeNetworkAcls")
+        with self._lock:
+            return {"NetworkAcls": [
+                {"NetworkAclId": n["NetworkAclId"], "Entries": [dict(e) for e in n["Entries"]]} for n in self.nacls
+            ]}
+
+    def _nacl(self, operation: str, nacl_id: str) -> Dict:
+        for nacl in self.nacls:
+            if nacl["NetworkAclId"] == nacl_id:
+                return nacl
+        self._error(operation, "InvalidNetworkAclID.NotFound", f"The network ACL '{nacl_id}' does not exist")
+
+    def create_network_acl_entry(self, NetworkAclId: str, RuleNumber: int, Protocol: str, RuleAction: str,
+                                 Egress: bool, CidrBlock: str, **kwargs):
+        operation = "CreateNetworkAclEntry"
+        self._call(operation)
+        with self._lock:
+            nacl = self._nacl(operation, NetworkAclId)
+            same_direction = [e for e in nacl["Entries"] if e["Egress"] == Egress and e["RuleNumber"] != 32767]
+            if any(e["RuleNumber"] == RuleNumber for e in same_direction):
+                self._error(operation, "NetworkAclEntryAlreadyExists", f"Rule {RuleNumber} already exists")
+            if len(same_direction) >= self.rule_limit:
+                self._error(operation, "NetworkAclEntryLimitExceeded", "The maximum number of network ACL entries has been reached.")
+            nacl["Entries"].append({"RuleNumber": RuleNumber, "Protocol": Protocol, "RuleAction": RuleAction,
+                                    "Egress": Egress, "CidrBlock": CidrBlock})
+        return {}
+
+    def delete_network_acl_entry(self, NetworkAclId: str, RuleNumber: int, Egress: bool, **kwargs):
+        operation = "DeleteNetworkAclEntry"
+        self._call(operation)
+        with self._lock:
+            nacl = self._nacl(operation, NetworkAclId)
+            before = len(nacl["Entries"])
+            nacl["Entries"] = [e for e in nacl["Entries"] if not (e["RuleNumber"] == RuleNumber and e["Egress"] == Egress)]
+            if len(nacl["Entries"]) == before:
+                self._error(operation, "InvalidNetworkAclEntry.NotFound", f"Rule {RuleNumber} does not exist")
+        return {}
+
+
+class LocalSimProvider(AWSProvider):
+    def __init__(self, name: str = "localsim", client: SimulatedEC2Client = None):
+        seed = os.getenv("HG_SIM_SEED")
+        client = client or SimulatedEC2Client(
+            assets=int(os.getenv("HG_SIM_ASSETS", 5)),
+            nacls=int(os.getenv("HG_SIM_NACLS", 2)),
+            rule_limit=int(os.getenv("HG_SIM_RULE_LIMIT", 20)),
+            latency=os.getenv("HG_SIM_LATENCY", "lognormal:40:0.5"),
+            error_rate=float(os.getenv("HG_SIM_ERROR_RATE", 0)),
+            throttle_rps=float(os.getenv("HG_SIM_THROTTLE_RPS", 0)),
+            seed=int(seed) if seed else None,
+        )
+        super().__init__(name=name, region="sim-local-1", client=client)
+        log.info(f"Simulated cloud '{name}' ready ({len(self.client.instances)} assets, {len(self.client.nacls)} NACLs).")
@@ -1,10 +1,13 @@
 import os
 import logging
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
 from src.cloud.base_provider import CloudProvider
 
 log = logging.getLogger("hawkgrid-provider")
 
+PROBE_TIMEOUT_S = float(os.getenv("HG_PROVIDER_PROBE_TIMEOUT_S", 15))
+
 def _aws_ready():
     return (
         bool(os.getenv("AWS_REGION")) and
@@ -20,49 +23,101 @@ def _azure_ready():
         bool(os.getenv("AZURE_TENANT_ID"))
     )
 
-def get_cloud_providers() -> Dict[str, CloudProvider]:
-    providers = {}
-    
+def _probe_aws():
+    from src.cloud.aws_provider import AWSProvider
+    aws = AWSProvider()
+    return aws, aws.discover_assets() # Reach into AWS and count VMs
+
+def _probe_azure():
+    from src.cloud.azure_provider import AzureProvider
+    az = AzureProvider()
+    return az, az.discover_assets() # Reach into Azure and count VMs
+
+def _probe_localsim():
+    # Simulated cloud (offline benchmarking, no credentials needed)
+    from src.cloud.localsim_provider import LocalSimProvider
+    sim = LocalSimProvider()
+    return sim, sim.discover_assets()
+
+# name -> (credentials check, probe); probes run concurrently
+_PROBES = {
+    "aws": (_aws_ready, _probe_aws),
+    "azure": (_azure_ready, _probe_azure),
+    "localsim": (lambda: True, _probe_localsim),
+}
+
+_LABELS = {"aws": ("AWS", "EC2 instances"), "azure": ("Azure", "VMs"), "localsim": ("Simulated cloud", "simulated instances")}
+
+def discover_all(providers: Dict[str, CloudProvider], timeout: float = None) -> Dict[str, List[Dict]]:
+    """
+    Runs discover_assets() on every provider at once. Providers that fail or
+    miss the deadline are left out of the result rather than holding it up.
+    """
+    timeout = PROBE_TIMEOUT_S if timeout is None else timeout
+    if not providers:
+        return {}
+    pool = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="hawkgrid-discover")
+    futures = {pool.submit(provider.discover_assets): name for name, provider in providers.items()}
+    done, pending = wait(futures, timeout=timeout)
+    pool.shutdown(wait=False)
+
+    results = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            log.error(f"Asset discovery failed for {name}: {e}")
+    for future in pending:
+        log.error(f"Asset discovery for {futures[future]} timed out after {timeout}s")
+    return results
+
+def get_cloud_providers_with_assets() -> Tuple[Dict[str, CloudProvider], Dict[str, List[Dict]]]:
+    """
+    Probes every requested cloud concurrently (HG_PROVIDER_PROBE_TIMEOUT_S
+    each) and returns the live providers together with the assets the probe
+    discovered, so callers can seed their caches without a second pass.
+    """
+    providers, discovered = {}, {}
+
     # Check which clouds the user actually wants to monitor
     requested_clouds = [c.strip() for c in os.getenv("CLOUD_PROVIDER", "aws,azure").lower().split(",")]
     log.info(f"Checking live status for requested clouds: {requested_clouds}")
 
-    # 1. Probe AWS
-    if "aws" in requested_clouds and _aws_ready():
-        try:
-            from src.cloud.aws_provider import AWSProvider
-            aws = AWSProvider()
-            assets = aws.discover_assets() # Reach into AWS and count VMs
-            
-            # 🚨 THE CRITICAL CHECK: Only add AWS if servers are actually running
-            if assets: 
-                providers[aws.name] = aws
-                log.info(f"AWS is UP. Discovered {len(assets)} active EC2 instances.")
-            else:
-                log.warning("AWS keys found, but ZERO running instances. AWS defense bypassed.")
-        except Exception as e:
-            log.error(f"AWS probe failed (Check connection or keys): {e}")
+    probes = {name: probe for name, (ready, probe) in _PROBES.items() if name in requested_clouds and ready()}
+    if probes:
+        pool = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="hawkgrid-probe")
+        futures = {pool.submit(probe): name for name, probe in probes.items()}
+        done, pending = wait(futures, timeout=PROBE_TIMEOUT_S)
+        # A hung SDK call keeps its thread; startup doesn't wait for it
+        pool.shutdown(wait=False)
 
-    # 2. Probe Azure
-    if "azure" in requested_clouds and _azure_ready():
-        try:
-            from src.cloud.azure_provider import AzureProvider
-            az = AzureProvider()
-            assets = az.discover_assets() # Reach into Azure and count VMs
-            
-            # 🚨 THE CRITICAL CHECK: Only add Azure if servers are actually running
-            if assets: 
-                providers[az.name] = az
-                log.info(f"Azure is UP. Discovered {len(assets)} active VMs.")
+        for future, name in futures.items():
+            label, unit = _LABELS[name]
+            if future in pending:
+                log.error(f"{label} probe timed out after {PROBE_TIMEOUT_S}s. {label} defense bypassed.")
+                continue
+            try:
+                provider, assets = future.result()
+            except Exception as e:
+                log.error(f"{label} probe failed (Check connection or keys): {e}")
+                continue
+
+            # 🚨 THE CRITICAL CHECK: Only add a cloud if servers are actually running
+            if assets:
+                providers[provider.name] = provider
+                discovered[provider.name] = assets
+                log.info(f"{label} is UP. Discovered {len(assets)} active {unit}.")
             else:
-                log.warning("Azure keys found, but ZERO running VMs. Azure defense bypassed.")
-        except Exception as e:
-            log.error(f"Azure probe failed: {e}")
+                log.warning(f"{label} keys found, but ZERO running {unit}. {label} defense bypassed.")
 
-    # 3. Final Verification
+    # Final Verification
     if not providers:
         log.critical("HawkGrid is running blind! No active servers found on any cloud.")
     else:
         log.info(f"Mesh Defense Active for: {list(providers.keys())}")
-        
-    return providers
\ No newline at end of file
+
+    return providers, discovered
+
+def get_cloud_providers() -> Dict[str, CloudProvider]:
+    return get_cloud_providers_with_assets()[0]
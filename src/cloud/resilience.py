@@ -0,0 +1,281 @@
+"""
+resilience.py
+
+Shared failure policy for cloud SDK calls. Every call made through a
+CloudGuard gets a per-operation timeout, jittered exponential retries for
+throttling and server-side errors (paid for out of a retry budget so a
+struggling cloud isn't hit with a retry storm), and a circuit breaker that
+fails fast once a cloud keeps timing out or erroring. Actions refused by an
+open breaker can be deferred; they are replayed once the breaker lets calls
+through again.
+
+Tuning (all optional):
+    HG_CLOUD_TIMEOUT_S[_OPERATION]   per-attempt timeout, e.g. HG_CLOUD_TIMEOUT_S_DESCRIBE_INSTANCES=20   (10)
+    HG_CLOUD_RETRIES                 attempts after the first                 (3)
+    HG_CLOUD_BACKOFF_MS              first backoff, doubled per attempt       (100)
+    HG_CLOUD_BACKOFF_MAX_MS          backoff ceiling                          (2000)
+    HG_CLOUD_RETRY_RATIO             retry tokens earned per call             (0.2)
+    HG_CLOUD_RETRY_BURST             retry tokens held at most                (10)
+    HG_CLOUD_BREAKER_FAILURES        consecutive failures that open a breaker (5)
+    HG_CLOUD_BREAKER_RESET_S         open time before a probe call is allowed (30)
+    HG_CLOUD_MAX_INFLIGHT            concurrent calls per guard               (8)
+"""
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Hashable, Optional
+
+log = logging.getLogger("hawkgrid-resilience")
+
+DEFAULT_TIMEOUT_S = float(os.getenv("HG_CLOUD_TIMEOUT_S", 10))
+MAX_RETRIES = int(os.getenv("HG_CLOUD_RETRIES", 3))
+BACKOFF_MS = float(os.getenv("HG_CLOUD_BACKOFF_MS", 100))
+BACKOFF_MAX_MS = float(os.getenv("HG_CLOUD_BACKOFF_MAX_MS", 2000))
+RETRY_RATIO = float(os.getenv("HG_CLOUD_RETRY_RATIO", 0.2))
+RETRY_BURST = float(os.getenv("HG_CLOUD_RETRY_BURST", 10))
+BREAKER_FAILURES = int(os.getenv("HG_CLOUD_BREAKER_FAILURES", 5))
+BREAKER_RESET_S = float(os.getenv("HG_CLOUD_BREAKER_RESET_S", 30))
+MAX_INFLIGHT = int(os.getenv("HG_CLOUD_MAX_INFLIGHT", 8))
+
+# Error codes worth retrying: throttling and the cloud's own failures
+RETRYABLE_CODES = {
+    "RequestLimitExceeded", "Throttling", "ThrottlingException", "TooManyRequests",
+    "InternalError", "InternalFailure", "ServiceUnavailable", "Unavailable", "RequestTimeout",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the cloud while its breaker is open."""
+
+    def __init__(self, guard: "CloudGuard", operation: str):
+        super().__init__(f"Circuit open for {guard.name} ({operation}); retry in {guard.breaker.retry_in():.1f}s")
+        self.guard = guard
+
+
+class OperationTimeout(TimeoutError):
+    pass
+
+
+def error_code(exc: Exception) -> Optional[str]:
+    """The service error code of a botocore-style or Azure exception, if it carries one."""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code")
+    status = getattr(exc, "status_code", None)
+    return str(status) if status is not None else None
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (OperationTimeout, ConnectionError)):
+        return True
+    code = error_code(exc)
+    if code is None:
+        return False
+    # Azure reports HTTP statuses rather than error codes
+    return code in RETRYABLE_CODES or code == "429" or code.startswith("5")
+
+
+def operation_timeout(operation: str) -> float:
+    return float(os.getenv(f"HG_CLOUD_TIMEOUT_S_{operation.upper()}", DEFAULT_TIMEOUT_S))
+
+
+class RetryBudget:
+    """
+    Token bucket for retries: every call earns RETRY_RATIO of a token and
+    every retry spends one, so retries stay a bounded share of traffic.
+    """
+
+    def __init__(self, ratio: float = RETRY_RATIO, burst: float = RETRY_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """closed -> open after BREAKER_FAILURES failures in a row; open -> half_open
+    after BREAKER_RESET_S, letting one probe through; the probe closes or reopens it."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.threshold = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                log.info("Circuit closed after a successful probe")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_s - (time.monotonic() - self.opened_at))
+
+
+class CloudGuard:
+    """Breaker, retry budget and call pool for one cloud endpoint (provider or region)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker()
+        self.budget = RetryBudget()
+        self._pool = ThreadPoolExecutor(max_workers=MAX_INFLIGHT, thread_name_prefix=f"hawkgrid-cloud-{name}")
+        self._deferred: Dict[Hashable, Callable[[], object]] = {}
+        self._deferred_lock = threading.Lock()
+        self._drainer: Optional[threading.Thread] = None
+        self.stats = {"calls": 0, "failures": 0, "retries": 0, "timeouts": 0, "short_circuited": 0,
+                      "budget_exhausted": 0, "opened": 0, "deferred": 0, "replayed": 0}
+
+    def call(self, operation: str, fn: Callable, *args, **kwargs):
+        timeout = operation_timeout(operation)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(self, operation)
+            self.stats["calls"] += 1
+            self.budget.deposit()
+            try:
+                result = self._attempt(operation, timeout, fn, args, kwargs)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # The cloud answered; a bad request says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self.stats["failures"] += 1
+                if self.breaker.record_failure():
+                    self.stats["opened"] += 1
+                    log.warning(f"Circuit opened for {self.name} after {operation} failed: {e}")
+                    raise
+                if attempt >= MAX_RETRIES:
+                    raise
+                if not self.budget.withdraw():
+                    self.stats["budget_exhausted"] += 1
+                    raise
+                # Full jitter keeps retries from many callers from arriving in lockstep
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_MS, BACKOFF_MS * 2 ** attempt)) / 1000.0)
+                attempt += 1
+                self.stats["retries"] += 1
+
+    def _attempt(self, operation: str, timeout: float, fn: Callable, args, kwargs):
+        future = self._pool.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # A call that never started is dropped; one already running is abandoned
+            future.cancel()
+            self.stats["timeouts"] += 1
+            raise OperationTimeout(f"{self.name} {operation} timed out after {timeout}s")
+
+    def defer(self, key: Hashable, action: Callable[[], object]):
+        """Queues an action refused by the open breaker; the latest action per key wins."""
+        with self._deferred_lock:
+            self._deferred[key] = action
+            self.stats["deferred"] += 1
+            if self._drainer is None:
+                self._drainer = threading.Thread(target=self._drain, name=f"hawkgrid-deferred-{self.name}", daemon=True)
+                self._drainer.start()
+
+    def _drain(self):
+        while True:
+            time.sleep(max(0.5, self.breaker.retry_in()))
+            with self._deferred_lock:
+                if not self._deferred:
+                    self._drainer = None
+                    return
+                key = next(iter(self._deferred))
+                action = self._deferred.pop(key)
+            try:
+                action()
+                self.stats["replayed"] += 1
+            except CircuitOpenError:
+                # Still down: put it back (unless a newer action replaced it)
+                with self._deferred_lock:
+                    self._deferred.setdefault(key, action)
+            except Exception as e:
+                log.error(f"Deferred action {key} on {self.name} failed: {e}")
+
+    def metrics(self) -> Dict:
+        with self._deferred_lock:
+            pending = len(self._deferred)
+        return {**self.stats, "state": self.breaker.state, "consecutive_failures": self.breaker.failures,
+                "retry_in_s": round(self.breaker.retry_in(), 1), "retry_tokens": round(self.budget.tokens, 1),
+                "pending": pending}
+
+
+class GuardedClient:
+    """
+    Wraps an SDK client so every method call goes through a CloudGuard,
+    using the method name as the operation. Other attributes pass through.
+    """
+
+    def __init__(self, client, guard: CloudGuard):
+        self._client = client
+        self.guard = guard
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        return lambda *args, **kwargs: self.guard.call(name, attr, *args, **kwargs)
+
+
+GUARDS: Dict[str, CloudGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+def guard_for(name: str) -> CloudGuard:
+    with _GUARDS_LOCK:
+        guard = GUARDS.get(name)
+        if guard is None:
+            guard = GUARDS[name] = CloudGuard(name)
+        return guard
+
+
+def breaker_states() -> Dict[str, Dict]:
+    return {name: guard.metrics() for name, guard in list(GUARDS.items())}
@@ -7,9 +7,9 @@ import logging
 import joblib
 import pandas as pd
 import requests
-import csv
-from typing import Optional
+from typing import List, Optional
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 from fastapi import FastAPI, HTTPException, Request
@@ -18,11 +18,15 @@ from pydantic import BaseModel, Field, ConfigDict
 
 # Cloud & Response Imports
 from src.orchestrator.playbook import execute_playbook
-from src.orchestrator.detector import detect_event
-from src.orchestrator.report_writer import build_report, append_report
+from src.orchestrator.detector import detect_event, detect_batch
+from src.orchestrator.persistence import WriteBehindQueue
 from src.blockchain.ledger_factory import get_ledger
-from src.cloud.provider_factory import get_cloud_providers
+from src.cloud.provider_factory import get_cloud_providers_with_assets
+from src.cloud.inventory import AssetInventory
+from src.cloud.resilience import breaker_states
+from src.cloud.blocklist import protect
 from src.response.hive_mind import execute_cross_cloud_quarantine, execute_standard_block
+from src.response.block_cache import BLOCK_CACHE
 
 # Azure Imports (Uncomment when you have Azure keys)
 # from azure.monitor.query import LogsQueryClient
@@ -32,70 +36,59 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("hawkgrid-api")
 
 MODEL_PATH = os.getenv("HG_MODEL_PATH", "src/ml/hawkgrid_pipeline.joblib")
-IP_MAPPING_CACHE = {}
-
-def log_mttr_to_csv(attack_type: str, attacker_ip: str, mttr_seconds: float):
-    os.makedirs('reports', exist_ok=True)
-    file_path = 'reports/mttr_logs.csv'
-    file_exists = os.path.isfile(file_path)
-    with open(file_path, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        if not file_exists:
-            writer.writerow(['Attack_Type', 'Attacker_IP', 'MTTR_Seconds'])
-        writer.writerow([attack_type, attacker_ip, round(mttr_seconds, 4)])
-
-def refresh_asset_cache(app: FastAPI):
-    global IP_MAPPING_CACHE
-    IP_MAPPING_CACHE = {}
-    providers = getattr(app.state, "providers", {})
-    
-    print(f"\n[*] Rebuilding Asset Cache. Active Providers: {list(providers.keys())}")
-    
-    for name, provider in providers.items():
-        try:
-            assets = provider.discover_assets()
-            print(f"    -> {name.upper()} returned {len(assets)} raw assets: {assets}")
-            
-            for asset in assets:
-                pub = asset.get("public_ip")
-                priv = asset.get("private_ip", "unknown-internal")
-                
-                # We only strictly need the public IP for the dashboard!
-                if pub:
-                    IP_MAPPING_CACHE[pub] = {"private_ip": priv, "provider": provider}
-                    print(f"    ✅ Cached successfully: {pub} ({name.upper()})")
-                else:
-                    print(f"    ❌ Skipped: Asset missing Public IP -> {asset}")
-        except Exception as e:
-            log.error(f"Asset discovery failed for {name}: {e}")
-
 def resolve_asset(public_ip: str):
-    return IP_MAPPING_CACHE.get(public_ip, {"private_ip": public_ip, "provider": None})
+    """Served from the in-memory inventory snapshot; never calls a cloud API."""
+    asset = app.state.inventory.resolve(public_ip)
+    if asset is None:
+        return {"private_ip": public_ip, "provider": None}
+    return asset
+
+def discover_public_ip() -> str:
+    # 🚨 HAWKGRID SHIELD: Discover Presenter's IP
+    try:
+        print("[*] Discovering Current Network Public IP for Whitelisting...")
+        host_public_ip = requests.get('https://api.ipify.org', timeout=5).text.strip()
+        print(f"[*] 🛡️ HawkGrid Shield Active: Will not block current network ({host_public_ip})")
+        return host_public_ip
+    except Exception as e:
+        print(f"[!] Warning: Could not determine Public IP. Defaulting to localhost.")
+        return "127.0.0.1"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.providers = get_cloud_providers()
+    # Cold start: the shield lookup runs alongside the (concurrent) cloud probes
+    startup_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hawkgrid-startup")
+    public_ip = startup_pool.submit(discover_public_ip)
+
+    app.state.providers, discovered = get_cloud_providers_with_assets()
     app.state.ledger = get_ledger()
+    app.state.persistence = WriteBehindQueue(app.state.ledger)
+    app.state.persistence.start()
     try:
         app.state.model = joblib.load(MODEL_PATH)
         log.info("ML pipeline loaded.")
     except Exception as e:
         log.error(f"ML load failed: {e}")
 
-    refresh_asset_cache(app)
-    
-    # 🚨 HAWKGRID SHIELD: Discover Presenter's IP
-    try:
-        print("[*] Discovering Current Network Public IP for Whitelisting...")
-        host_public_ip = requests.get('https://api.ipify.org', timeout=5).text.strip()
-        app.state.whitelisted_ip = host_public_ip
-        print(f"[*] 🛡️ HawkGrid Shield Active: Will not block current network ({host_public_ip})")
-    except Exception as e:
-        print(f"[!] Warning: Could not determine Public IP. Defaulting to localhost.")
-        app.state.whitelisted_ip = "127.0.0.1"
+    # Seed from the probe's discovery instead of asking every cloud again
+    app.state.inventory = AssetInventory(app.state.providers)
+    app.state.inventory.seed(discovered)
+    app.state.inventory.start()
+    print(f"\n[*] Asset inventory seeded with {len(app.state.inventory.snapshot())} assets from {list(discovered.keys())}")
+    BLOCK_CACHE.start_reconciler(app.state.providers)
+
+    app.state.whitelisted_ip = public_ip.result()
+    # The shield covers aggregated CIDR blocks too, not just exact matches
+    protect("shield", [app.state.whitelisted_ip])
+    startup_pool.shutdown()
         
     yield
     log.info("Shutting down.")
+    app.state.inventory.stop()
+    BLOCK_CACHE.stop()
+    app.state.persistence.close()
+    if hasattr(app.state.ledger, "close"):
+        app.state.ledger.close()
 
 app = FastAPI(title="HawkGrid Detection Core", version="2.5", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
@@ -111,73 +104,192 @@ class LogFeatures(BaseModel):
     cloud_provider: str = "unknown"
     timestamp: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+def _respond_to_detection(payload: LogFeatures, detection: dict, detect_seconds: float = 0.0) -> dict:
+    """
+    Runs mitigation, MTTR, ledger and report bookkeeping for one scored
+    event. MTTR runs from when this event's response starts, plus the
+    `detect_seconds` spent scoring it.
+    """
+    start_time = time.time() - detect_seconds
+    resolved = resolve_asset(payload.dst_ip)
+    incident_data = payload.model_dump()
+    incident_data["node_id"] = resolved["private_ip"]
+    provider = resolved["provider"]
+
+    incident_data.update({
+        "anomaly_score": detection.get("anomaly_score", 0.0),
+        "attack_type": detection.get("attack_type", "NORMAL"),
+        "severity": detection.get("severity", "LOW"),
+        "owasp_risk_score": detection.get("owasp_risk_score", 0),
+        "raw_event": payload.model_dump()
+    })
+
+    response_action_status = "NORMAL_TRAFFIC"
+    response_action = {"action": "NONE", "status": "NO_ACTION"}
+    mttr_row = None
+
+    if detection.get("is_anomaly") and incident_data["attack_type"] != "NORMAL" and provider:
+        risk_score = detection.get("owasp_risk_score", 0)
+        
+        # 🚨 Pass the Shield IP to both mitigation strategies!
+        if risk_score >= 4:
+            response_action = execute_cross_cloud_quarantine(
+                incident_data, provider.name, app.state.providers, app.state.whitelisted_ip
+            )
+        else:
+            response_action = execute_standard_block(
+                incident_data, provider.name, app.state.providers, app.state.whitelisted_ip
+            )
+        
+        response_action_status = response_action.get("status", "FAILED")
+        mttr_seconds = time.time() - start_time
+        mttr_row = (incident_data['attack_type'], payload.src_ip, mttr_seconds, response_action.get("timings"))
+        print(f"\n[METRIC] ⚡ MTTR for {incident_data['attack_type']} from {payload.src_ip}: {mttr_seconds:.4f} seconds\n")
+
+    # Ledger, forensic report and MTTR writes are group-committed off the request path
+    app.state.persistence.submit(
+        incident_data, response_action_status, payload.model_dump(), detection, response_action, mttr_row
+    )
+
+    return {"detection": detection, "response": response_action}
+
 @app.post("/api/detect")
 def detect_anomaly(payload: LogFeatures):
     try:
         start_time = time.time()
-        resolved = resolve_asset(payload.dst_ip)
-        incident_data = payload.model_dump()
-        incident_data["node_id"] = resolved["private_ip"]
-        provider = resolved["provider"]
-
         df = pd.DataFrame([payload.model_dump()])
         detection = detect_event(df)
-        
-        incident_data.update({
-            "anomaly_score": detection.get("anomaly_score", 0.0),
-            "attack_type": detection.get("attack_type", "NORMAL"),
-            "severity": detection.get("severity", "LOW"),
-            "owasp_risk_score": detection.get("owasp_risk_score", 0),
-            "raw_event": payload.model_dump()
-        })
-
-        response_action_status = "NORMAL_TRAFFIC"
-        response_action = {"action": "NONE", "status": "NO_ACTION"}
-        mttr_recorded = False
-
-        if detection.get("is_anomaly") and incident_data["attack_type"] != "NORMAL" and provider:
-            risk_score = detection.get("owasp_risk_score", 0)
-            
-            # 🚨 Pass the Shield IP to both mitigation strategies!
-            if risk_score >= 4:
-                response_action = execute_cross_cloud_quarantine(
-                    incident_data, provider.name, app.state.providers, app.state.whitelisted_ip
-                )
-            else:
-                response_action = execute_standard_block(
-                    incident_data, provider.name, app.state.providers, app.state.whitelisted_ip
-                )
-            
-            response_action_status = response_action.get("status", "FAILED")
-            mttr_seconds = time.time() - start_time
-            mttr_recorded = True
-
-        if mttr_recorded:
-            print(f"\n[METRIC] ⚡ MTTR for {incident_data['attack_type']} from {payload.src_ip}: {mttr_seconds:.4f} seconds\n")
-            log_mttr_to_csv(incident_data['attack_type'], payload.src_ip, mttr_seconds)
-
-        app.state.ledger.log_incident(incident_data, response_action_status)
-        report = build_report(payload.model_dump(), detection, response_action)
-        append_report(report)
-
-        return {"detection": detection, "response": response_action}
+        return _respond_to_detection(payload, detection, time.time() - start_time)
     except Exception as e:
         log.exception("Detection failure")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/detect/batch")
+def detect_anomaly_batch(payloads: List[LogFeatures]):
+    """
+    Scores a whole list of sensor windows with one pandas/scaler/model pass.
+    Volumetric (Route 1) and UNSW f_* (Route 2) events may be mixed; results
+    come back in the same order as the request body. Each result carries
+    its own status, so one failed response doesn't hide which of the other
+    events were already mitigated.
+    """
+    if not payloads:
+        return {"count": 0, "failed": 0, "results": []}
+    try:
+        start_time = time.time()
+        df = pd.DataFrame([p.model_dump() for p in payloads])
+        detections = detect_batch(df)
+        detect_seconds = time.time() - start_time
+    except Exception as e:
+        # Nothing has been mitigated yet, so the whole batch can be retried
+        log.exception("Batch detection failure")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for payload, detection in zip(payloads, detections):
+        try:
+            results.append({"status": "ok", **_respond_to_detection(payload, detection, detect_seconds)})
+        except Exception as e:
+            log.exception(f"Response failed for event from {payload.src_ip} to {payload.dst_ip}")
+            results.append({"status": "error", "error": str(e), "detection": detection})
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {"count": len(results), "failed": failed, "results": results}
+
+@app.get("/api/metrics/persistence")
+def persistence_metrics(request: Request):
+    return request.app.state.persistence.metrics()
+
+@app.get("/api/metrics/ledger")
+def ledger_metrics(request: Request):
+    """Per-backend queue depth, retries and timeouts when fanning out to several ledgers."""
+    ledger = request.app.state.ledger
+    if not hasattr(ledger, "metrics"):
+        return {"backends": None}
+    return {"backends": ledger.metrics()}
+
+@app.get("/api/metrics/blocks")
+def block_cache_metrics(request: Request):
+    """Block-state cache counters plus each provider's firewall block list (rules, expiries, syncs)."""
+    blocklists = {
+        name: provider.blocklist.metrics()
+        for name, provider in request.app.state.providers.items() if hasattr(provider, "blocklist")
+    }
+    return {**BLOCK_CACHE.metrics(), "blocklists": blocklists}
+
+@app.get("/api/metrics/cloud")
+def cloud_metrics():
+    """Circuit-breaker state, retries, timeouts and deferred actions per cloud endpoint."""
+    return {"guards": breaker_states()}
+
+@app.get("/api/ledger/proof/{record_hash}")
+def ledger_inclusion_proof(record_hash: str, request: Request):
+    """Merkle inclusion proof for one ledger record, verifiable offline with src.blockchain.merkle."""
+    ledger = request.app.state.ledger
+    if not hasattr(ledger, "get_inclusion_proof"):
+        raise HTTPException(status_code=501, detail="Active ledger backend does not support inclusion proofs")
+    try:
+        bundle = ledger.get_inclusion_proof(record_hash)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="Record not found in a sealed block")
+    return bundle
+
+@app.get("/api/ledger/receipt/{receipt_id}")
+def ledger_receipt(receipt_id: str, request: Request):
+    """Resolves a receipt returned by a batching remote ledger (QLDB / Azure) to its commit state."""
+    ledger = request.app.state.ledger
+    if not hasattr(ledger, "resolve_receipt"):
+        raise HTTPException(status_code=501, detail="Active ledger backend does not issue receipts")
+    try:
+        receipt = ledger.resolve_receipt(receipt_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if receipt is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired receipt")
+    return receipt
+
+@app.get("/api/ledger/query")
+def ledger_query(request: Request, src_ip: Optional[str] = None, dst_ip: Optional[str] = None,
+                 attack_type: Optional[str] = None, since: Optional[float] = None,
+                 until: Optional[float] = None, limit: int = 50, cursor: Optional[str] = None):
+    """Index-backed ledger search, newest first. Pass next_cursor back to page."""
+    ledger = request.app.state.ledger
+    if not hasattr(ledger, "query"):
+        raise HTTPException(status_code=501, detail="Active ledger backend does not support indexed queries")
+    try:
+        return ledger.query(src_ip=src_ip, dst_ip=dst_ip, attack_type=attack_type,
+                            since=since, until=until, limit=limit, cursor=cursor)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/api/ledger/tail")
+def ledger_tail(request: Request, limit: int = 100):
+    """Newest ledger records, oldest first, read back from the end of the segmented ledger."""
+    ledger = request.app.state.ledger
+    if not hasattr(ledger, "tail"):
+        raise HTTPException(status_code=501, detail="Active ledger backend does not support tailing")
+    try:
+        return ledger.tail(limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
 @app.get("/status")
 def status(request: Request):
-    global IP_MAPPING_CACHE
+    inventory = request.app.state.inventory
+    snapshot = inventory.snapshot()
     
-    # Auto-Heal: If React asks for IPs but the cache is empty, scan AWS again!
-    if not IP_MAPPING_CACHE:
-        print("\n[*] Dashboard requested status, but cache is empty! Auto-healing...")
-        refresh_asset_cache(request.app)
+    # Auto-Heal: If React asks for IPs but the cache is empty, rescan in the background
+    if not snapshot:
+        print("\n[*] Dashboard requested status, but inventory is empty! Requesting a background refresh...")
+        inventory.request_refresh()
 
     asset_list = []
     
-    for pub_ip, info in IP_MAPPING_CACHE.items():
-        provider_name = info["provider"].name if info["provider"] else "unknown"
+    for pub_ip, info in snapshot.items():
+        provider_name = info["provider_name"] or "unknown"
         asset_list.append({
             "ip": pub_ip,
             "provider": provider_name.upper(),
@@ -193,6 +305,10 @@ def status(request: Request):
         "assets": asset_list
     }
 
+@app.get("/api/metrics/inventory")
+def inventory_metrics(request: Request):
+    return request.app.state.inventory.metrics()
+
 
 if __name__ == "__main__":
     import uvicorn
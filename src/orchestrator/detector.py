@@ -1,4 +1,5 @@
 import joblib
+import numpy as np
 import pandas as pd
 from src.ml.preprocess import preprocess_security_logs
 
@@ -36,6 +37,22 @@ def get_owasp_metrics(attack_label: str):
     }
     return mapping.get(attack_label, {"score": 1, "severity": "LOW", "action": "NONE"})
 
+def _build_detection(attack_name: str, anomaly_score: float):
+    metrics = get_owasp_metrics(attack_name)
+    return {
+        "is_anomaly": bool(attack_name != "NORMAL"),
+        "anomaly_score": anomaly_score,
+        "attack_type": attack_name,
+        "owasp_risk_score": metrics["score"],
+        "severity": metrics["severity"],
+        "recommended_action": metrics["action"]
+    }
+
+def _numeric_column(raw_df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in raw_df.columns:
+        return np.zeros(len(raw_df))
+    return pd.to_numeric(raw_df[name], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
 def detect_event(raw_df: pd.DataFrame):
     
     # ---------------------------------------------------------
@@ -55,16 +72,7 @@ def detect_event(raw_df: pd.DataFrame):
         else:
             attack_name = "NORMAL"
 
-        metrics = get_owasp_metrics(attack_name)
-        
-        return {
-            "is_anomaly": bool(attack_name != "NORMAL"),
-            "anomaly_score": 0.99 if attack_name != "NORMAL" else 0.0,
-            "attack_type": attack_name,
-            "owasp_risk_score": metrics["score"],
-            "severity": metrics["severity"],
-            "recommended_action": metrics["action"]
-        }
+        return _build_detection(attack_name, 0.99 if attack_name != "NORMAL" else 0.0)
 
     # ---------------------------------------------------------
     # ROUTE 2: DEEP PACKET INSPECTION (Simulated ML - 44 features)
@@ -77,15 +85,54 @@ def detect_event(raw_df: pd.DataFrame):
         numeric_label = le.inverse_transform([rf_pred_id])[0]
         attack_name = UNSW_MAPPING.get(float(numeric_label), "NORMAL")
         
-        is_anomaly = bool(attack_name != "NORMAL")
         iso_score = float(abs(iso.decision_function(scaled)[0]))
-        metrics = get_owasp_metrics(attack_name)
-
-        return {
-            "is_anomaly": is_anomaly,
-            "anomaly_score": iso_score,
-            "attack_type": attack_name,
-            "owasp_risk_score": metrics["score"],
-            "severity": metrics["severity"],
-            "recommended_action": metrics["action"]
-        }
\ No newline at end of file
+        return _build_detection(attack_name, iso_score)
+
+def detect_batch(raw_df: pd.DataFrame):
+    """
+    Scores every row of raw_df in one vectorized pass and returns the
+    detections in row order. Rows carrying UNSW features (f_*) go through
+    the ML route, the rest through the volumetric rules, exactly as
+    detect_event would score them one by one.
+    """
+    if raw_df.empty:
+        return []
+
+    raw_df = raw_df.reset_index(drop=True)
+    if "f_0" in raw_df.columns:
+        ml_mask = raw_df["f_0"].notna().to_numpy()
+    else:
+        ml_mask = np.zeros(len(raw_df), dtype=bool)
+
+    attack_names = np.empty(len(raw_df), dtype=object)
+    anomaly_scores = np.zeros(len(raw_df))
+
+    # ROUTE 1: LIVE SENSOR (Volumetric Traffic - 3 features)
+    volumetric = ~ml_mask
+    if volumetric.any():
+        vol_df = raw_df[volumetric]
+        api_freq = _numeric_column(vol_df, "API_Call_Freq")
+        failed_auth = _numeric_column(vol_df, "Failed_Auth_Count")
+        egress = _numeric_column(vol_df, "Network_Egress_MB")
+
+        names = np.select(
+            [failed_auth >= 1.0, (api_freq >= 80.0) | (egress > 5.0), api_freq >= 10.0],
+            ["BRUTE_FORCE", "DOS", "RECONNAISSANCE"],
+            default="NORMAL"
+        )
+        attack_names[volumetric] = names
+        anomaly_scores[volumetric] = np.where(names != "NORMAL", 0.99, 0.0)
+
+    # ROUTE 2: DEEP PACKET INSPECTION (Simulated ML - 44 features)
+    if ml_mask.any():
+        aligned = preprocess_security_logs(raw_df[ml_mask], features)
+        scaled = scaler.transform(aligned)
+
+        numeric_labels = le.inverse_transform(rf.predict(scaled))
+        attack_names[ml_mask] = [UNSW_MAPPING.get(float(label), "NORMAL") for label in numeric_labels]
+        anomaly_scores[ml_mask] = np.abs(iso.decision_function(scaled))
+
+    return [
+        _build_detection(str(name), float(score))
+        for name, score in zip(attack_names, anomaly_scores)
+    ]
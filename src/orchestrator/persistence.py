@@ -0,0 +1,332 @@
+import os
+import csv
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.orchestrator.report_writer import build_report, append_report
+
+log = logging.getLogger("hawkgrid-persistence")
+
+MTTR_FILE = os.path.join("reports", "mttr_logs.csv")
+
+# "enqueue": acknowledge as soon as the record is queued (lowest latency)
+# "flush":   acknowledge only once the writer has committed the record
+PERSIST_MODE = os.getenv("HG_PERSIST_MODE", "enqueue").lower()
+QUEUE_SIZE = int(os.getenv("HG_PERSIST_QUEUE_SIZE", 10000))
+BATCH_SIZE = int(os.getenv("HG_PERSIST_BATCH_SIZE", 256))
+FLUSH_INTERVAL_MS = float(os.getenv("HG_PERSIST_FLUSH_MS", 50))
+FLUSH_TIMEOUT = float(os.getenv("HG_PERSIST_FLUSH_TIMEOUT", 10))
+# A sink write that fails is retried in later batches this many times before the record is dead-lettered
+PERSIST_RETRIES = int(os.getenv("HG_PERSIST_RETRIES", 3))
+DEAD_LETTER_FILE = os.getenv("HG_PERSIST_DEAD_LETTER", os.path.join("logs", "persistence_dead_letter.jsonl"))
+
+_STOP = object()
+
+
+MTTR_HEADER = ['Attack_Type', 'Attacker_IP', 'MTTR_Seconds', 'Provider_Timings']
+_mttr_header_checked = False
+
+
+def format_provider_timings(timings: Optional[Dict[str, Dict[str, Any]]]) -> str:
+    """{"aws": {"elapsed_s": 0.41, "outcome": "OK"}, ...} -> "aws=0.4100;azure=5.0000(TIMEOUT)"."""
+    if not timings:
+        return ""
+    parts = []
+    for provider, timing in timings.items():
+        part = f"{provider}={timing['elapsed_s']:.4f}"
+        if timing.get("outcome", "OK") != "OK":
+            part += f"({timing['outcome']})"
+        parts.append(part)
+    return ";".join(parts)
+
+
+def _upgrade_mttr_header():
+    """Older logs only have three columns; widen the header so the new column lines up."""
+    with open(MTTR_FILE, newline='') as file:
+        header = file.readline()
+        if 'Provider_Timings' in header:
+            return
+        rest = file.read()
+    tmp = MTTR_FILE + ".tmp"
+    with open(tmp, mode='w', newline='') as file:
+        csv.writer(file).writerow(MTTR_HEADER)
+        file.write(rest)
+    os.replace(tmp, MTTR_FILE)
+
+
+def log_mttr_rows_to_csv(rows: List[tuple]):
+    """
+    Appends several (attack_type, attacker_ip, mttr_seconds[, provider_timings])
+    rows with one open/write.
+    """
+    os.makedirs(os.path.dirname(MTTR_FILE), exist_ok=True)
+    global _mttr_header_checked
+    file_exists = os.path.isfile(MTTR_FILE)
+    if file_exists and not _mttr_header_checked:
+        _upgrade_mttr_header()
+    _mttr_header_checked = True
+    with open(MTTR_FILE, mode='a', newline='') as file:
+        writer = csv.writer(file)
+        if not file_exists:
+            writer.writerow(MTTR_HEADER)
+        writer.writerows(
+            [row[0], row[1], round(row[2], 4), format_provider_timings(row[3] if len(row) > 3 else None)]
+            for row in rows
+        )
+
+
+class _PendingRecord:
+    __slots__ = ("incident", "status", "raw_event", "detection", "response", "mttr", "done", "error",
+                 "pending", "attempts", "last_error")
+
+    def __init__(self, incident, status, raw_event, detection, response, mttr, wait):
+        self.incident = incident
+        self.status = status
+        self.raw_event = raw_event
+        self.detection = detection
+        self.response = response
+        self.mttr = mttr
+        self.done = threading.Event() if wait else None
+        self.error: Optional[Exception] = None
+        # Sinks this record still has to reach; each one succeeds or fails on its own
+        self.pending = {"ledger", "report", "mttr"} if mttr else {"ledger", "report"}
+        self.attempts = 0
+        self.last_error: Optional[Exception] = None
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-process queue that takes ledger, forensic report and MTTR
+    writes off the request path. A single background writer drains it and
+    group-commits records in batches, which also keeps the ledger and report
+    hash chains in submission order.
+    """
+
+    def __init__(self, ledger, mode: str = PERSIST_MODE, max_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, flush_interval_ms: float = FLUSH_INTERVAL_MS):
+        if mode not in ("enqueue", "flush"):
+            raise ValueError(f"Unsupported persistence mode: {mode}")
+
+        self.ledger = ledger
+        self.mode = mode
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size)
+        self._thread: Optional[threading.Thread] = None
+        # Guards _closed so nothing is queued behind the stop marker
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "failed": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="hawkgrid-write-behind", daemon=True)
+        self._thread.start()
+        log.info(f"Write-behind persistence started (mode={self.mode}, batch={self.batch_size}).")
+
+    def submit(self, incident: Dict[str, Any], status: str, raw_event: Dict[str, Any],
+               detection: Dict[str, Any], response: Dict[str, Any],
+               mttr: Optional[tuple] = None):
+        """
+        Queues one incident's ledger entry, forensic report and optional MTTR row.
+        Blocks while the queue is full (back-pressure). In "flush" mode it also
+        waits until the batch containing the record has been committed.
+        Raises straight away once the queue has been closed.
+        """
+        record = _PendingRecord(incident, status, raw_event, detection, response, mttr, self.mode == "flush")
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            self._queue.put(record)
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+
+        if record.done is not None:
+            if not record.done.wait(FLUSH_TIMEOUT):
+                raise TimeoutError("Write-behind flush did not complete in time")
+            if record.error is not None:
+                raise RuntimeError(f"Persistence failed: {record.error}")
+
+    def close(self, timeout: Optional[float] = None):
+        """Stops accepting work and drains everything already queued."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if not self._thread:
+                return
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            log.error(f"Write-behind drain timed out with {self._queue.qsize()} records pending.")
+        else:
+            log.info("Write-behind queue drained.")
+        self._thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats.pop("batches")
+        total_ms = stats.pop("total_flush_ms")
+        return {
+            "mode": self.mode,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "batches": batches,
+            "avg_flush_ms": round(total_ms / batches, 3) if batches else 0.0,
+            **stats,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Drain anything that raced in behind the stop marker, and retries requeued while draining
+        while True:
+            leftovers = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftovers.append(item)
+            if not leftovers:
+                break
+            for i in range(0, len(leftovers), self.batch_size):
+                self._flush(leftovers[i:i + self.batch_size])
+
+    def _commit_ledger(self, batch: List[_PendingRecord]):
+        """Uses the backend's group commit when it has one, else one write per record."""
+        log_incidents = getattr(self.ledger, "log_incidents", None)
+        if log_incidents is not None:
+            try:
+                log_incidents([(record.incident, record.status) for record in batch])
+            except Exception as e:
+                log.exception("Write-behind ledger batch failed")
+                for record in batch:
+                    record.last_error = e
+                return
+            for record in batch:
+                record.pending.discard("ledger")
+            return
+
+        for record in batch:
+            try:
+                self.ledger.log_incident(record.incident, record.status)
+                record.pending.discard("ledger")
+            except Exception as e:
+                log.exception("Write-behind ledger write failed")
+                record.last_error = e
+
+    def _dead_letter(self, record: _PendingRecord):
+        """Keeps what a record never managed to write, so it can be replayed by hand."""
+        try:
+            os.makedirs(os.path.dirname(DEAD_LETTER_FILE) or ".", exist_ok=True)
+            entry = {
+                "failed_sinks": sorted(record.pending), "error": str(record.last_error),
+                "incident": record.incident, "status": record.status, "raw_event": record.raw_event,
+                "detection": record.detection, "response": record.response, "mttr": record.mttr,
+            }
+            with open(DEAD_LETTER_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+        except Exception:
+            log.exception(f"Dead-letter write failed; lost {sorted(record.pending)} for one incident")
+
+    def _flush(self, batch: List[_PendingRecord]):
+        start = time.perf_counter()
+        flushed = failed = retried = 0
+
+        self._commit_ledger([record for record in batch if "ledger" in record.pending])
+
+        for record in batch:
+            if "report" not in record.pending:
+                continue
+            try:
+                append_report(build_report(record.raw_event, record.detection, record.response))
+                record.pending.discard("report")
+            except Exception as e:
+                log.exception("Write-behind report failed")
+                record.last_error = e
+
+        mttr_records = [record for record in batch if "mttr" in record.pending]
+        if mttr_records:
+            try:
+                log_mttr_rows_to_csv([record.mttr for record in mttr_records])
+                for record in mttr_records:
+                    record.pending.discard("mttr")
+            except Exception as e:
+                log.exception("MTTR batch write failed")
+                for record in mttr_records:
+                    record.last_error = e
+
+        finished = []
+        for record in batch:
+            if not record.pending:
+                flushed += 1
+                finished.append(record)
+                continue
+            record.attempts += 1
+            if record.attempts <= PERSIST_RETRIES:
+                try:
+                    # Only the sinks that failed are written again
+                    self._queue.put_nowait(record)
+                    retried += 1
+                    continue
+                except queue.Full:
+                    pass
+            self._dead_letter(record)
+            record.error = record.last_error
+            failed += 1
+            finished.append(record)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["flushed"] += flushed
+            self._stats["failed"] += failed
+            self._stats["retried"] += retried
+            self._stats["dead_lettered"] += failed
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], round(elapsed_ms, 3))
+            self._stats["total_flush_ms"] += elapsed_ms
+
+        for record in finished:
+            if record.done is not None:
+                record.done.set()
@@ -1,34 +1,81 @@
 import os
+import sys
 import json
 import hashlib
+import textwrap
+from threading import Lock
 from datetime import datetime, timezone
 
 BASE_DIR = os.getenv("HG_REPORT_DIR", os.path.join(os.getcwd(), "reports"))
 os.makedirs(BASE_DIR, exist_ok=True)
+# Append-only store: one report per line, so each incident costs O(1) I/O
+REPORT_LOG = os.path.join(BASE_DIR, "forensic_audit.jsonl")
+# Pretty-printed JSON array consumed by the dashboard and auditors (see export_reports)
 REPORT_FILE = os.path.join(BASE_DIR, "forensic_audit.json")
 
+GENESIS_HASH = "0" * 64
+_TAIL_CHUNK = 8192
+
+_chain_lock = Lock()
+_last_hash = None
+
 def calculate_hash(data_block: dict) -> str:
     block_string = json.dumps(data_block, sort_keys=True).encode()
     return hashlib.sha256(block_string).hexdigest()
 
-def get_last_hash():
-    # If file doesn't exist or is empty, return genesis hash
-    if not os.path.exists(REPORT_FILE) or os.path.getsize(REPORT_FILE) == 0:
-        return "0" * 64
-    
+def _read_tail_line(path: str) -> str:
+    """Returns the last non-empty line of a file, reading backwards in chunks."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b""
+        while position > 0:
+            step = min(_TAIL_CHUNK, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+            stripped = buffer.rstrip(b"\r\n")
+            if b"\n" in stripped:
+                return stripped.rsplit(b"\n", 1)[1].decode("utf-8")
+        return buffer.strip().decode("utf-8")
+
+def _migrate_legacy_array():
+    """One-off conversion of an existing forensic_audit.json array into the JSONL store."""
+    if os.path.exists(REPORT_LOG) or not os.path.exists(REPORT_FILE) or os.path.getsize(REPORT_FILE) == 0:
+        return
     try:
-        # Read the file as a complete JSON list
         with open(REPORT_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-            # If it's a list and has items, get the hash from the last item
-            if isinstance(data, list) and len(data) > 0:
-                last_item = data[-1]
-                return last_item.get("current_hash", "0" * 64)
+    except json.JSONDecodeError:
+        print("[REPORT WARNING] Existing forensic_audit.json is corrupted. Starting a fresh chain.")
+        return
+    if not isinstance(data, list):
+        data = [data]
+    with open(REPORT_LOG, "w", encoding="utf-8") as f:
+        for item in data:
+            f.write(json.dumps(item) + "\n")
+    print(f"[REPORT] Migrated {len(data)} reports from forensic_audit.json to forensic_audit.jsonl")
+
+def _recover_last_hash() -> str:
+    _migrate_legacy_array()
+    if not os.path.exists(REPORT_LOG) or os.path.getsize(REPORT_LOG) == 0:
+        return GENESIS_HASH
+    try:
+        last_line = _read_tail_line(REPORT_LOG)
+        if last_line:
+            return json.loads(last_line).get("current_hash", GENESIS_HASH)
     except Exception:
-        # If the JSON is completely broken, fall back to genesis
-        return "0" * 64
-        
-    return "0" * 64
+        # If the tail is unreadable, fall back to genesis
+        return GENESIS_HASH
+    return GENESIS_HASH
+
+def get_last_hash():
+    """Returns the chain tip, recovering it from disk only on first use."""
+    global _last_hash
+    with _chain_lock:
+        if _last_hash is None:
+            _last_hash = _recover_last_hash()
+        return _last_hash
 
 def build_report(raw_event, detection, response_action):
     report = {
@@ -44,30 +91,58 @@ def build_report(raw_event, detection, response_action):
     return report
 
 def append_report(report_data: dict):
+    """Appends one report to the chain; raises if it couldn't be written so the caller can retry."""
+    global _last_hash
     try:
-        existing_data = []
-        
-        # 1. Read the existing array (if the file exists and isn't empty)
-        if os.path.exists(REPORT_FILE) and os.path.getsize(REPORT_FILE) > 0:
-            with open(REPORT_FILE, "r", encoding="utf-8") as f:
-                try:
-                    existing_data = json.load(f)
-                    # Safety check: if somehow it's not a list, wrap it
-                    if not isinstance(existing_data, list):
-                        existing_data = [existing_data]
-                except json.JSONDecodeError:
-                    # If the file was corrupted by the old code, wipe it and start fresh
-                    print("[REPORT WARNING] Existing forensic_audit.json is corrupted. Starting fresh array.")
-                    existing_data = []
-
-        # 2. Append the new report dictionary to the list
-        existing_data.append(report_data)
+        with _chain_lock:
+            if _last_hash is None:
+                _last_hash = _recover_last_hash()
+            with open(REPORT_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report_data) + "\n")
+            _last_hash = report_data.get("current_hash", _last_hash)
 
-        # 3. Write the entire list back to the file as a pretty-printed JSON array
-        with open(REPORT_FILE, "w", encoding="utf-8") as f:
-            json.dump(existing_data, f, indent=4)
-            
         return report_data.get("current_hash")
     except Exception as e:
         print(f"[REPORT ERROR] {e}")
-        return None
\ No newline at end of file
+        raise
+
+def iter_reports(path: str = None):
+    """Streams reports from the JSONL store in chain order."""
+    path = path or REPORT_LOG
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def export_reports(output_path: str = None) -> int:
+    """
+    Writes the JSONL store out as the pretty-printed JSON array the dashboard
+    and auditors expect (byte-identical to json.dump(reports, f, indent=4)).
+    Streams record by record and swaps the file in atomically.
+    """
+    output_path = output_path or REPORT_FILE
+    with _chain_lock:
+        _migrate_legacy_array()
+    tmp_path = output_path + ".tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for report in iter_reports():
+            out.write("[\n" if count == 0 else ",\n")
+            out.write(textwrap.indent(json.dumps(report, indent=4), "    "))
+            count += 1
+        out.write("\n]" if count else "[]")
+    os.replace(tmp_path, output_path)
+    return count
+
+if __name__ == "__main__":
+    # Usage: python -m src.orchestrator.report_writer export [output_path]
+    if len(sys.argv) >= 2 and sys.argv[1] == "export":
+        target = sys.argv[2] if len(sys.argv) > 2 else REPORT_FILE
+        exported = export_reports(target)
+        print(f"[*] Exported {exported} forensic reports to {target}")
+    else:
+        print("Usage: python -m src.orchestrator.report_writer export [output_path]")
+        sys.exit(1)
@@ -0,0 +1,330 @@
+"""
+sensor_features.py
+
+Live UNSW-NB15 style connection features, so the sensor can feed the
+RandomForest / IsolationForest route (f_* columns) instead of only the
+volumetric rules. Packets are folded into per-connection accumulators as
+they arrive; every update is O(1): counters, first/last timestamps, a
+Welford mean/variance of inter-arrival times per direction, the TCP
+handshake timestamps and the highest sequence number seen (for loss).
+The ct_* counts come from running counters over the last 100
+connections, updated as a connection enters or leaves that window.
+
+Feature order follows the preprocessing notebook (feature_meta columns),
+so feature i is sent as f_i. The training CSVs hold label-encoded
+proto/service/state and MinMax-scaled values, so the notebook's
+{col}_encoder.joblib / minmax_scaler.joblib files must be in
+HG_SENSOR_FEATURE_DIR; feature mode refuses to run without them rather
+than send raw values. Features that need payload inspection (trans_depth,
+response_body_len, is_ftp_login, ct_ftp_cmd, ct_flw_http_mthd) and the
+dataset's row `id` are sent as 0.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from src.orchestrator.sensor_flows import AUTH_PORTS
+
+log = logging.getLogger("hawkgrid-sensor-features")
+
+UNSW_FEATURES = [
+    "id", "dur", "proto", "service", "state", "spkts", "dpkts", "sbytes", "dbytes", "rate",
+    "sttl", "dttl", "sload", "dload", "sloss", "dloss", "sinpkt", "dinpkt", "sjit", "djit",
+    "swin", "stcpb", "dtcpb", "dwin", "tcprtt", "synack", "ackdat", "smean", "dmean",
+    "trans_depth", "response_body_len", "ct_srv_src", "ct_state_ttl", "ct_dst_ltm",
+    "ct_src_dport_ltm", "ct_dst_sport_ltm", "ct_dst_src_ltm", "is_ftp_login", "ct_ftp_cmd",
+    "ct_flw_http_mthd", "ct_src_ltm", "ct_srv_dst", "is_sm_ips_ports",
+]
+CATEGORICAL_FEATURES = ("proto", "service", "state")
+
+FEATURE_DIR = os.getenv("HG_SENSOR_FEATURE_DIR", os.getenv("HG_MODELS_DIR", "src/ml/models"))
+# A connection with no packets for this long is reported one last time and forgotten
+FLOW_IDLE_S = float(os.getenv("HG_SENSOR_FLOW_IDLE_S", 60))
+# Connections tracked at once; beyond this new connections are not followed
+MAX_CONNECTIONS = int(os.getenv("HG_SENSOR_MAX_CONNECTIONS", 200000))
+# Closed (FIN / RST) connections are forgotten after this long without packets
+CLOSED_LINGER_S = 2.0
+# UNSW-NB15 computes the ct_* counts over the last 100 connections
+CT_HISTORY = 100
+
+TCP, UDP = 6, 17
+_FIN, _SYN, _RST, _ACK = 0x01, 0x02, 0x04, 0x10
+_PROTO_NAMES = {1: "icmp", 2: "igmp", 6: "tcp", 17: "udp", 47: "gre", 50: "esp", 89: "ospf", 132: "sctp"}
+_SERVICES = {
+    20: "ftp-data", 21: "ftp", 22: "ssh", 25: "smtp", 53: "dns", 67: "dhcp", 68: "dhcp", 80: "http",
+    110: "pop3", 161: "snmp", 194: "irc", 443: "ssl", 1812: "radius", 6667: "irc", 8080: "http",
+}
+
+# Per-direction slots: packets, bytes, ttl, last_ts, gap count, gap mean, gap M2, window, base seq, seq end, loss
+PKTS, BYTES, TTL, LAST, GAPS, GAP_MEAN, GAP_M2, WIN, BASE_SEQ, SEQ_END, LOSS = range(11)
+
+class _Connection:
+    __slots__ = ("src", "dst", "sport", "dport", "proto", "service", "first", "fwd", "rev",
+                 "syn", "synack", "ack", "fin", "rst", "window_packets", "window_bytes", "auth_syns", "state_ttl")
+
+    def __init__(self, ts: float, src: str, dst: str, sport: int, dport: int, proto: int):
+        self.src, self.dst, self.sport, self.dport, self.proto = src, dst, sport, dport, proto
+        self.service = _SERVICES.get(dport) or _SERVICES.get(sport) or "-"
+        self.first = ts
+        self.fwd = [0, 0, 0, ts, 0, 0.0, 0.0, 0, 0, None, 0]
+        self.rev = [0, 0, 0, ts, 0, 0.0, 0.0, 0, 0, None, 0]
+        self.syn = self.synack = self.ack = None
+        self.fin = self.rst = False
+        self.window_packets = self.window_bytes = self.auth_syns = 0
+        # (state, sttl, dttl) as first reported; counted towards ct_state_ttl once
+        self.state_ttl = None
+
+    def state(self) -> str:
+        answered = self.rev[PKTS] > 0
+        if self.proto == TCP:
+            if self.rst:
+                return "RST"
+            if self.fin:
+                return "FIN"
+            if answered:
+                return "CON"
+            return "REQ" if self.syn is not None else "INT"
+        return "CON" if answered else "INT"
+
+def _update(side: List, ts: float, length: int, ttl: int, window: int, seq: int, payload: int):
+    if side[PKTS]:
+        # Welford's running mean / variance of the inter-arrival gap, in ms as UNSW reports it
+        gap = (ts - side[LAST]) * 1000
+        side[GAPS] += 1
+        delta = gap - side[GAP_MEAN]
+        side[GAP_MEAN] += delta / side[GAPS]
+        side[GAP_M2] += delta * (gap - side[GAP_MEAN])
+    else:
+        side[TTL], side[WIN], side[BASE_SEQ] = ttl, window, seq
+    side[PKTS] += 1
+    side[BYTES] += length
+    side[LAST] = ts
+    if payload:
+        seq_end = (seq + payload) & 0xFFFFFFFF
+        if side[SEQ_END] is not None and (side[SEQ_END] - seq_end) & 0xFFFFFFFF < 0x80000000:
+            # Data that ends at or before what was already sent is a retransmission
+            side[LOSS] += 1
+        else:
+            side[SEQ_END] = seq_end
+
+class _RecentCounts:
+    """How many of the last CT_HISTORY entries carry each key."""
+
+    def __init__(self):
+        self.entries = deque()
+        self.counts: Dict[Tuple, int] = {}
+
+    def push(self, keys: Tuple):
+        self.entries.append(keys)
+        for key in keys:
+            self.counts[key] = self.counts.get(key, 0) + 1
+        if len(self.entries) > CT_HISTORY:
+            for key in self.entries.popleft():
+                remaining = self.counts[key] - 1
+                if remaining:
+                    self.counts[key] = remaining
+                else:
+                    del self.counts[key]
+
+    def count(self, key: Tuple) -> int:
+        return self.counts.get(key, 0)
+
+class ConnectionTable:
+    """
+    Bidirectional connection table with the same add/drain rhythm as
+    FlowTable. The initiator (the SYN sender, else whoever was seen first)
+    is the "s" side of every feature.
+    """
+
+    def __init__(self, idle_s: float = FLOW_IDLE_S, max_connections: int = MAX_CONNECTIONS):
+        self.idle_s = idle_s
+        self.max_connections = max_connections
+        self.connections: Dict[Tuple, _Connection] = {}
+        self.touched: Dict[Tuple, _Connection] = {}
+        self.window_start = time.time()
+        self._recent = _RecentCounts()
+        self._recent_states = _RecentCounts()
+        self._lock = threading.Lock()
+        self.stats = {"connections": 0, "untracked_packets": 0}
+
+    def add(self, ts: float, src: str, dst: str, length: int, proto: int, sport: int, dport: int,
+            ttl: int, flags: int, window: int, seq: int, payload: int):
+        # One key for both directions of the conversation
+        key = (proto, src, sport, dst, dport) if (src, sport) <= (dst, dport) else (proto, dst, dport, src, sport)
+        with self._lock:
+            conn = self.connections.get(key)
+            if conn is None:
+                if len(self.connections) >= self.max_connections:
+                    self.stats["untracked_packets"] += 1
+                    return
+                if proto == TCP and flags & (_SYN | _ACK) == _SYN | _ACK:
+                    # First sight is the reply to a SYN we missed; the receiver initiated
+                    conn = _Connection(ts, dst, src, dport, sport, proto)
+                else:
+                    conn = _Connection(ts, src, dst, sport, dport, proto)
+                self.connections[key] = conn
+                self.stats["connections"] += 1
+                self._recent.push((
+                    ("srv_src", conn.service, conn.src), ("dst", conn.dst), ("src_dport", conn.src, conn.dport),
+                    ("dst_sport", conn.dst, conn.sport), ("dst_src", conn.dst, conn.src), ("src", conn.src),
+                    ("srv_dst", conn.service, conn.dst),
+                ))
+
+            forward = src == conn.src and sport == conn.sport
+            _update(conn.fwd if forward else conn.rev, ts, length, ttl, window, seq, payload)
+            conn.window_packets += 1
+            conn.window_bytes += length
+            if proto == TCP:
+                if flags & _RST:
+                    conn.rst = True
+                elif flags & _FIN:
+                    conn.fin = True
+                if flags & (_SYN | _ACK) == _SYN:
+                    if forward:
+                        conn.syn = ts if conn.syn is None else conn.syn
+                        # A bare SYN (exactly the S flag, as FlowTable counts it)
+                        if flags == _SYN and dport in AUTH_PORTS:
+                            conn.auth_syns += 1
+                elif flags & _SYN:
+                    if not forward and conn.synack is None:
+                        conn.synack = ts
+                elif forward and conn.synack is not None and conn.ack is None:
+                    conn.ack = ts
+            self.touched[key] = conn
+
+    def drain(self, end: Optional[float] = None) -> Tuple[float, float, Dict[Tuple, List]]:
+        """
+        Closes the current window: returns (start, end, flows) where each
+        connection that saw packets maps to [packets, bytes, auth_syns,
+        features] for this window, and forgets finished or idle ones.
+        """
+        with self._lock:
+            end = time.time() if end is None else end
+            start, touched = self.window_start, self.touched
+            self.touched, self.window_start = {}, end
+            flows = {}
+            for key, conn in touched.items():
+                flows[(conn.src, conn.dst, conn.sport, conn.dport, conn.proto)] = [
+                    conn.window_packets, conn.window_bytes, conn.auth_syns, self._features(conn)]
+                conn.window_packets = conn.window_bytes = conn.auth_syns = 0
+            # Already reported in the window they last saw traffic; closed ones
+            # linger briefly so the final ACK doesn't open a new connection
+            idle = [key for key, conn in self.connections.items()
+                    if end - max(conn.fwd[LAST], conn.rev[LAST]) > (CLOSED_LINGER_S if conn.rst or conn.fin else self.idle_s)]
+            for key in idle:
+                del self.connections[key]
+        return start, end, flows
+
+    def _features(self, conn: _Connection) -> List:
+        fwd, rev = conn.fwd, conn.rev
+        dur = max(fwd[LAST], rev[LAST]) - conn.first
+        state = conn.state()
+        if conn.state_ttl is None:
+            # A connection spanning several windows must count once, not once per window
+            conn.state_ttl = (state, fwd[TTL], rev[TTL])
+            self._recent_states.push((conn.state_ttl,))
+        synack = conn.synack - conn.syn if conn.syn is not None and conn.synack is not None else 0.0
+        ackdat = conn.ack - conn.synack if conn.synack is not None and conn.ack is not None else 0.0
+        recent = self._recent.count
+        return [
+            0, dur, _PROTO_NAMES.get(conn.proto, "unas"), conn.service, state,
+            fwd[PKTS], rev[PKTS], fwd[BYTES], rev[BYTES],
+            (fwd[PKTS] + rev[PKTS] - 1) / dur if dur > 0 else 0.0,
+            fwd[TTL], rev[TTL],
+            fwd[BYTES] * 8 / dur if dur > 0 else 0.0, rev[BYTES] * 8 / dur if dur > 0 else 0.0,
+            fwd[LOSS], rev[LOSS],
+            fwd[GAP_MEAN], rev[GAP_MEAN],
+            math.sqrt(fwd[GAP_M2] / fwd[GAPS]) if fwd[GAPS] else 0.0,
+            math.sqrt(rev[GAP_M2] / rev[GAPS]) if rev[GAPS] else 0.0,
+            fwd[WIN], fwd[BASE_SEQ], rev[BASE_SEQ], rev[WIN],
+            synack + ackdat, synack, ackdat,
+            fwd[BYTES] / fwd[PKTS] if fwd[PKTS] else 0.0, rev[BYTES] / rev[PKTS] if rev[PKTS] else 0.0,
+            0, 0,
+            recent(("srv_src", conn.service, conn.src)),
+            self._recent_states.count(conn.state_ttl),
+            recent(("dst", conn.dst)),
+            recent(("src_dport", conn.src, conn.dport)),
+            recent(("dst_sport", conn.dst, conn.sport)),
+            recent(("dst_src", conn.dst, conn.src)),
+            0, 0, 0,
+            recent(("src", conn.src)),
+            recent(("srv_dst", conn.service, conn.dst)),
+            1 if conn.src == conn.dst and conn.sport == conn.dport else 0,
+        ]
+
+_encoding = None
+
+def load_encoding() -> Tuple[Dict[str, Dict[str, int]], Tuple[List[float], List[float]]]:
+    """
+    Label codes for proto / service / state and the MinMax (scale, min)
+    from the preprocessing notebook's artifacts in HG_SENSOR_FEATURE_DIR,
+    loaded once. The model was trained on encoded, scaled values, so
+    without them scores would be meaningless: raises FileNotFoundError
+    (or ValueError for a scaler of the wrong width) instead.
+    """
+    global _encoding
+    if _encoding is not None:
+        return _encoding
+    paths = {name: os.path.join(FEATURE_DIR, f"{name}.joblib")
+             for name in [f"{col}_encoder" for col in CATEGORICAL_FEATURES] + ["minmax_scaler"]}
+    missing = [path for path in paths.values() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(
+            f"UNSW feature artifacts missing: {', '.join(missing)}. Copy the encoders and minmax_scaler.joblib "
+            f"saved by data/hawkgrid_data_preprocessing.ipynb into {FEATURE_DIR} (or set HG_SENSOR_FEATURE_DIR)."
+        )
+
+    import joblib
+    codes = {}
+    for col in CATEGORICAL_FEATURES:
+        encoder = joblib.load(paths[f"{col}_encoder"])
+        codes[col] = {str(label): n for n, label in enumerate(encoder.classes_)}
+    scaler = joblib.load(paths["minmax_scaler"])
+    if len(scaler.scale_) != len(UNSW_FEATURES):
+        raise ValueError(f"{paths['minmax_scaler']} scales {len(scaler.scale_)} features, "
+                         f"the sensor extracts {len(UNSW_FEATURES)}")
+    minmax = ([float(v) for v in scaler.scale_], [float(v) for v in scaler.min_])
+    log.info("Loaded UNSW feature encoders and MinMax scaler from %s", FEATURE_DIR)
+    _encoding = (codes, minmax)
+    return _encoding
+
+_CATEGORICAL_SLOTS = [(UNSW_FEATURES.index(col), col) for col in CATEGORICAL_FEATURES]
+_COLUMNS = [f"f_{n}" for n in range(len(UNSW_FEATURES))]
+
+def feature_vector(features: List) -> List[float]:
+    """The model's numeric input for one connection: categories encoded, values scaled."""
+    codes, (scale, offset) = load_encoding()
+    vector = list(features)
+    for n, col in _CATEGORICAL_SLOTS:
+        table = codes[col]
+        # Values the encoder never saw map to "-" (none), as in the dataset
+        vector[n] = table.get(vector[n], table.get("-", 0))
+    return [v * s + o for v, s, o in zip(vector, scale, offset)]
+
+def feature_records(flows: Dict[Tuple, List], window_s: float, target_map: Dict[str, str]) -> List[Dict]:
+    """
+    One detection payload per connection: the volumetric LogFeatures fields
+    plus f_0..f_N, so /api/detect/batch scores it on the ML route. dst_ip
+    is the monitored side, src_ip the remote one.
+    """
+    window_s = max(window_s, 1e-6)
+    records = []
+    for (src, dst, _, _, _), (packets, length, auth_syns, features) in flows.items():
+        if dst not in target_map and src in target_map:
+            src, dst = dst, src
+        record = {
+            "node_id": dst,
+            "src_ip": src,
+            "dst_ip": dst,
+            "API_Call_Freq": float(packets / window_s),
+            "Failed_Auth_Count": float(auth_syns),
+            "Network_Egress_MB": float(length / 1048576),
+            "cloud_provider": target_map.get(dst, "unknown"),
+        }
+        record.update(zip(_COLUMNS, feature_vector(features)))
+        records.append(record)
+    return records
@@ -122,38 +122,45 @@
 import os
 import time
 import socket
-import requests
-from collections import Counter
-from scapy.all import sniff, IP, TCP, conf
+import threading
+from scapy.all import sniff, IP, TCP, UDP, conf
 from dotenv import load_dotenv
 
 # Load unified environment variables
 load_dotenv()
-from src.cloud.provider_factory import get_cloud_providers
+from src.cloud.provider_factory import get_cloud_providers_with_assets
+from src.orchestrator.sensor_flows import AUTH_PORTS, FlowTable, flow_records, window_packets
+from src.orchestrator.sensor_features import ConnectionTable, feature_records, load_encoding
+from src.orchestrator.sensor_sender import WindowSender
 
 # --- CONFIGURATION ---
 ORCHESTRATOR_URL = os.getenv("ORCHESTRATOR_URL", "http://localhost:8000/api/detect")
-WINDOW_SIZE = 2.0
+ORCHESTRATOR_BATCH_URL = os.getenv("ORCHESTRATOR_BATCH_URL", ORCHESTRATOR_URL.rstrip("/") + "/batch")
+WINDOW_SIZE = float(os.getenv("HG_SENSOR_WINDOW_S", 2.0))
+STATS_INTERVAL_S = float(os.getenv("HG_SENSOR_STATS_S", 30))
+# Only sensor_replay shards: scapy dissects every live packet on the capture thread, so
+# workers would just add counters while each packet still paid for pickling and IPC
+SHARDS = int(os.getenv("HG_SENSOR_SHARDS", 1))
+# Per-connection UNSW-NB15 features (f_*) so detections take the ML route
+UNSW_FEATURES = os.getenv("HG_SENSOR_UNSW_FEATURES", "0") == "1"
 
-packet_buffer = []
-last_process_time = time.time()
+flow_table = ConnectionTable() if UNSW_FEATURES else FlowTable()
+sender = WindowSender(ORCHESTRATOR_BATCH_URL)
+capture_stats = {"packets_seen": 0, "packets_counted": 0, "windows_flushed": 0, "flush_lag_ms_max": 0.0}
 TARGET_IP_MAP = {}  # Maps Public IP -> Cloud Provider Name
 
 def get_cloud_targets():
     """Dynamically fetches Public IPs of running cloud instances."""
     print("[*] Contacting Cloud Providers to discover live targets...")
-    providers = get_cloud_providers()
+    # The concurrent probe already listed every cloud's assets; no second pass
+    _, discovered = get_cloud_providers_with_assets()
     
-    for name, provider in providers.items():
-        try:
-            assets = provider.discover_assets()
-            for asset in assets:
-                pub_ip = asset.get("public_ip")
-                if pub_ip:
-                    TARGET_IP_MAP[pub_ip] = name
-                    print(f"    -> Monitoring {name.upper()} Target: {pub_ip}")
-        except Exception as e:
-            print(f"    -> [!] Error loading {name} assets: {e}")
+    for name, assets in discovered.items():
+        for asset in assets:
+            pub_ip = asset.get("public_ip")
+            if pub_ip:
+                TARGET_IP_MAP[pub_ip] = name
+                print(f"    -> Monitoring {name.upper()} Target: {pub_ip}")
             
     return list(TARGET_IP_MAP.keys())
 
@@ -171,57 +178,88 @@ def get_active_interface():
         return conf.iface
 
 def analyze_window():
-    global packet_buffer
-    if not packet_buffer: return
+    _, _, flows = flow_table.drain()
+    if not flows: return
 
-    count = len(packet_buffer)
-    dst = packet_buffer[0][IP].dst
-    src_ips = [p[IP].src for p in packet_buffer]
-    src = Counter(src_ips).most_common(1)[0][0]
-    
-    cloud_provider_name = TARGET_IP_MAP.get(dst, "unknown")
-
-    # Detect failed auth attempts (SYN packets to SSH/RDP/SMB)
-    auth_fail = sum(1 for p in packet_buffer if p.haslayer(TCP) and p[TCP].dport in [22, 3389, 445] and p[TCP].flags == "S")
-    egress_mb = sum(len(p) for p in packet_buffer) / 1048576
-
-    payload = {
-        "node_id": dst,
-        "src_ip": src,
-        "dst_ip": dst,
-        "API_Call_Freq": float(count / WINDOW_SIZE),
-        "Failed_Auth_Count": float(auth_fail),
-        "Network_Egress_MB": float(egress_mb),
-        "cloud_provider": cloud_provider_name
-    }
+    # One record per flow (per connection with UNSW_FEATURES), so attacks on different targets stay apart
+    records = (feature_records if UNSW_FEATURES else flow_records)(flows, WINDOW_SIZE, TARGET_IP_MAP)
+    if not sender.submit(records, window_packets(flows)):
+        print(f"[!] Send queue full; dropped a window of {len(records)} flow record(s)")
 
-    try:
-        requests.post(ORCHESTRATOR_URL, json=payload, timeout=5)
-        print(f"[+] Alert Sent to API ({cloud_provider_name.upper()}): {count} packets from {src} to {dst}")
-    except Exception as e: 
-        print(f"[!] API Connection Error: Is the API running? ({e})")
+def flush_loop(stop: threading.Event):
+    """Closes a window every WINDOW_SIZE seconds, whether or not packets are arriving."""
+    next_flush = time.monotonic() + WINDOW_SIZE
+    next_stats = time.monotonic() + STATS_INTERVAL_S
+    while not stop.wait(max(0.0, next_flush - time.monotonic())):
+        # How late this window closed; a busy box shows up here first
+        capture_stats["flush_lag_ms_max"] = max(capture_stats["flush_lag_ms_max"], (time.monotonic() - next_flush) * 1000)
+        next_flush += WINDOW_SIZE
+        analyze_window()
+        capture_stats["windows_flushed"] += 1
+        if time.monotonic() >= next_stats:
+            next_stats += STATS_INTERVAL_S
+            print(f"[*] Sensor stats: {sensor_metrics()}")
+
+def sensor_metrics() -> dict:
+    return {**capture_stats, **sender.metrics()}
 
-    packet_buffer = []
+def connection_callback(pkt):
+    """packet_callback for UNSW_FEATURES: both directions of every connection to a target."""
+    capture_stats["packets_seen"] += 1
+    if IP not in pkt:
+        return
+    ip = pkt[IP]
+    if ip.src not in TARGET_IP_MAP and ip.dst not in TARGET_IP_MAP:
+        return
+    sport = dport = flags = window = seq = 0
+    payload = ip.len - ip.ihl * 4
+    if TCP in pkt:
+        tcp = pkt[TCP]
+        sport, dport, flags, window, seq = tcp.sport, tcp.dport, int(tcp.flags), tcp.window, tcp.seq
+        payload -= tcp.dataofs * 4
+    elif UDP in pkt:
+        sport, dport = pkt[UDP].sport, pkt[UDP].dport
+        payload -= 8
+    flow_table.add(float(pkt.time), ip.src, ip.dst, ip.len, ip.proto, sport, dport,
+                   ip.ttl, flags, window, seq, max(payload, 0))
+    capture_stats["packets_counted"] += 1
 
 def packet_callback(pkt):
-    global last_process_time, packet_buffer
-    
-    # Only buffer packets that are targeting our known Cloud Public IPs
+    capture_stats["packets_seen"] += 1
+    # Only count packets that are targeting our known Cloud Public IPs
     if IP in pkt and pkt[IP].dst in TARGET_IP_MAP:
-        packet_buffer.append(pkt)
-    
-    if (time.time() - last_process_time) > WINDOW_SIZE:
-        analyze_window()
-        last_process_time = time.time()
+        ip = pkt[IP]
+        # Detect failed auth attempts (SYN packets to SSH/RDP/SMB)
+        auth_syn = TCP in pkt and pkt[TCP].dport in AUTH_PORTS and pkt[TCP].flags == "S"
+        flow_table.add(ip.src, ip.dst, len(pkt), auth_syn)
+        capture_stats["packets_counted"] += 1
 
 if __name__ == "__main__":
+    if UNSW_FEATURES:
+        # Fail before capturing rather than send unencoded, unscaled features to the model
+        load_encoding()
     targets = get_cloud_targets()
     if targets:
         active_iface = get_active_interface()
         print(f"\n[*] Scapy Sniffer Active on: {active_iface.name} ({active_iface.ip})")
         print("[*] Launch your Kali Linux attacks now. Press Ctrl+C to stop.\n")
         
-        # 🚨 promisc=True added to catch Bridged VM traffic
-        sniff(iface=active_iface, prn=packet_callback, store=0, promisc=True)
+        # Windows close on a timer and ship from their own thread; the capture loop only counts
+        stop = threading.Event()
+        sender.start()
+        if SHARDS > 1:
+            print("[!] HG_SENSOR_SHARDS only applies to sensor_replay; live capture aggregates in-process")
+        if UNSW_FEATURES:
+            print("[*] Sending per-connection UNSW-NB15 features to the ML route")
+        threading.Thread(target=flush_loop, args=(stop,), name="hawkgrid-sensor-flush", daemon=True).start()
+        try:
+            # 🚨 promisc=True added to catch Bridged VM traffic
+            sniff(iface=active_iface, prn=connection_callback if UNSW_FEATURES else packet_callback,
+                  store=0, promisc=True)
+        finally:
+            stop.set()
+            analyze_window()
+            sender.close()
+            print(f"[*] Sensor stats: {sensor_metrics()}")
     else:
         print("\n[!] No Targets found! Check your cloud instances and .env credentials.")
\ No newline at end of file
@@ -1,39 +1,199 @@
 import os
+import json
 import time
+import asyncio
+import hashlib
 import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
 from src.cloud.provider_factory import get_cloud_providers
 
 logger = logging.getLogger("hawkgrid-realtime")
 
+STATE_FILE = os.getenv("HG_SENSOR_STATE_FILE", os.path.join(os.getcwd(), "logs", "sensor_cursors.json"))
+MIN_INTERVAL_S = float(os.getenv("HG_SENSOR_MIN_INTERVAL_S", 1))
+MAX_INTERVAL_S = float(os.getenv("HG_SENSOR_MAX_INTERVAL_S", 30))
+FETCH_TIMEOUT_S = float(os.getenv("HG_SENSOR_FETCH_TIMEOUT_S", 20))
+# Re-read this far behind the watermark to catch late-arriving logs; duplicates are dropped
+OVERLAP_S = float(os.getenv("HG_SENSOR_OVERLAP_S", 5))
+BATCH_SIZE = int(os.getenv("HG_SENSOR_BATCH", 500))
+BATCH_WAIT_S = float(os.getenv("HG_SENSOR_BATCH_WAIT_S", 0.5))
+# Polled chunks waiting for delivery; a slow pipeline makes pollers wait instead of buffering forever
+QUEUE_CHUNKS = int(os.getenv("HG_SENSOR_QUEUE", 64))
+
+def _event_time(event: Dict) -> Optional[float]:
+    """Epoch seconds from an event's timestamp (epoch number or ISO-8601 string)."""
+    value = event.get("timestamp") or event.get("eventTime") or event.get("time")
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def _event_key(event: Dict) -> str:
+    key = event.get("event_id") or event.get("id")
+    if key:
+        return str(key)
+    return hashlib.sha1(json.dumps(event, sort_keys=True, default=str).encode()).hexdigest()
+
+class _Cursor:
+    """Watermark for one provider plus the keys of events read inside the overlap window."""
+
+    def __init__(self, watermark: float = 0.0, recent: Dict[str, float] = None):
+        self.watermark = watermark
+        self.recent = recent or {}
+
+    def advance(self, events: List[Dict]) -> List[Dict]:
+        """Drops events already seen and moves the watermark past the rest."""
+        fresh = []
+        for event in events:
+            key = _event_key(event)
+            if key in self.recent:
+                continue
+            ts = _event_time(event) or time.time()
+            self.recent[key] = ts
+            self.watermark = max(self.watermark, ts)
+            fresh.append(event)
+        horizon = self.watermark - OVERLAP_S
+        self.recent = {k: ts for k, ts in self.recent.items() if ts >= horizon}
+        return fresh
+
+    def to_dict(self) -> Dict:
+        return {"watermark": self.watermark, "recent": self.recent}
+
 class RealtimeSensor:
-    def __init__(self):
+    def __init__(self, state_file: str = STATE_FILE):
         # This will securely load only the clouds that are UP and running VMs
-        self.providers = get_cloud_providers().values()
+        self.providers = list(get_cloud_providers().values())
+        self.state_file = state_file
+        self.cursors: Dict[str, _Cursor] = self._load_cursors()
+        self.stats = {"polls": 0, "events": 0, "duplicates": 0, "batches": 0, "errors": 0, "lag_s": None}
+
+    def _load_cursors(self) -> Dict[str, _Cursor]:
+        try:
+            with open(self.state_file) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable sensor cursor file {self.state_file}: {e}")
+            return {}
+        return {name: _Cursor(c.get("watermark", 0.0), c.get("recent")) for name, c in saved.items()}
 
-    def start_polling(self, callback_func, interval=5):
-        """Polls all configured active clouds for new security logs."""
+    def _save_cursors(self, cursors: Dict[str, _Cursor]):
+        # Write-then-rename so a crash never leaves a half-written cursor file
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({name: c.to_dict() for name, c in cursors.items()}, f)
+        os.replace(tmp, self.state_file)
+
+    def start_polling(self, callback_func: Callable[[List[Dict]], None], interval=5):
+        """
+        Polls all configured active clouds for new security logs, each on its
+        own adaptive schedule, and hands them to callback_func in batches
+        (a list of events per call).
+        """
         cloud_names = [p.name for p in self.providers]
         logger.info(f"Starting real-time sensor for active providers: {cloud_names}")
-        
+
         if not self.providers:
             logger.warning("No active providers to poll. Exiting sensor loop.")
             return
 
         try:
-            while True:
-                for provider in self.providers:
-                    # Note: We need to ensure fetch_logs() is added to your base_provider.py!
-                    if hasattr(provider, 'fetch_logs'):
-                        logs = provider.fetch_logs()
-                        
-                        if logs:
-                            logger.info(f"Ingested {len(logs)} logs from {provider.name.upper()}")
-                            for log_event in logs:
-                                callback_func(log_event)
-                    else:
-                        logger.debug(f"{provider.name.upper()} does not implement fetch_logs(). Skipping.")
-                            
-                time.sleep(interval)
-                
+            asyncio.run(self.run(callback_func, interval))
         except KeyboardInterrupt:
-            logger.info("Sensor polling stopped.")
\ No newline at end of file
+            logger.info("Sensor polling stopped.")
+
+    async def run(self, callback_func: Callable[[List[Dict]], None], interval: float = 5):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+        pollers = [
+            asyncio.create_task(self._poll_provider(provider, queue, interval))
+            for provider in self.providers if hasattr(provider, "fetch_logs")
+        ]
+        try:
+            await self._deliver(queue, callback_func)
+        finally:
+            for task in pollers:
+                task.cancel()
+
+    async def _poll_provider(self, provider, queue: asyncio.Queue, interval: float):
+        """
+        One provider's loop. The interval halves while polls return logs and
+        grows by half while they come back empty, within MIN/MAX_INTERVAL_S.
+        """
+        name = provider.name
+        # The poller works on its own copy; the saved cursor only moves once a batch is delivered
+        committed = self.cursors.get(name, _Cursor())
+        cursor = _Cursor(committed.watermark, dict(committed.recent))
+        interval = min(max(interval, MIN_INTERVAL_S), MAX_INTERVAL_S)
+
+        while True:
+            since = max(0.0, cursor.watermark - OVERLAP_S) if cursor.watermark else None
+            try:
+                logs = await asyncio.wait_for(
+                    asyncio.to_thread(provider.fetch_logs, since=since), timeout=FETCH_TIMEOUT_S
+                )
+            except asyncio.TimeoutError:
+                logs = None
+                self.stats["errors"] += 1
+                logger.warning(f"{name.upper()} log fetch timed out after {FETCH_TIMEOUT_S}s")
+            except Exception as e:
+                logs = None
+                self.stats["errors"] += 1
+                logger.error(f"{name.upper()} log fetch failed: {e}")
+            self.stats["polls"] += 1
+
+            fresh = cursor.advance(logs) if logs else []
+            if logs:
+                self.stats["duplicates"] += len(logs) - len(fresh)
+            if fresh:
+                logger.info(f"Ingested {len(fresh)} logs from {name.upper()}")
+                await queue.put((name, fresh, _Cursor(cursor.watermark, dict(cursor.recent))))
+                interval = max(MIN_INTERVAL_S, interval / 2)
+            else:
+                interval = min(MAX_INTERVAL_S, interval * 1.5)
+            await asyncio.sleep(interval)
+
+    async def _deliver(self, queue: asyncio.Queue, callback_func: Callable[[List[Dict]], None]):
+        """Gathers polled chunks into batches of up to BATCH_SIZE events (or BATCH_WAIT_S) and delivers them."""
+        while True:
+            chunks = [await queue.get()]
+            count = len(chunks[0][1])
+            deadline = time.monotonic() + BATCH_WAIT_S
+            while count < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    chunk = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                chunks.append(chunk)
+                count += len(chunk[1])
+
+            batch = [event for _, events, _ in chunks for event in events]
+            backoff = MIN_INTERVAL_S
+            while True:
+                try:
+                    await asyncio.to_thread(callback_func, batch)
+                    break
+                except Exception as e:
+                    # Hold the batch (and, through the bounded queue, the pollers) until the pipeline recovers
+                    self.stats["errors"] += 1
+                    logger.error(f"Delivering {len(batch)} events failed, retrying in {backoff:.1f}s: {e}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(MAX_INTERVAL_S, backoff * 2)
+
+            for name, _, cursor in chunks:
+                self.cursors[name] = cursor
+            await asyncio.to_thread(self._save_cursors, dict(self.cursors))
+            self.stats["events"] += len(batch)
+            self.stats["batches"] += 1
+            # Ingestion lag: how far the least caught-up provider in this batch trails real time
+            oldest = min(cursor.watermark for _, _, cursor in chunks)
+            self.stats["lag_s"] = round(time.time() - oldest, 2)
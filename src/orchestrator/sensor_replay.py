@@ -0,0 +1,348 @@
+"""
+sensor_replay.py
+
+Offline input for the packet sensor: replays pcap / pcapng captures into
+the same FlowTable the live sniffer feeds, so the sensor can be
+benchmarked and regression-tested without network access or root.
+Packets are decoded with struct over a memory-mapped file, reading only
+the IPv4 addresses, total length and TCP destination port / flags; scapy
+is not involved. Windows are cut on capture timestamps, so a replay is
+deterministic whatever the speed. With --features the ports, TTL and TCP
+header are read too and connections go through ConnectionTable instead.
+
+    python -m src.orchestrator.sensor_replay capture.pcapng --speed 10
+    python -m src.orchestrator.sensor_replay capture.pcap --send --targets 198.51.100.10
+    python -m src.orchestrator.sensor_replay capture.pcap --features --send --targets 198.51.100.10
+"""
+import os
+import mmap
+import time
+import socket
+import struct
+import argparse
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.orchestrator.sensor_flows import AUTH_PORTS, FlowTable, flow_records, window_packets
+from src.orchestrator.sensor_features import ConnectionTable, feature_records, load_encoding
+
+# Link-layer types we can find an IPv4 header in
+LINKTYPE_NULL, LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_LINUX_SLL, LINKTYPE_IPV4 = 0, 1, 101, 113, 228
+_ETHERTYPE_IPV4, _ETHERTYPE_VLAN, _ETHERTYPE_QINQ = 0x0800, 0x8100, 0x88A8
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG_SHB = 0x0A0D0D0A
+
+def _pcap_records(data: memoryview) -> Iterator[Tuple[float, int, int, int]]:
+    endian, resolution = _PCAP_MAGIC[bytes(data[:4])]
+    linktype = struct.unpack_from(endian + "I", data, 20)[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+    offset, end = 24, len(data)
+    while offset + 16 <= end:
+        sec, frac, caplen, _ = record.unpack_from(data, offset)
+        offset += 16
+        yield sec + frac * resolution, linktype, offset, offset + caplen
+        offset += caplen
+
+def _pcapng_records(data: memoryview) -> Iterator[Tuple[float, int, int, int]]:
+    offset, end = 0, len(data)
+    endian = "<"
+    interfaces: List[Tuple[int, float]] = []
+    while offset + 12 <= end:
+        block_type = struct.unpack_from(endian + "I", data, offset)[0]
+        if block_type == _PCAPNG_SHB:
+            # The byte-order magic decides how the rest of this section is read
+            endian = "<" if bytes(data[offset + 8:offset + 12]) == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_len = struct.unpack_from(endian + "I", data, offset + 4)[0]
+        if block_len < 12:
+            raise ValueError(f"Corrupt pcapng block at offset {offset}")
+        body = offset + 8
+
+        if block_type == 0x00000001:  # Interface Description
+            linktype = struct.unpack_from(endian + "H", data, body)[0]
+            interfaces.append((linktype, _if_tsresol(data, endian, body + 8, offset + block_len - 4)))
+        elif block_type == 0x00000006:  # Enhanced Packet
+            iface, ts_high, ts_low, caplen = struct.unpack_from(endian + "IIII", data, body)
+            linktype, resolution = interfaces[iface]
+            yield ((ts_high << 32) | ts_low) * resolution, linktype, body + 20, body + 20 + caplen
+        elif block_type == 0x00000003:  # Simple Packet (no timestamp)
+            linktype, _ = interfaces[0]
+            orig_len = struct.unpack_from(endian + "I", data, body)[0]
+            yield 0.0, linktype, body + 4, body + 4 + min(orig_len, block_len - 16)
+        offset += block_len
+
+def _if_tsresol(data: memoryview, endian: str, offset: int, end: int) -> float:
+    """The if_tsresol option of an Interface Description block (default microseconds)."""
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(endian + "HH", data, offset)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = data[offset + 4]
+            return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+        offset += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+def packet_records(data: memoryview) -> Iterator[Tuple[float, int, int, int]]:
+    """Yields (timestamp, linktype, start, end) for every packet in a pcap or pcapng image."""
+    if bytes(data[:4]) in _PCAP_MAGIC:
+        return _pcap_records(data)
+    if struct.unpack_from("<I", data, 0)[0] == _PCAPNG_SHB:
+        return _pcapng_records(data)
+    raise ValueError("Not a pcap or pcapng file")
+
+def read_packets(data: memoryview) -> Iterator[Tuple[float, int, memoryview]]:
+    """Yields (timestamp, linktype, frame) for every packet in a pcap or pcapng image."""
+    for ts, linktype, start, end in packet_records(data):
+        yield ts, linktype, data[start:end]
+
+def ipv4_offset(linktype: int, frame: memoryview) -> Optional[int]:
+    """Where the IPv4 header starts in a frame, or None if it doesn't carry one."""
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 12
+        ethertype = (frame[offset] << 8) | frame[offset + 1] if len(frame) >= 14 else 0
+        while ethertype in (_ETHERTYPE_VLAN, _ETHERTYPE_QINQ) and len(frame) >= offset + 6:
+            offset += 4
+            ethertype = (frame[offset] << 8) | frame[offset + 1]
+        if ethertype != _ETHERTYPE_IPV4:
+            return None
+        offset += 2
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4):
+        offset = 0
+    elif linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16 or ((frame[14] << 8) | frame[15]) != _ETHERTYPE_IPV4:
+            return None
+        offset = 16
+    elif linktype == LINKTYPE_NULL:
+        offset = 4
+    else:
+        return None
+    if len(frame) < offset + 20 or frame[offset] >> 4 != 4:
+        return None
+    return offset
+
+def parse_ipv4(linktype: int, frame: memoryview) -> Optional[Tuple[str, str, int, bool]]:
+    """(src, dst, ip_total_length, auth_syn) for IPv4 frames, None for anything else."""
+    offset = ipv4_offset(linktype, frame)
+    if offset is None:
+        return None
+    ihl = (frame[offset] & 0x0F) * 4
+    total_length = (frame[offset + 2] << 8) | frame[offset + 3]
+    src = socket.inet_ntoa(frame[offset + 12:offset + 16])
+    dst = socket.inet_ntoa(frame[offset + 16:offset + 20])
+
+    auth_syn = False
+    tcp = offset + ihl
+    # Protocol 6 = TCP; fragments after the first carry no TCP header
+    if frame[offset + 9] == 6 and not ((frame[offset + 6] & 0x1F) or frame[offset + 7]) and len(frame) >= tcp + 14:
+        dport = (frame[tcp + 2] << 8) | frame[tcp + 3]
+        # A bare SYN (exactly the S flag, as the live sniffer checks it)
+        auth_syn = dport in AUTH_PORTS and frame[tcp + 13] == 0x02
+    return src, dst, total_length, auth_syn
+
+def parse_packet(linktype: int, frame: memoryview) -> Optional[Tuple[str, str, int, int, int, int, int, int, int, int, int]]:
+    """
+    The header fields ConnectionTable.add takes after the timestamp: (src,
+    dst, ip_total_length, protocol, sport, dport, ttl, tcp_flags,
+    tcp_window, tcp_seq, payload_length). Ports are 0 for anything but
+    TCP / UDP, and the TCP fields 0 outside TCP.
+    """
+    offset = ipv4_offset(linktype, frame)
+    if offset is None:
+        return None
+    ihl = (frame[offset] & 0x0F) * 4
+    total_length = (frame[offset + 2] << 8) | frame[offset + 3]
+    ttl, proto = frame[offset + 8], frame[offset + 9]
+    src = socket.inet_ntoa(frame[offset + 12:offset + 16])
+    dst = socket.inet_ntoa(frame[offset + 16:offset + 20])
+
+    sport = dport = flags = window = seq = 0
+    payload = total_length - ihl
+    l4 = offset + ihl
+    first_fragment = not ((frame[offset + 6] & 0x1F) or frame[offset + 7])
+    if proto == 6 and first_fragment and len(frame) >= l4 + 16:
+        sport, dport, seq = struct.unpack_from("!HHI", frame, l4)
+        flags = frame[l4 + 13]
+        window = (frame[l4 + 14] << 8) | frame[l4 + 15]
+        payload -= (frame[l4 + 12] >> 4) * 4
+    elif proto == 17 and first_fragment and len(frame) >= l4 + 4:
+        sport, dport = struct.unpack_from("!HH", frame, l4)
+        payload -= 8
+    return src, dst, total_length, proto, sport, dport, ttl, flags, window, seq, max(payload, 0)
+
+def _summary(stats: Dict, elapsed: float, window_ms: List[float]) -> Dict:
+    window_ms = sorted(window_ms)
+    stats.update({
+        "seconds": round(elapsed, 3),
+        "pps": round(stats["packets"] / elapsed) if elapsed > 0 else None,
+        "window_ms_p50": round(window_ms[len(window_ms) // 2], 3) if window_ms else None,
+        "window_ms_p99": round(window_ms[min(len(window_ms) - 1, int(len(window_ms) * 0.99))], 3) if window_ms else None,
+    })
+    return stats
+
+def replay(path: str, window_s: float = 2.0, speed: float = 0.0, targets: Optional[Dict[str, str]] = None,
+           on_window: Optional[Callable[[List[Dict], int], None]] = None, shards: int = 1,
+           features: bool = False) -> Dict:
+    """
+    Feeds a capture through a FlowTable, closing a window every `window_s`
+    of capture time and passing its flow records to on_window(records,
+    packets). speed=0 replays as fast as possible; otherwise capture time
+    runs `speed` times faster than wall-clock time. With `targets`, only
+    packets to those IPs are counted, as on the live sensor. shards > 1
+    parses and aggregates in that many worker processes. features=True
+    tracks connections both ways and sends UNSW-NB15 features (f_*) for
+    the ML route; packets from the targets are counted too, and shards is
+    ignored as on the live sensor.
+    """
+    if features and shards > 1:
+        # ct_* counts look across every connection, so they can't be split by flow
+        print("[!] --features ignores --shards; replaying in-process")
+        shards = 1
+    if shards > 1:
+        return _replay_sharded(path, window_s, speed, targets, on_window, shards)
+    if features:
+        # Raises up front if the encoders / scaler the model needs are missing
+        load_encoding()
+    table = ConnectionTable() if features else FlowTable()
+    to_records = feature_records if features else flow_records
+    targets = targets or {}
+    window_ms: List[float] = []
+    stats = {"packets": 0, "ipv4": 0, "counted": 0, "windows": 0, "flows": 0}
+
+    def close(end_ts: float):
+        started = time.perf_counter()
+        _, _, flows = table.drain(end_ts)
+        records = to_records(flows, window_s, targets)
+        if records and on_window is not None:
+            on_window(records, window_packets(flows))
+        window_ms.append((time.perf_counter() - started) * 1000)
+        stats["windows"] += 1
+        stats["flows"] += len(records)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        packets = read_packets(memoryview(mapped))
+        wall_start = time.perf_counter()
+        first_ts = window_end = None
+        frame = None
+        try:
+            for ts, linktype, frame in packets:
+                if first_ts is None:
+                    first_ts, window_end = ts, ts + window_s
+                    table.window_start = ts
+                while ts >= window_end:
+                    close(window_end)
+                    window_end += window_s
+                if speed > 0:
+                    delay = (ts - first_ts) / speed - (time.perf_counter() - wall_start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                stats["packets"] += 1
+                if features:
+                    parsed = parse_packet(linktype, frame)
+                    if parsed is None:
+                        continue
+                    stats["ipv4"] += 1
+                    if targets and parsed[0] not in targets and parsed[1] not in targets:
+                        continue
+                    table.add(ts, *parsed)
+                    stats["counted"] += 1
+                    continue
+                parsed = parse_ipv4(linktype, frame)
+                if parsed is None:
+                    continue
+                stats["ipv4"] += 1
+                src, dst, length, auth_syn = parsed
+                if targets and dst not in targets:
+                    continue
+                table.add(src, dst, length, auth_syn)
+                stats["counted"] += 1
+            if first_ts is not None:
+                close(window_end)
+            elapsed = time.perf_counter() - wall_start
+        finally:
+            # Frames are views into the map; let go of them before it is closed
+            frame = None
+            packets.close()
+
+    return _summary(stats, elapsed, window_ms)
+
+def _replay_sharded(path: str, window_s: float, speed: float, targets: Optional[Dict[str, str]],
+                    on_window: Optional[Callable[[List[Dict], int], None]], shards: int) -> Dict:
+    """
+    The dispatcher only walks record headers and hashes each frame's raw
+    address bytes; workers map the file themselves and do the parsing.
+    Window latency here runs from the close to the merged records.
+    """
+    from src.orchestrator.sensor_shards import ShardedAggregator
+
+    aggregator = ShardedAggregator(shards, window_s, targets, on_window)
+    aggregator.start()
+    packets = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = memoryview(mapped)
+        records = packet_records(data)
+        wall_start = time.perf_counter()
+        first_ts = window_end = None
+        frame = None
+        try:
+            for ts, linktype, start, end in records:
+                if first_ts is None:
+                    first_ts, window_end = ts, ts + window_s
+                while ts >= window_end:
+                    aggregator.close_window(window_end)
+                    window_end += window_s
+                if speed > 0:
+                    delay = (ts - first_ts) / speed - (time.perf_counter() - wall_start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                packets += 1
+                frame = data[start:end]
+                offset = ipv4_offset(linktype, frame)
+                if offset is None:
+                    continue
+                aggregator.add_frame(path, linktype, start, end, frame[offset + 12:offset + 20])
+            if first_ts is not None:
+                aggregator.close_window(window_end)
+            aggregator.close()
+            elapsed = time.perf_counter() - wall_start
+        finally:
+            frame = None
+            records.close()
+            data.release()
+
+    stats = {"packets": packets, "ipv4": aggregator.stats["ipv4"], "counted": aggregator.stats["counted"],
+             "windows": aggregator.stats["windows"], "flows": aggregator.stats["flows"], "shards": shards}
+    return _summary(stats, elapsed, aggregator.window_ms)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a pcap/pcapng capture through the HawkGrid sensor")
+    parser.add_argument("capture")
+    parser.add_argument("--speed", type=float, default=0.0, help="capture-time speed-up (0 = as fast as possible)")
+    parser.add_argument("--window", type=float, default=float(os.getenv("HG_SENSOR_WINDOW_S", 2.0)))
+    parser.add_argument("--targets", nargs="*", default=[], help="only count packets to these IPs")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("HG_SENSOR_SHARDS", 1)),
+                        help="aggregate in this many worker processes")
+    parser.add_argument("--features", action="store_true", default=os.getenv("HG_SENSOR_UNSW_FEATURES", "0") == "1",
+                        help="send per-connection UNSW-NB15 features for the ML route")
+    parser.add_argument("--send", action="store_true", help="deliver windows to the orchestrator's batch endpoint")
+    args = parser.parse_args()
+
+    sender = None
+    if args.send:
+        from src.orchestrator.sensor_sender import WindowSender
+        url = os.getenv("ORCHESTRATOR_URL", "http://localhost:8000/api/detect").rstrip("/") + "/batch"
+        sender = WindowSender(os.getenv("ORCHESTRATOR_BATCH_URL", url))
+        sender.start()
+
+    print(f"[*] Replaying {args.capture} (speed {'max' if args.speed <= 0 else f'{args.speed}x'}, {args.window}s windows)")
+    result = replay(args.capture, args.window, args.speed, {ip: "replay" for ip in args.targets},
+                    sender.submit if sender else None, args.shards, args.features)
+    if sender:
+        sender.close()
+        result.update({f"send_{k}": v for k, v in sender.metrics().items()})
+    print(f"[*] Replay stats: {result}")
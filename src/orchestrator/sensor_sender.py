@@ -0,0 +1,132 @@
+"""
+sensor_sender.py
+
+Ships closed sensor windows to the orchestrator off the capture thread. A
+single background thread drains a bounded queue, folds whatever windows
+are waiting into one POST to /api/detect/batch, and reuses keep-alive
+connections from a pooled requests.Session. When the orchestrator falls
+behind, the oldest work is kept and new windows are dropped (and counted)
+rather than stalling packet capture. A batch is only resent when the API
+cannot have acted on it (no connection, or a 5xx); a batch that times out
+waiting for the response may already be mitigated and is not resent.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+log = logging.getLogger("hawkgrid-sensor-sender")
+
+SEND_QUEUE_WINDOWS = int(os.getenv("HG_SENSOR_SEND_QUEUE", 256))
+# Largest number of flow records in one batch request
+SEND_BATCH_MAX = int(os.getenv("HG_SENSOR_SEND_BATCH", 1000))
+SEND_TIMEOUT_S = float(os.getenv("HG_SENSOR_SEND_TIMEOUT_S", 5))
+SEND_RETRIES = int(os.getenv("HG_SENSOR_SEND_RETRIES", 1))
+# The batch endpoint mitigates events one after another, each within the hive-mind deadline,
+# so the read timeout grows with the batch: SEND_TIMEOUT_S + records * this
+RESPONSE_DEADLINE_S = float(os.getenv("HG_HIVE_DEADLINE_S", 5))
+
+def _not_delivered(error: Exception) -> bool:
+    """True if the request never reached the API, so resending it can't duplicate work."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", error.args[0]), NewConnectionError)
+    return False
+
+class WindowSender:
+    def __init__(self, url: str):
+        self.url = url
+        self._queue: "queue.Queue[List[Dict]]" = queue.Queue(maxsize=SEND_QUEUE_WINDOWS)
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._latencies = deque(maxlen=512)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hawkgrid-sensor-sender", daemon=True)
+        self.stats = {"windows": 0, "requests": 0, "sent_records": 0, "failed_records": 0, "unconfirmed_records": 0,
+                      "dropped_windows": 0, "dropped_records": 0, "dropped_packets": 0}
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, records: List[Dict], packets: int = 0) -> bool:
+        """Queues one window's records without blocking; False if the window had to be dropped."""
+        self.stats["windows"] += 1
+        try:
+            self._queue.put_nowait(records)
+            return True
+        except queue.Full:
+            self.stats["dropped_windows"] += 1
+            self.stats["dropped_records"] += len(records)
+            self.stats["dropped_packets"] += packets
+            return False
+
+    def _run(self):
+        while not (self._stopped.is_set() and self._queue.empty()):
+            try:
+                batch = list(self._queue.get(timeout=0.5))
+            except queue.Empty:
+                continue
+            # Fold in whatever else is already waiting, up to the batch cap
+            while len(batch) < SEND_BATCH_MAX:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for start in range(0, len(batch), SEND_BATCH_MAX):
+                self._send(batch[start:start + SEND_BATCH_MAX])
+
+    def _send(self, records: List[Dict]):
+        timeout = (SEND_TIMEOUT_S, SEND_TIMEOUT_S + len(records) * RESPONSE_DEADLINE_S)
+        for attempt in range(SEND_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = self._session.post(self.url, json=records, timeout=timeout)
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                # /api/detect/batch only answers 5xx before it has mitigated anything
+                if e.response.status_code >= 500 and attempt < SEND_RETRIES:
+                    continue
+                self.stats["failed_records"] += len(records)
+                print(f"[!] API rejected {len(records)} flow record(s): {e}")
+                return
+            except Exception as e:
+                if _not_delivered(e):
+                    if attempt < SEND_RETRIES:
+                        continue
+                    self.stats["failed_records"] += len(records)
+                    print(f"[!] API Connection Error: Is the API running? ({e})")
+                    return
+                # The API may have acted on the batch already; resending would mitigate it twice
+                self.stats["unconfirmed_records"] += len(records)
+                print(f"[!] No response for {len(records)} flow record(s); not resent ({e})")
+                return
+            finally:
+                self.stats["requests"] += 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._latencies.append(elapsed_ms)
+            self.stats["sent_records"] += len(records)
+            print(f"[+] Sent {len(records)} flow record(s) to API in {elapsed_ms:.0f} ms")
+            return
+
+    def close(self, timeout: float = 10):
+        """Stops after sending what is already queued."""
+        self._stopped.set()
+        self._thread.join(timeout)
+        self._session.close()
+
+    def metrics(self) -> Dict:
+        latencies = sorted(self._latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else None
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else None
+        return {**self.stats, "queued_windows": self._queue.qsize(),
+                "send_ms_p50": round(p50, 1) if p50 is not None else None,
+                "send_ms_p99": round(p99, 1) if p99 is not None else None}
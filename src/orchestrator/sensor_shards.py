@@ -0,0 +1,200 @@
+"""
+sensor_shards.py
+
+Spreads flow aggregation over several worker processes so the sensor is
+not capped by one Python core. Packets are routed by a CRC32 of their
+(src, dst) addresses, so every flow lives in exactly one shard. Each
+worker keeps its own FlowTable; when a window closes, every worker drains
+its table and a merger thread in the parent combines the per-shard flows
+into one set of flow records before delivery.
+
+Sharding is for replay (sensor_replay --shards): frames are handed over
+as offsets into the capture file and workers parse them from their own
+memory map, so header parsing is spread across cores too, and a full
+worker queue just makes the replay wait. The live sniffer does not shard:
+scapy has already dissected each packet on the capture thread, leaving
+the workers only the counter updates while every packet pays for IPC.
+add() still takes parsed packets, but never blocks; when a worker falls
+behind the batch is dropped and counted in stats["dropped_packets"].
+"""
+import os
+import mmap
+import time
+import zlib
+import queue
+import logging
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.orchestrator.sensor_flows import FlowTable, flow_records, window_packets
+
+log = logging.getLogger("hawkgrid-sensor-shards")
+
+# Packets handed to a worker per IPC message; larger batches amortise pickling
+SHARD_BATCH = int(os.getenv("HG_SENSOR_SHARD_BATCH", 1024))
+# Batches queued per worker before replay waits (or add() starts dropping)
+SHARD_QUEUE = int(os.getenv("HG_SENSOR_SHARD_QUEUE", 64))
+
+def _shard_worker(inbox, outbox, targets: Dict[str, str]):
+    # Imported here so the worker only needs the parser once it is actually replaying
+    from src.orchestrator.sensor_replay import parse_ipv4
+
+    table = FlowTable()
+    captures: Dict[str, memoryview] = {}
+    ipv4 = counted = 0
+    while True:
+        message = inbox.get()
+        if message is None:
+            return
+        kind = message[0]
+        if kind == "packets":
+            for src, dst, length, auth_syn in message[1]:
+                table.add(src, dst, length, auth_syn)
+            counted += len(message[1])
+        elif kind == "frames":
+            _, path, frames = message
+            data = captures.get(path)
+            if data is None:
+                with open(path, "rb") as f:
+                    data = captures[path] = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            for linktype, start, end in frames:
+                parsed = parse_ipv4(linktype, data[start:end])
+                if parsed is None:
+                    continue
+                ipv4 += 1
+                src, dst, length, auth_syn = parsed
+                if targets and dst not in targets:
+                    continue
+                table.add(src, dst, length, auth_syn)
+                counted += 1
+        elif kind == "close":
+            _, window_id, end = message
+            _, _, flows = table.drain(end)
+            outbox.put((window_id, flows, ipv4, counted))
+            ipv4 = counted = 0
+
+class ShardedAggregator:
+    """
+    Drop-in for FlowTable.add / window draining across `shards` processes.
+    close_window() is asynchronous: merged records reach on_window(records,
+    packets) from the merger thread once every shard has reported.
+    """
+
+    def __init__(self, shards: int, window_s: float, targets: Optional[Dict[str, str]] = None,
+                 on_window: Optional[Callable[[List[Dict], int], None]] = None):
+        self.shards = shards
+        self.window_s = window_s
+        self.targets = targets or {}
+        self.on_window = on_window
+        ctx = multiprocessing.get_context()
+        self._inboxes = [ctx.Queue(maxsize=SHARD_QUEUE) for _ in range(shards)]
+        self._outbox = ctx.Queue()
+        self._workers = [
+            ctx.Process(target=_shard_worker, args=(inbox, self._outbox, self.targets),
+                        name=f"hawkgrid-sensor-shard-{n}", daemon=True)
+            for n, inbox in enumerate(self._inboxes)
+        ]
+        self._packets: List[List[Tuple]] = [[] for _ in range(shards)]
+        self._frames: List[List[Tuple[int, int, int]]] = [[] for _ in range(shards)]
+        self._path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._window_id = 0
+        self._closed_at: Dict[int, float] = {}
+        self._merger = threading.Thread(target=self._merge_loop, name="hawkgrid-sensor-merger", daemon=True)
+        self.window_ms: List[float] = []
+        self.stats = {"windows": 0, "flows": 0, "ipv4": 0, "counted": 0, "dropped_packets": 0}
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+        self._merger.start()
+
+    def shard_of(self, key: bytes) -> int:
+        return zlib.crc32(key) % self.shards
+
+    def add(self, src: str, dst: str, length: int, auth_syn: bool = False):
+        shard = self.shard_of(f"{src}>{dst}".encode())
+        with self._lock:
+            batch = self._packets[shard]
+            batch.append((src, dst, length, auth_syn))
+            if len(batch) >= SHARD_BATCH:
+                self._packets[shard] = []
+                self._put_packets(shard, batch)
+
+    def _put_packets(self, shard: int, batch: List[Tuple]):
+        # Never stall whoever is feeding packets; losing a batch beats losing the capture
+        try:
+            self._inboxes[shard].put_nowait(("packets", batch))
+        except queue.Full:
+            self.stats["dropped_packets"] += len(batch)
+
+    def add_frame(self, path: str, linktype: int, start: int, end: int, key: bytes):
+        """Routes a frame of a capture file by `key` (its raw address bytes); the worker parses it."""
+        shard = self.shard_of(key)
+        with self._lock:
+            self._path = path
+            batch = self._frames[shard]
+            batch.append((linktype, start, end))
+            if len(batch) >= SHARD_BATCH:
+                self._frames[shard] = []
+                self._inboxes[shard].put(("frames", path, batch))
+
+    def close_window(self, end: Optional[float] = None) -> int:
+        end = time.time() if end is None else end
+        with self._lock:
+            window_id = self._window_id
+            self._window_id += 1
+            self._closed_at[window_id] = time.perf_counter()
+            for shard, inbox in enumerate(self._inboxes):
+                if self._packets[shard]:
+                    self._put_packets(shard, self._packets[shard])
+                    self._packets[shard] = []
+                if self._frames[shard]:
+                    inbox.put(("frames", self._path, self._frames[shard]))
+                    self._frames[shard] = []
+                inbox.put(("close", window_id, end))
+        return window_id
+
+    def _merge_loop(self):
+        # Workers handle messages in order, so windows complete in order too
+        pending: Dict[int, List] = {}
+        while True:
+            message = self._outbox.get()
+            if message is None:
+                return
+            window_id, flows, ipv4, counted = message
+            entry = pending.setdefault(window_id, [0, {}])
+            entry[0] += 1
+            merged = entry[1]
+            for key, counters in flows.items():
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = counters
+                else:
+                    # Only possible if two shards disagree on routing; sum rather than lose counts
+                    merged[key] = [a + b for a, b in zip(current, counters)]
+            self.stats["ipv4"] += ipv4
+            self.stats["counted"] += counted
+            if entry[0] < self.shards:
+                continue
+
+            del pending[window_id]
+            records = flow_records(merged, self.window_s, self.targets)
+            if records and self.on_window is not None:
+                try:
+                    self.on_window(records, window_packets(merged))
+                except Exception:
+                    log.exception("Delivering a merged window failed")
+            self.window_ms.append((time.perf_counter() - self._closed_at.pop(window_id)) * 1000)
+            self.stats["windows"] += 1
+            self.stats["flows"] += len(records)
+
+    def close(self):
+        """Waits for every closed window to be merged, then stops the workers."""
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._outbox.put(None)
+        self._merger.join()
@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import ipaddress
+import threading
+from typing import Dict, Optional, Tuple
+from src.cloud.resilience import CircuitOpenError
+
+log = logging.getLogger("hawkgrid-block-cache")
+
+RECONCILE_INTERVAL_S = float(os.getenv("HG_BLOCK_RECONCILE_S", 60))
+# How long a coalesced caller waits for the in-flight cloud call before giving up
+INFLIGHT_WAIT_S = float(os.getenv("HG_BLOCK_INFLIGHT_WAIT_S", 30))
+
+_SUCCESS_STATUSES = {"SUCCESS"}
+
+class _BlockEntry:
+    __slots__ = ("state", "result", "since", "done")
+
+    def __init__(self):
+        self.state = "in_flight"
+        self.result: Optional[dict] = None
+        self.since = time.time()
+        self.done = threading.Event()
+
+class BlockStateCache:
+    """
+    Remembers which attacker IPs are already blocked (or being blocked) on
+    each provider, so repeat detections of the same attacker return straight
+    away instead of re-listing and re-writing firewall rules. Concurrent
+    requests for one (provider, IP) share a single cloud call. A background
+    reconcile pass re-reads providers that expose list_blocked_ips() so rules
+    removed out-of-band are blocked again on the next detection.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], _BlockEntry] = {}
+        self._lock = threading.Lock()
+        self._providers: Dict = {}
+        self._reconciler: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.stats = {"hits": 0, "coalesced": 0, "cloud_calls": 0, "evicted": 0, "adopted": 0, "reconciles": 0,
+                      "deferred": 0}
+
+    def block(self, provider_name: str, provider, attacker_ip: str) -> dict:
+        key = (provider_name, attacker_ip)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _BlockEntry()
+                owner = True
+            else:
+                owner = False
+                if entry.state == "blocked":
+                    self.stats["hits"] += 1
+                    return {**entry.result, "cached": True}
+                self.stats["coalesced"] += 1
+
+        if not owner:
+            if not entry.done.wait(INFLIGHT_WAIT_S):
+                return {"status": "FAILED", "action": "BLOCK_IN_FLIGHT_TIMEOUT", "provider": provider_name}
+            return {**entry.result, "cached": True}
+
+        self.stats["cloud_calls"] += 1
+        try:
+            result = provider.block_ip(attacker_ip)
+        except CircuitOpenError as e:
+            # Fail fast while the cloud is unhealthy and replay the block once its breaker recovers
+            e.guard.defer(("block_ip", provider_name, attacker_ip),
+                          lambda: self.block(provider_name, provider, attacker_ip))
+            self.stats["deferred"] += 1
+            result = {"status": "FAILED", "action": "CIRCUIT_OPEN", "provider": provider_name, "queued": True}
+        except Exception as e:
+            result = {"status": "FAILED", "action": "ERROR", "provider": provider_name, "error": str(e)}
+
+        with self._lock:
+            entry.result = result
+            if result.get("status") in _SUCCESS_STATUSES:
+                entry.state = "blocked"
+                entry.since = time.time()
+            else:
+                # Failures are never cached: the next detection retries the cloud call
+                self._entries.pop(key, None)
+        entry.done.set()
+        return result
+
+    def forget(self, provider_name: str, attacker_ip: str):
+        """Drops one entry, e.g. after a rule was removed on purpose."""
+        with self._lock:
+            self._entries.pop((provider_name, attacker_ip), None)
+
+    def reconcile(self):
+        """Aligns the cache with what each provider's firewall actually contains."""
+        for name, provider in list(self._providers.items()):
+            listed_at = time.time()
+            try:
+                actual = provider.list_blocked_ips()
+            except Exception as e:
+                log.warning(f"Block-state reconcile skipped for {name}: {e}")
+                continue
+            if actual is None:
+                continue
+            # Providers may aggregate attackers into wider CIDRs, so test containment
+            networks = [ipaddress.ip_network(cidr, strict=False) for cidr in actual]
+
+            def denied(ip: str) -> bool:
+                address = ipaddress.ip_address(ip)
+                return any(address in network for network in networks)
+
+            with self._lock:
+                for (provider_name, ip), entry in list(self._entries.items()):
+                    # Entries newer than the listing may simply not show up in it yet
+                    if (provider_name == name and entry.state == "blocked" and not denied(ip)
+                            and entry.since < listed_at):
+                        del self._entries[(provider_name, ip)]
+                        self.stats["evicted"] += 1
+                for network in networks:
+                    if network.num_addresses != 1:
+                        continue
+                    ip = str(network.network_address)
+                    if (name, ip) not in self._entries:
+                        entry = _BlockEntry()
+                        entry.state = "blocked"
+                        entry.result = {"status": "SUCCESS", "action": "ALREADY_BLOCKED", "provider": name}
+                        entry.done.set()
+                        self._entries[(name, ip)] = entry
+                        self.stats["adopted"] += 1
+        self.stats["reconciles"] += 1
+
+    def start_reconciler(self, providers: Dict):
+        self._providers = providers
+        for name, provider in providers.items():
+            blocklist = getattr(provider, "blocklist", None)
+            if blocklist is not None:
+                # An expired firewall rule must not keep answering "already blocked"
+                blocklist.on_expire.append(lambda ip, name=name: self.forget(name, ip))
+        if self._reconciler is not None or RECONCILE_INTERVAL_S <= 0:
+            return
+        self._reconciler = threading.Thread(target=self._reconcile_loop, name="hawkgrid-block-reconcile", daemon=True)
+        self._reconciler.start()
+
+    def _reconcile_loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.reconcile()
+            except Exception:
+                log.exception("Block-state reconcile failed")
+            self._stopped.wait(RECONCILE_INTERVAL_S)
+
+    def stop(self):
+        self._stopped.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            blocked = sum(1 for e in self._entries.values() if e.state == "blocked")
+            in_flight = len(self._entries) - blocked
+        return {**self.stats, "blocked": blocked, "in_flight": in_flight}
+
+# Shared by every mitigation strategy in the process
+BLOCK_CACHE = BlockStateCache()
@@ -1,9 +1,34 @@
+import os
+import time
 import logging
 import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import Dict
+from src.response.block_cache import BLOCK_CACHE
 
 log = logging.getLogger("hive_mind")
 
+# Cross-cloud fan-out: every provider is blocked concurrently, each under its own deadline
+PROVIDER_DEADLINE_S = float(os.getenv("HG_HIVE_DEADLINE_S", 5))
+WORKERS_PER_PROVIDER = int(os.getenv("HG_HIVE_WORKERS", 4))
+# One pool per provider, so calls piling up on a slow cloud can't starve the others
+_BLOCK_POOLS: Dict[str, ThreadPoolExecutor] = {}
+_POOLS_LOCK = threading.Lock()
+
+def _provider_pool(name: str) -> ThreadPoolExecutor:
+    with _POOLS_LOCK:
+        pool = _BLOCK_POOLS.get(name)
+        if pool is None:
+            pool = _BLOCK_POOLS[name] = ThreadPoolExecutor(
+                max_workers=WORKERS_PER_PROVIDER, thread_name_prefix=f"hawkgrid-hive-{name}"
+            )
+        return pool
+
+def _provider_deadline(name: str) -> float:
+    """Per-provider override, e.g. HG_HIVE_DEADLINE_S_AZURE=2."""
+    return float(os.getenv(f"HG_HIVE_DEADLINE_S_{name.upper()}", PROVIDER_DEADLINE_S))
+
 def is_protected_ip(ip_string: str, router_public_ip: str) -> bool:
     """Checks if the attacker IP is your home router OR a local Kali VM IP."""
     try:
@@ -26,14 +51,26 @@ def execute_standard_block(incident_data: dict, target_provider_name: str, all_p
     target_provider = all_providers.get(target_provider_name)
     if target_provider:
         print(f"[*] Executing Standard Block on {target_provider_name.upper()}...")
+        start = time.perf_counter()
         try:
-            return target_provider.block_ip(attacker_ip)
+            res = BLOCK_CACHE.block(target_provider_name, target_provider, attacker_ip)
+            outcome = "OK"
         except Exception as e:
             log.error(f"Failed to block IP on {target_provider_name}: {e}")
-            return {"status": "FAILED", "action": "ERROR"}
+            res, outcome = {"status": "FAILED", "action": "ERROR"}, "ERROR"
+        timings = {target_provider_name: {"elapsed_s": round(time.perf_counter() - start, 4), "outcome": outcome}}
+        return {**res, "timings": timings}
     
     return {"status": "FAILED", "action": "PROVIDER_NOT_FOUND"}
 
+def _timed_block(name: str, provider, attacker_ip: str):
+    """Returns (result, elapsed_seconds, error) so failures keep their own timing."""
+    start = time.perf_counter()
+    try:
+        return BLOCK_CACHE.block(name, provider, attacker_ip), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, e
+
 def execute_cross_cloud_quarantine(incident_data: dict, target_provider_name: str, all_providers: dict, whitelisted_ip: str = None) -> dict:
     attacker_ip = incident_data.get("src_ip", "unknown")
 
@@ -49,16 +86,40 @@ def execute_cross_cloud_quarantine(incident_data: dict, target_provider_name: st
         return {"status": "SUCCESS", "action": "ALERT_ONLY_WHITELISTED_IP", "details": "Presenter IP protected."}
 
     results = []
+    timings = {}
     print(f"[*] Broadcasting Threat IP to Cross-Cloud Firewalls...")
-    
+
+    start = time.perf_counter()
+    futures = {}
     for name, provider in all_providers.items():
+        print(f"    -> Broadcasting block to {name.upper()}...")
+        futures[name] = _provider_pool(name).submit(_timed_block, name, provider, attacker_ip)
+
+    for name, future in futures.items():
+        remaining = _provider_deadline(name) - (time.perf_counter() - start)
         try:
-            print(f"    -> Broadcasting block to {name.upper()}...")
-            res = provider.block_ip(attacker_ip)
-            results.append({"provider": name, "action": res.get("action", "FAILED")})
-        except Exception as e:
-            print(f"    -> [!] Failed to block on {name.upper()}: {e}")
-            results.append({"provider": name, "action": "ERROR"})
-            
+            res, elapsed, error = future.result(timeout=max(0.0, remaining))
+        except FutureTimeout:
+            # The call keeps running on the pool; we just stop waiting for it
+            res, elapsed, error = None, time.perf_counter() - start, None
+            print(f"    -> [!] {name.upper()} missed its {_provider_deadline(name):.1f}s deadline")
+
+        if error is not None:
+            outcome, action = "ERROR", "ERROR"
+            print(f"    -> [!] Failed to block on {name.upper()}: {error}")
+        elif res is None:
+            outcome, action = "TIMEOUT", "TIMEOUT"
+        else:
+            outcome, action = "OK", res.get("action", "FAILED")
+        elapsed = round(elapsed, 4)
+        results.append({"provider": name, "action": action, "outcome": outcome, "elapsed_s": elapsed})
+        timings[name] = {"elapsed_s": elapsed, "outcome": outcome}
+
+    all_ok = all(t["outcome"] == "OK" for t in timings.values())
     print("="*60 + "\n")
-    return {"status": "HIVE_MIND_SUCCESS", "action": "CROSS_CLOUD_QUARANTINE", "details": results}
\ No newline at end of file
+    return {
+        "status": "HIVE_MIND_SUCCESS" if all_ok else "HIVE_MIND_PARTIAL",
+        "action": "CROSS_CLOUD_QUARANTINE",
+        "details": results,
+        "timings": timings
+    }
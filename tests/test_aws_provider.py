@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from src.cloud import aws_provider, blocklist
+from src.cloud.localsim_provider import LocalSimProvider, SimulatedEC2Client
+
+
+def test_foreign_deny_rules_are_never_adopted_or_deleted(monkeypatch, tmp_path):
+    monkeypatch.setattr(aws_provider, "NACL_STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(blocklist, "COMPACT_INTERVAL_S", 0)
+    client = SimulatedEC2Client(assets=1, nacls=1, rule_limit=20, latency="fixed:0")
+    nacl_id = client.describe_network_acls()["NetworkAcls"][0]["NetworkAclId"]
+    # An operator's own deny rule inside HawkGrid's rule-number range
+    client.create_network_acl_entry(NetworkAclId=nacl_id, RuleNumber=5, Protocol="-1",
+                                    RuleAction="deny", Egress=False, CidrBlock="203.0.113.9/32")
+
+    provider = LocalSimProvider(client=client)
+    provider._seed_blocklist()
+    assert provider.blocklist.desired_rules() == []
+
+    provider.blocklist.add("8.8.8.8")
+    provider.blocklist.sync_now()
+    assert provider.list_blocked_ips() == {"8.8.8.8/32"}
+
+    # A restarted provider adopts only what the state file says it created
+    restarted = LocalSimProvider(client=client)
+    restarted._seed_blocklist()
+    assert restarted.blocklist.desired_rules() == ["8.8.8.8/32"]
+
+    provider.sync_block_rules([])
+    entries = {(e["RuleNumber"], e["CidrBlock"]) for e in client.describe_network_acls()["NetworkAcls"][0]["Entries"]}
+    assert (5, "203.0.113.9/32") in entries
+    assert not any(cidr == "8.8.8.8/32" for _, cidr in entries)
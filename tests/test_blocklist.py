@@ -0,0 +1,40 @@
+import time
+
+from src.cloud import blocklist
+from src.cloud.blocklist import BlockListManager
+
+
+def _manager(monkeypatch):
+    # No background compactor; the test drives expire() / sync_now() itself
+    monkeypatch.setattr(blocklist, "COMPACT_INTERVAL_S", 0)
+    calls = []
+
+    def sync(cidrs):
+        calls.append(list(cidrs))
+        return {"created": len(cidrs), "deleted": 0}
+
+    return BlockListManager("test", sync, max_rules=20), calls
+
+
+def test_expired_block_is_removed_on_next_sync(monkeypatch):
+    manager, calls = _manager(monkeypatch)
+    manager.add("8.8.8.8", ttl_s=0.01)
+    manager.sync_now()
+    assert calls == [["8.8.8.8/32"]]
+    assert manager.covers("8.8.8.8")
+
+    time.sleep(0.02)
+    assert manager.expire() == ["8.8.8.8/32"]
+    result = manager.sync_now()
+
+    assert not result.get("coalesced")
+    assert calls[-1] == []
+    assert not manager.covers("8.8.8.8")
+
+
+def test_sync_without_changes_coalesces(monkeypatch):
+    manager, calls = _manager(monkeypatch)
+    manager.add("8.8.8.8")
+    manager.sync_now()
+    assert manager.sync_now() == {"created": 0, "deleted": 0, "coalesced": True}
+    assert len(calls) == 1
@@ -0,0 +1,36 @@
+import threading
+import time
+
+from src.blockchain.ledger_local import LocalLedger
+
+
+def test_reads_stay_consistent_while_segments_rotate(tmp_path):
+    ledger = LocalLedger(str(tmp_path / "ledger.jsonl"), segment_bytes=5000, segment_codec="gzip", indexed=True)
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            ledger.log_incidents([({"i": i + k, "src_ip": "198.51.100.7"}, "BLOCK") for k in range(5)])
+            i += 5
+
+    def read():
+        while not stop.is_set():
+            try:
+                ledger.query(src_ip="198.51.100.7", limit=20)
+                tail = ledger.tail(50)
+                assert all(a["hash"] == b["previous_hash"] for a, b in zip(tail, tail[1:]))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(1.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    ledger.close()
+
+    assert not errors, errors[:3]